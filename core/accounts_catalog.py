@@ -0,0 +1,263 @@
+import sqlite3
+
+from utils.helpers import wrap_error
+from utils.constants import TYPE_CONFIG
+from core.exceptions import QueryExecutionError, RecordNotFoundError
+
+CREATE_ACCOUNT_TYPES_TABLE = """
+    CREATE TABLE IF NOT EXISTS account_types (
+        code INTEGER PRIMARY KEY,
+        table_name TEXT NOT NULL UNIQUE,
+        name TEXT NOT NULL UNIQUE
+    )
+"""
+
+# AUTOINCREMENT keeps the id of a deleted account from being handed to a
+# new one while transactions still refer to it. An account deleted from
+# its own table with transactions left is kept here with no type_id.
+# Accounts closed with history keep their type_id and a closed_at.
+# archived is set once transactions referring to the account have been
+# moved to a yearly archive, where the main table no longer shows them.
+CREATE_ACCOUNTS_TABLE = """
+    CREATE TABLE IF NOT EXISTS accounts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        type_code INTEGER NOT NULL REFERENCES account_types (code),
+        type_id INTEGER,
+        provider TEXT NOT NULL,
+        alias TEXT,
+        balance REAL,
+        closed_at TEXT,
+        archived INTEGER NOT NULL DEFAULT 0,
+        UNIQUE (type_code, type_id)
+    )
+"""
+
+# Closed accounts are left out, so lookups stay as small as the number
+# of accounts still open
+CREATE_ACCOUNTS_PROVIDER_INDEX = """
+    CREATE INDEX IF NOT EXISTS idx_accounts_open_provider
+    ON accounts (provider) WHERE closed_at IS NULL
+"""
+
+# Time an account was closed or detached, as written by the triggers
+CLOSED_NOW = "strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime')"
+
+# Per-type tables whose rows the catalog mirrors, by type code
+ACCOUNT_TABLES = {
+    config["type_code"]: table
+    for table, config in TYPE_CONFIG.items()
+    if "type_code" in config
+}
+ACCOUNT_TYPE_CODES = {
+    TYPE_CONFIG[table]["display_name"]: code
+    for code, table in ACCOUNT_TABLES.items()
+}
+
+
+def _mirrored(cursor: sqlite3.Cursor, table: str) -> dict[str, str] | None:
+    cursor.execute(f"PRAGMA table_info({table})")
+    present = {row[1] for row in cursor.fetchall()}
+    if not present:
+        return None
+    return {
+        column: column if column in present else "NULL"
+        for column in ("provider", "alias", "balance", "closed_at")
+    }
+
+
+def create_catalog(cursor: sqlite3.Cursor) -> None:
+    """Create the accounts catalog and keep it in step with every type.
+
+    Triggers on the per-type tables copy each insert, update and delete
+    into ``accounts``; a deleted account that transactions refer to is
+    detached instead. Rows written before the catalog existed are added.
+    Types whose table has not been created are left out.
+    """
+    cursor.execute(CREATE_ACCOUNT_TYPES_TABLE)
+    cursor.execute(CREATE_ACCOUNTS_TABLE)
+    # Catalogs from before accounts could be closed or archived;
+    # rebuild_catalog() then has the triggers copy closed_at
+    cursor.execute("PRAGMA table_info(accounts)")
+    present = {row[1] for row in cursor.fetchall()}
+    if "closed_at" not in present:
+        cursor.execute("ALTER TABLE accounts ADD COLUMN closed_at TEXT")
+    if "archived" not in present:
+        cursor.execute(
+            "ALTER TABLE accounts "
+            "ADD COLUMN archived INTEGER NOT NULL DEFAULT 0"
+        )
+    cursor.executemany(
+        "INSERT OR IGNORE INTO account_types (code, table_name, name) "
+        "VALUES (?, ?, ?)",
+        [
+            (code, table.value, TYPE_CONFIG[table]["display_name"])
+            for code, table in ACCOUNT_TABLES.items()
+        ],
+    )
+
+    for code, table_name in ACCOUNT_TABLES.items():
+        table = table_name.value
+        columns = _mirrored(cursor, table)
+        if columns is None:
+            continue
+        new = {
+            column: f"NEW.{source}" if source != "NULL" else source
+            for column, source in columns.items()
+        }
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_catalog_insert "
+            f"AFTER INSERT ON {table} BEGIN "
+            "INSERT INTO accounts "
+            "(type_code, type_id, provider, alias, balance, closed_at) "
+            f"VALUES ({code}, NEW.id, {new['provider']}, {new['alias']}, "
+            f"{new['balance']}, {new['closed_at']}); "
+            "END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_catalog_update "
+            f"AFTER UPDATE ON {table} BEGIN "
+            f"UPDATE accounts SET type_id = NEW.id, "
+            f"provider = {new['provider']}, alias = {new['alias']}, "
+            f"balance = {new['balance']}, closed_at = {new['closed_at']} "
+            f"WHERE type_code = {code} AND type_id = OLD.id; "
+            "END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_catalog_delete "
+            f"AFTER DELETE ON {table} BEGIN "
+            "UPDATE accounts SET type_id = NULL, "
+            f"closed_at = IFNULL(closed_at, {CLOSED_NOW}) "
+            f"WHERE type_code = {code} AND type_id = OLD.id AND ("
+            "archived OR EXISTS (SELECT 1 FROM transactions "
+            "WHERE source_account_id = accounts.id) OR "
+            "EXISTS (SELECT 1 FROM transactions "
+            "WHERE destination_account_id = accounts.id)); "
+            "DELETE FROM accounts "
+            f"WHERE type_code = {code} AND type_id = OLD.id; "
+            "END"
+        )
+        cursor.execute(
+            "INSERT OR IGNORE INTO accounts "  # noqa: S608
+            "(type_code, type_id, provider, alias, balance, closed_at) "
+            f"SELECT {code}, id, {columns['provider']}, {columns['alias']}, "
+            f"{columns['balance']}, {columns['closed_at']} FROM {table}"
+        )
+
+
+def rebuild_catalog(cursor: sqlite3.Cursor) -> None:
+    """Bring a catalog and its triggers from an older version up to date."""
+    # Renaming a table checks every trigger, so none may point at a table
+    # that is missing part way through
+    for table in ACCOUNT_TABLES.values():
+        for op in ("insert", "update", "delete"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {table.value}_catalog_{op}")
+
+    cursor.execute("PRAGMA table_info(accounts)")
+    if any(row[1] == "type_id" and row[3] for row in cursor.fetchall()):
+        cursor.execute(
+            "SELECT IFNULL(MAX(seq), 0) FROM sqlite_sequence "
+            "WHERE name = 'accounts'"
+        )
+        (seq,) = cursor.fetchone()
+        # Renaming accounts itself would repoint the transactions' foreign
+        # keys at the old table
+        cursor.execute(
+            CREATE_ACCOUNTS_TABLE.replace(" accounts (", " accounts_new (")
+        )
+        cursor.execute("INSERT INTO accounts_new SELECT * FROM accounts")
+        cursor.execute("DROP TABLE accounts")
+        cursor.execute("ALTER TABLE accounts_new RENAME TO accounts")
+        cursor.execute(
+            "UPDATE sqlite_sequence SET seq = MAX(seq, ?) "
+            "WHERE name = 'accounts'",
+            (seq,),
+        )
+    create_catalog(cursor)
+
+
+class AccountCatalog:
+    """Every account of every type, under one integer id.
+
+    The per-type tables stay the source of truth; the catalog is kept in
+    step with them by triggers, so lookups and summaries across types are
+    one indexed query instead of one per table.
+    """
+
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self._connection = connection
+
+    def resolve(
+        self, account_type: str | None, type_id: int | str | None
+    ) -> int | None:
+        """Catalog id of an open account given by type name and id."""
+        code = ACCOUNT_TYPE_CODES.get(account_type or "")
+        if code is None or type_id in (None, ""):
+            return None
+        row = self._fetch(
+            "SELECT id FROM accounts WHERE type_code = ? AND type_id = ? "
+            "AND closed_at IS NULL",
+            (code, int(type_id)),
+        )
+        return row[0][0] if row else None
+
+    def has_history(self, account_id: int) -> bool:
+        """Whether any transaction, archived or not, refers to the account."""
+        # Each side is one probe of its index on transactions
+        row = self._fetch(
+            "SELECT EXISTS (SELECT 1 FROM accounts WHERE id = ? AND archived) "
+            "OR EXISTS (SELECT 1 FROM transactions "
+            "WHERE source_account_id = ?) OR EXISTS (SELECT 1 "
+            "FROM transactions WHERE destination_account_id = ?)",
+            (account_id, account_id, account_id),
+        )
+        return bool(row[0][0])
+
+    def get(self, account_id: int) -> dict:
+        rows = self._select("WHERE a.id = ?", (account_id,))
+        if not rows:
+            raise RecordNotFoundError(
+                f"Account with ID {account_id} does not exist"
+            )
+        return rows[0]
+
+    def find(self, provider: str) -> list[dict]:
+        """Open accounts of any type held with ``provider``."""
+        return self._select(
+            "WHERE a.provider = ? AND a.closed_at IS NULL", (provider,)
+        )
+
+    def summary(self) -> list[dict]:
+        """Number of open accounts and their total balance, by type."""
+        rows = self._fetch(
+            "SELECT t.name, COUNT(a.id), SUM(a.balance) "
+            "FROM account_types t LEFT JOIN accounts a "
+            "ON a.type_code = t.code AND a.closed_at IS NULL "
+            "GROUP BY t.code ORDER BY t.code"
+        )
+        return [
+            {"account_type": name, "count": count, "balance": balance}
+            for name, count, balance in rows
+        ]
+
+    def _select(self, where: str, params: tuple) -> list[dict]:
+        cursor = self._connection.cursor()
+        try:
+            cursor.execute(
+                "SELECT a.id, t.name AS account_type, a.type_id, a.provider, "
+                "a.alias, a.balance FROM accounts a "
+                f"JOIN account_types t ON t.code = a.type_code {where} "
+                "ORDER BY a.id",
+                params,
+            )
+            names = [column[0] for column in cursor.description]
+            return [dict(zip(names, row)) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            wrapper = wrap_error(QueryExecutionError, "Failed to read accounts")
+            raise wrapper(e) from e
+
+    def _fetch(self, query: str, params: tuple = ()) -> list[tuple]:
+        try:
+            return self._connection.execute(query, params).fetchall()
+        except sqlite3.Error as e:
+            wrapper = wrap_error(QueryExecutionError, "Failed to read accounts")
+            raise wrapper(e) from e
@@ -0,0 +1,526 @@
+import sqlite3
+
+from typing import Iterable, Iterator
+from pathlib import Path
+from datetime import datetime
+
+from utils.helpers import wrap_error, normalize_date
+from utils.profiles import archive_dir, active_profile
+from core.exceptions import QueryExecutionError
+from features.transactions.model import FINGERPRINT_LOOKUP_SIZE, Transaction
+
+CREATE_TRANSACTION_ARCHIVES_TABLE = """
+    CREATE TABLE IF NOT EXISTS transaction_archives (
+        id INTEGER PRIMARY KEY,
+        year INTEGER NOT NULL,
+        file TEXT NOT NULL,
+        rows INTEGER NOT NULL,
+        archived_at TEXT NOT NULL
+    )
+"""
+
+CREATE_TRANSACTION_ROLLUPS_TABLE = """
+    CREATE TABLE IF NOT EXISTS transaction_rollups (
+        month TEXT NOT NULL,
+        transaction_type TEXT NOT NULL,
+        source_type TEXT NOT NULL,
+        source_id INTEGER NOT NULL,
+        destination_type TEXT NOT NULL,
+        destination_id INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        amount REAL NOT NULL,
+        PRIMARY KEY (
+            month,
+            transaction_type,
+            source_type,
+            source_id,
+            destination_type,
+            destination_id
+        )
+    )
+"""
+
+CREATE_TRANSACTIONS_DATE_INDEX = """
+    CREATE INDEX IF NOT EXISTS idx_transactions_date
+    ON transactions (date)
+"""
+
+# Dates that normalize_date() could not read are never archived
+_ISO_DATE = "date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"
+
+
+def transaction_year(date: object) -> int | None:
+    """Year a transaction dated ``date`` would be archived under."""
+    text = normalize_date(date)
+    if len(text) == 10 and text[:4].isdigit():
+        return int(text[:4])
+    return None
+
+
+def archive_folder(connection: sqlite3.Connection) -> Path:
+    """Archive folder of the ledger ``connection`` is open on.
+
+    In-memory databases belong to no ledger and use the active profile's.
+    """
+    for _, name, file in connection.execute("PRAGMA database_list"):
+        if name == "main" and file:
+            return archive_dir(Path(file))
+    return active_profile().archive_dir
+
+
+class TransactionArchive:
+    """Transactions from past years, moved out into one file per year.
+
+    Archived rows leave the main database, which keeps a monthly rollup
+    of them and a record of every archive run. Queries attach only the
+    archives whose years overlap the requested dates.
+
+    Rows are copied into the archive and committed before they are
+    deleted from the main database. A run that stops between the two
+    leaves rows in both; they are ignored by queries, because the run was
+    never recorded, and cleared by the next run.
+    """
+
+    def __init__(
+        self, connection: sqlite3.Connection, folder: Path | None = None
+    ) -> None:
+        self._connection = connection
+        self._folder = folder or archive_folder(connection)
+
+    def archive_before(self, year: int) -> list[dict]:
+        """Move transactions dated before ``year`` into yearly archives."""
+        try:
+            rows = self._connection.execute(
+                "SELECT DISTINCT substr(date, 1, 4) FROM transactions "
+                f"WHERE date < ? AND {_ISO_DATE} ORDER BY 1",
+                (f"{year:04d}-01-01",),
+            ).fetchall()
+            return [self._archive_year(int(row[0])) for row in rows]
+        except sqlite3.Error as e:
+            self._connection.rollback()
+            wrapper = wrap_error(
+                QueryExecutionError, "Failed to archive transactions"
+            )
+            raise wrapper(e) from e
+
+    def years(self) -> list[int]:
+        rows = self._connection.execute(
+            "SELECT DISTINCT year FROM transaction_archives ORDER BY year"
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def query(
+        self, start: str | None = None, end: str | None = None
+    ) -> list[dict]:
+        """Transactions dated from ``start`` to ``end`` inclusive.
+
+        Either bound may be omitted. Rows are ordered by date, then id.
+        """
+        start = normalize_date(start) if start else None
+        end = normalize_date(end) if end else None
+        first = int(start[:4]) if start else None
+        last = int(end[:4]) if end else None
+        years = [
+            year
+            for year in self.years()
+            if (first is None or year >= first)
+            and (last is None or year <= last)
+        ]
+
+        conditions, params = [], []
+        if start:
+            conditions.append("date >= ?")
+            params.append(start)
+        if end:
+            conditions.append("date <= ?")
+            params.append(end)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        try:
+            columns = self._columns("main", "transaction_details")
+            records = self._select("main", columns, where, params)
+            records.extend(self._search(years, where, params))
+        except sqlite3.Error as e:
+            wrapper = wrap_error(
+                QueryExecutionError, "Failed to query transactions"
+            )
+            raise wrapper(e) from e
+
+        records.sort(key=lambda record: (record["date"], record["id"]))
+        model = Transaction(self._connection)
+        return [model._visible(record) for record in records]
+
+    def iter_batches(self, batch_size: int) -> Iterator[list[dict]]:
+        """Every transaction, archived years first, in batches.
+
+        Archives are attached one year at a time, so a full export reads
+        them without holding more than one batch in memory.
+        """
+        model = Transaction(self._connection)
+        columns = self._columns("main", "transaction_details")
+        for year in self.years():
+            file = self._file(year)
+            if not file.exists():
+                continue
+            schema = f"archive_{year}"
+            self._connection.execute(
+                "ATTACH DATABASE ? AS " + schema, (str(file),)
+            )
+            cursor = self._connection.cursor()
+            try:
+                source, selected = self._archived(schema, columns)
+                cursor.execute(
+                    f"SELECT {selected} FROM {source} "  # noqa: S608
+                    "WHERE t.archive_run IN "
+                    "(SELECT id FROM main.transaction_archives) ORDER BY t.id"
+                )
+                while rows := cursor.fetchmany(batch_size):
+                    yield [
+                        model._visible(dict(zip(columns, row))) for row in rows
+                    ]
+            except sqlite3.Error as e:
+                wrapper = wrap_error(
+                    QueryExecutionError, "Failed to read archived transactions"
+                )
+                raise wrapper(e) from e
+            finally:
+                cursor.close()
+                self._connection.execute(f"DETACH DATABASE {schema}")
+        yield from model.iter_batches(batch_size)
+
+    def archived_fingerprints(
+        self, fingerprints: Iterable[str], years: Iterable[int | None]
+    ) -> set[str]:
+        """Which of ``fingerprints`` are archived in one of ``years``.
+
+        Imports look these up inside their own transaction, where archives
+        cannot be attached, so each file is read on its own connection.
+        """
+        fingerprints, years = list(fingerprints), set(years)
+        wanted = [year for year in self.years() if year in years]
+        if not fingerprints or not wanted:
+            return set()
+
+        found: set[str] = set()
+        try:
+            for year in wanted:
+                runs = [
+                    row[0]
+                    for row in self._connection.execute(
+                        "SELECT id FROM transaction_archives WHERE year = ?",
+                        (year,),
+                    )
+                ]
+                found |= self._fingerprints_in(year, fingerprints, runs)
+        except sqlite3.Error as e:
+            wrapper = wrap_error(
+                QueryExecutionError, "Failed to look up archived transactions"
+            )
+            raise wrapper(e) from e
+        return found
+
+    def get_by_idempotency_key(self, key: str, date: object) -> dict | None:
+        """The archived transaction logged with ``key``, if any.
+
+        Only the archive for the year of ``date`` is searched; a repeated
+        request carries the date of the original.
+        """
+        year = transaction_year(date)
+        if year not in self.years():
+            return None
+        try:
+            records = self._search(
+                [year], "WHERE t.idempotency_key = ?", [key]
+            )
+        except sqlite3.Error as e:
+            wrapper = wrap_error(
+                QueryExecutionError, "Failed to look up archived transactions"
+            )
+            raise wrapper(e) from e
+        if not records:
+            return None
+        return Transaction(self._connection)._visible(records[0])
+
+    def mark_archived_accounts(self) -> None:
+        """Flag the accounts that archived transactions refer to.
+
+        Archives written before the catalog kept this flag are read once.
+        """
+        accounts: set[int] = set()
+        try:
+            for year in self.years():
+                accounts |= self._accounts_in(year)
+            self._connection.executemany(
+                "UPDATE accounts SET archived = 1 WHERE id = ?",
+                [(account,) for account in accounts],
+            )
+        except sqlite3.Error as e:
+            wrapper = wrap_error(
+                QueryExecutionError, "Failed to read archived accounts"
+            )
+            raise wrapper(e) from e
+
+    def rollups(
+        self, start: str | None = None, end: str | None = None
+    ) -> list[dict]:
+        """Monthly totals of archived transactions, by type and accounts."""
+        conditions, params = [], []
+        if start:
+            conditions.append("month >= ?")
+            params.append(normalize_date(start)[:7])
+        if end:
+            conditions.append("month <= ?")
+            params.append(normalize_date(end)[:7])
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor = self._connection.execute(
+            f"SELECT * FROM transaction_rollups {where} "  # noqa: S608
+            "ORDER BY month, transaction_type",
+            params,
+        )
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def _file(self, year: int) -> Path:
+        return self._folder / f"{year:04d}.db"
+
+    def _archive_year(self, year: int) -> dict:
+        self._folder.mkdir(parents=True, exist_ok=True)
+        file = self._file(year)
+        schema = f"archive_{year}"
+        in_year = (
+            f"WHERE date >= '{year:04d}-01-01' "
+            f"AND date < '{year + 1:04d}-01-01' AND {_ISO_DATE}"
+        )
+        rows = f"FROM main.transactions {in_year}"
+        cursor = self._connection.cursor()
+        cursor.execute("ATTACH DATABASE ? AS " + schema, (str(file),))
+        try:
+            self._prepare(schema)
+            run = cursor.execute(
+                "SELECT IFNULL(MAX(id), 0) + 1 FROM transaction_archives"
+            ).fetchone()[0]
+            columns = ", ".join(self._columns("main"))
+
+            # Copied rows are committed to the archive first
+            cursor.execute(
+                f"DELETE FROM {schema}.transactions "  # noqa: S608
+                "WHERE archive_run NOT IN "
+                "(SELECT id FROM main.transaction_archives)"
+            )
+            cursor.execute(
+                f"INSERT INTO {schema}.transactions "  # noqa: S608
+                f"({columns}, archive_run) SELECT {columns}, ? {rows}",
+                (run,),
+            )
+            self._connection.commit()
+
+            seq = cursor.execute(
+                "SELECT IFNULL(MAX(seq), 0) FROM change_log"
+            ).fetchone()[0]
+            cursor.execute(
+                "INSERT INTO transaction_rollups "  # noqa: S608
+                "SELECT substr(date, 1, 7), transaction_type, "
+                "IFNULL(source_type, ''), IFNULL(source_id, 0), "
+                "IFNULL(destination_type, ''), IFNULL(destination_id, 0), "
+                "COUNT(*), SUM(amount) FROM main.transaction_details "
+                f"{in_year} GROUP BY 1, 2, 3, 4, 5, 6 "
+                "ON CONFLICT DO UPDATE SET "
+                "count = count + excluded.count, "
+                "amount = amount + excluded.amount"
+            )
+            # Accounts closed later are then kept for the archived rows
+            cursor.execute(
+                "UPDATE main.accounts SET archived = 1 "  # noqa: S608
+                f"WHERE NOT archived AND id IN (SELECT source_account_id "
+                f"{rows} UNION SELECT destination_account_id {rows})"
+            )
+            cursor.execute(f"DELETE {rows}")
+            moved = cursor.rowcount
+            # Archived rows still exist, so incremental exports should not
+            # see them as deleted.
+            cursor.execute(
+                "DELETE FROM change_log WHERE table_name = 'transactions' "
+                "AND op = 'delete' AND seq > ?",
+                (seq,),
+            )
+            cursor.execute(
+                "INSERT INTO transaction_archives "
+                "(id, year, file, rows, archived_at) VALUES (?, ?, ?, ?, ?)",
+                (
+                    run,
+                    year,
+                    file.name,
+                    moved,
+                    datetime.now().isoformat(timespec="seconds"),
+                ),
+            )
+            self._connection.commit()
+        finally:
+            self._connection.rollback()
+            cursor.execute(f"DETACH DATABASE {schema}")
+
+        return {"year": year, "file": file, "rows": moved}
+
+    def _prepare(self, schema: str) -> None:
+        cursor = self._connection.cursor()
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {schema}.transactions AS "  # noqa: S608
+            "SELECT *, 0 AS archive_run FROM main.transactions WHERE 0"
+        )
+        # Columns added to the main table since the archive was created
+        existing = set(self._columns(schema))
+        for column in self._columns("main"):
+            if column not in existing:
+                cursor.execute(
+                    f"ALTER TABLE {schema}.transactions ADD COLUMN {column}"
+                )
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {schema}.idx_transactions_date "
+            "ON transactions (date)"
+        )
+
+    def _columns(self, schema: str, table: str = "transactions") -> list[str]:
+        rows = self._connection.execute(
+            f"PRAGMA {schema}.table_info({table})"
+        ).fetchall()
+        return [row[1] for row in rows if row[1] != "archive_run"]
+
+    def _fingerprints_in(
+        self, year: int, fingerprints: list[str], runs: list[int]
+    ) -> set[str]:
+        file = self._file(year)
+        if not file.exists() or not runs:
+            return set()
+        found = set()
+        archive = self._open_read_only(file)
+        try:
+            for start in range(0, len(fingerprints), FINGERPRINT_LOOKUP_SIZE):
+                group = fingerprints[start : start + FINGERPRINT_LOOKUP_SIZE]
+                rows = archive.execute(
+                    "SELECT fingerprint FROM transactions "  # noqa: S608
+                    f"WHERE fingerprint IN ({', '.join('?' for _ in group)}) "
+                    f"AND archive_run IN ({', '.join('?' for _ in runs)})",
+                    [*group, *runs],
+                )
+                found.update(row[0] for row in rows)
+        finally:
+            archive.close()
+        return found
+
+    def _accounts_in(self, year: int) -> set[int]:
+        file = self._file(year)
+        if not file.exists():
+            return set()
+        archive = self._open_read_only(file)
+        try:
+            present = {
+                row[1]
+                for row in archive.execute("PRAGMA table_info(transactions)")
+            }
+            # Older archives kept account names rather than catalog ids
+            roles = [
+                f"SELECT {role}_account_id FROM transactions"
+                for role in ("source", "destination")
+                if f"{role}_account_id" in present
+            ]
+            if not roles:
+                return set()
+            rows = archive.execute(" UNION ".join(roles))
+            return {row[0] for row in rows if row[0] is not None}
+        finally:
+            archive.close()
+
+    def _open_read_only(self, file: Path) -> sqlite3.Connection:
+        return sqlite3.connect(f"{file.as_uri()}?mode=ro", uri=True)
+
+    def _search(
+        self, years: list[int], where: str, params: list
+    ) -> list[dict]:
+        columns = self._columns("main", "transaction_details")
+        # One slot is left for any database the caller attached
+        size = max(
+            self._connection.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED) - 1, 1
+        )
+        records = []
+        for index in range(0, len(years), size):
+            records.extend(
+                self._query_archives(
+                    years[index : index + size], columns, where, params
+                )
+            )
+        return records
+
+    def _query_archives(
+        self, years: list[int], columns: list[str], where: str, params: list
+    ) -> list[dict]:
+        cursor = self._connection.cursor()
+        attached = []
+        try:
+            for year in years:
+                if not self._file(year).exists():
+                    continue
+                schema = f"archive_{year}"
+                cursor.execute(
+                    "ATTACH DATABASE ? AS " + schema, (str(self._file(year)),)
+                )
+                attached.append(schema)
+            records = []
+            for schema in attached:
+                records.extend(
+                    self._select(
+                        schema,
+                        columns,
+                        f"{where} {'AND' if where else 'WHERE'} t.archive_run "
+                        "IN (SELECT id FROM main.transaction_archives)",
+                        params,
+                    )
+                )
+            return records
+        finally:
+            for schema in attached:
+                cursor.execute(f"DETACH DATABASE {schema}")
+
+    def _select(
+        self, schema: str, columns: list[str], where: str, params: list
+    ) -> list[dict]:
+        if schema == "main":
+            source = "main.transaction_details"
+            selected = ", ".join(columns)
+        else:
+            source, selected = self._archived(schema, columns)
+        cursor = self._connection.execute(
+            f"SELECT {selected} FROM {source} {where}",  # noqa: S608
+            params,
+        )
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def _archived(self, schema: str, columns: list[str]) -> tuple[str, str]:
+        # Archives from before accounts were referenced by id kept their
+        # names on each row; later ones are joined to the main catalog
+        present = set(self._columns(schema))
+        source = f"{schema}.transactions t"
+        joined = {}
+        for role, alias in (("source", "s"), ("destination", "d")):
+            if f"{role}_account_id" not in present:
+                continue
+            source += (
+                f" LEFT JOIN main.accounts {alias} "
+                f"ON {alias}.id = t.{role}_account_id "
+                f"LEFT JOIN main.account_types {alias}t "
+                f"ON {alias}t.code = {alias}.type_code"
+            )
+            joined[f"{role}_provider"] = (
+                f"CASE WHEN IFNULL({alias}.alias, '') = '' "
+                f"THEN {alias}.provider ELSE {alias}.provider || ' (' || "
+                f"{alias}.alias || ')' END"
+            )
+            joined[f"{role}_type"] = f"{alias}t.name"
+            joined[f"{role}_id"] = f"{alias}.type_id"
+
+        expressions = []
+        for column in columns:
+            stored = f"t.{column}" if column in present else "NULL"
+            if column in joined:
+                stored = f"COALESCE({stored}, {joined[column]})"
+            expressions.append(f"{stored} AS {column}")
+        return source, ", ".join(expressions)
@@ -0,0 +1,133 @@
+import shutil
+import sqlite3
+import tempfile
+
+from pathlib import Path
+from datetime import datetime
+
+from utils.helpers import wrap_error
+from core.exceptions import BackupError
+from core.file_io import open_binary, detect_compression
+from utils.constants import (
+    COMPRESSIONS,
+    BACKUP_PAGES,
+    BACKUP_SLEEP,
+    BACKUP_PREFIX,
+)
+
+
+def backup_path(folder: Path, compression: str | None = None) -> Path:
+    """Return a timestamped backup path in ``folder`` not already taken."""
+    stamp = datetime.now().strftime("%Y-%m-%d-%H%M%S")
+    suffix = COMPRESSIONS.get(compression or "", "")
+    target = folder / f"{BACKUP_PREFIX}{stamp}.db{suffix}"
+    count = 0
+    while target.exists():
+        count += 1
+        target = folder / f"{BACKUP_PREFIX}{stamp}-{count}.db{suffix}"
+    return target
+
+
+def check_integrity(connection: sqlite3.Connection) -> None:
+    rows = connection.execute("PRAGMA integrity_check").fetchall()
+    if rows != [("ok",)]:
+        problems = "; ".join(row[0] for row in rows[:5])
+        raise BackupError(f"Integrity check failed: {problems}")
+
+
+def backup_database(
+    connection: sqlite3.Connection,
+    target: Path,
+    compression: str | None = None,
+    level: int | None = None,
+    pages: int = BACKUP_PAGES,
+) -> dict:
+    """Copy a live database to ``target`` and verify the copy.
+
+    Pages are copied ``pages`` at a time, so writers on other connections
+    only wait for one step rather than the whole copy. A write between
+    steps restarts the copy from a consistent point, which SQLite handles.
+    The copy is checked before it is renamed into place.
+    """
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=target.parent) as folder:
+        copy_path = Path(folder) / "backup.db"
+        copy = sqlite3.connect(copy_path)
+        try:
+            connection.backup(copy, pages=pages, sleep=BACKUP_SLEEP)
+            # A single self-contained file, even if the source uses WAL
+            copy.execute("PRAGMA journal_mode=DELETE")
+            check_integrity(copy)
+            page_count = copy.execute("PRAGMA page_count").fetchone()[0]
+        except sqlite3.Error as e:
+            wrapper = wrap_error(BackupError, "Failed to back up database")
+            raise wrapper(e) from e
+        finally:
+            copy.close()
+
+        staged = Path(folder) / target.name
+        if compression:
+            with (
+                copy_path.open("rb") as src,
+                open_binary(staged, "w", compression, level) as dst,
+            ):
+                shutil.copyfileobj(src, dst)
+        else:
+            copy_path.replace(staged)
+        staged.replace(target)
+
+    return {
+        "file": target,
+        "pages": page_count,
+        "bytes": target.stat().st_size,
+    }
+
+
+def restore_database(connection: sqlite3.Connection, source: Path) -> dict:
+    """Replace the database behind ``connection`` with a backup.
+
+    The backup is decompressed and checked first; the copy into the live
+    database then happens in one step, so other connections see either
+    the old data or the restored data, never a mix.
+    """
+    compression = detect_compression(source)
+    with tempfile.TemporaryDirectory() as folder:
+        copy_path = Path(folder) / "restore.db"
+        with (
+            open_binary(source, "r", compression) as src,
+            copy_path.open("wb") as dst,
+        ):
+            shutil.copyfileobj(src, dst)
+
+        copy = sqlite3.connect(copy_path)
+        try:
+            check_integrity(copy)
+            copy.backup(connection)
+            page_count = copy.execute("PRAGMA page_count").fetchone()[0]
+        except sqlite3.Error as e:
+            wrapper = wrap_error(
+                BackupError, f"Failed to restore {source.name}"
+            )
+            raise wrapper(e) from e
+        finally:
+            copy.close()
+
+    return {"file": source, "pages": page_count}
+
+
+def rotate_backups(folder: Path, keep: int) -> list[Path]:
+    """Delete all but the newest ``keep`` backups in a folder."""
+    # Oldest first by modification time; names written within the same
+    # second do not sort in the order they were made.
+    backups = sorted(
+        (
+            path
+            for path in folder.glob(f"{BACKUP_PREFIX}*.db*")
+            if path.is_file()
+        ),
+        key=lambda path: (path.stat().st_mtime_ns, path.name),
+    )
+    removed = backups[: max(len(backups) - keep, 0)]
+    for path in removed:
+        path.unlink()
+    return removed
@@ -1,16 +1,40 @@
 import sqlite3
 
+from datetime import datetime
+from typing import Iterable, Iterator
+
 from utils.types import TableName
 from utils.helpers import wrap_error
+from utils.constants import NATURAL_KEYS, TYPE_CONFIG
 from core.exceptions import (
     ValidationError,
+    WriteConflictError,
     ColumnMismatchError,
     QueryExecutionError,
     RecordNotFoundError,
 )
+from core.busy import retry_busy
+from core.unit_of_work import commit, rollback
+from core.accounts_catalog import AccountCatalog
+
+# SQLite's default limit on bound parameters is 999 on older builds
+LOOKUP_SIZE = 500
+
+# Tables with this column are updated optimistically: every write bumps
+# it, and an update only applies to the version it read.
+VERSION_COLUMN = "version"
+
+# Tables with this column keep closed records that transactions refer to,
+# hidden from everything but the transactions' history.
+CLOSED_COLUMN = "closed_at"
 
 
 class Table:
+    # Bookkeeping columns kept out of listings and exports
+    hidden_columns: tuple[str, ...] = ()
+    # Table or view records are read from, if not the table itself
+    read_from: str | None = None
+
     def __init__(
         self, connection: sqlite3.Connection, table_name: TableName
     ) -> None:
@@ -20,37 +44,83 @@ class Table:
 
         self._cursor.execute(f"PRAGMA table_info({self._table_name.value})")
         self.table_schema = self._cursor.fetchall()
+        self.versioned = any(
+            row[1] == VERSION_COLUMN for row in self.table_schema
+        )
+        self.closable = any(
+            row[1] == CLOSED_COLUMN for row in self.table_schema
+        )
         self.table_columns = [
-            row[1] for row in self.table_schema if row[1] != "id"
+            row[1]
+            for row in self.table_schema
+            if row[1] not in ("id", VERSION_COLUMN, CLOSED_COLUMN)
         ]
+        self._source = self.read_from or table_name.value
+        if self.closable:
+            self._source = (
+                f"(SELECT * FROM {table_name.value} "  # noqa: S608
+                f"WHERE {CLOSED_COLUMN} IS NULL)"
+            )
+            self.hidden_columns = (*self.hidden_columns, CLOSED_COLUMN)
+        # Columns with a default can be left out
         self.required_columns = [
-            col[1] for col in self.table_schema if col[3] == 1
+            col[1]
+            for col in self.table_schema
+            if col[3] == 1 and col[4] is None
         ]
 
     def get_one(self, id: int) -> list[dict[str, str]]:
+        return [self._visible(self._fetch_one(id))]
+
+    def _fetch_one(self, id: int) -> dict[str, str]:
         try:
             self._cursor.execute(
-                f"SELECT * FROM {self._table_name.value} WHERE id = ?",  # noqa: S608
+                f"SELECT * FROM {self._source} WHERE id = ?",  # noqa: S608
                 (id,),
             )
             row = self._cursor.fetchone()
             if not row:
                 raise RecordNotFoundError(f"Record with ID {id} does not exist")
-            return [self._row_to_dict(row)]
+            return self._row_to_dict(row)
         except sqlite3.Error as e:
             wrapper = wrap_error(QueryExecutionError, "Failed to fetch record")
             raise wrapper(e) from e
 
     def get_many(self) -> list[dict[str, str]]:
         try:
-            self._cursor.execute(f"SELECT * FROM {self._table_name.value}")  # noqa: S608
+            self._cursor.execute(f"SELECT * FROM {self._source}")  # noqa: S608
             rows = self._cursor.fetchall()
-            return [self._row_to_dict(row) for row in rows]
+            return [self._visible(self._row_to_dict(row)) for row in rows]
         except sqlite3.Error as e:
             wrapper = wrap_error(QueryExecutionError, "Failed to fetch records")
             raise wrapper(e) from e
 
-    def _create(self, data: dict[str, str]) -> None:
+    def iter_batches(
+        self, batch_size: int, include_closed: bool = False
+    ) -> Iterator[list[dict[str, str]]]:
+        # Uses its own cursor so the model can still be queried while a
+        # stream is being consumed. Closed records, when included, come
+        # with the time they were closed.
+        source, hidden = self._source, self.hidden_columns
+        if include_closed and self.closable:
+            source = self._table_name.value
+            hidden = tuple(col for col in hidden if col != CLOSED_COLUMN)
+        cursor = self._connection.cursor()
+        try:
+            cursor.execute(f"SELECT * FROM {source} ORDER BY id")  # noqa: S608
+            column_names = [column[0] for column in cursor.description]
+            while rows := cursor.fetchmany(batch_size):
+                yield [
+                    self._visible(dict(zip(column_names, row)), hidden)
+                    for row in rows
+                ]
+        except sqlite3.Error as e:
+            wrapper = wrap_error(QueryExecutionError, "Failed to fetch records")
+            raise wrapper(e) from e
+        finally:
+            cursor.close()
+
+    def _create(self, data: dict[str, str]) -> int:
         self._validate_data(data)
 
         placeholders = ", ".join("?" for _ in self.table_columns)
@@ -63,15 +133,136 @@ class Table:
 
         try:
             self._execute_query(query, values)
-            self._connection.commit()
+            commit(self._connection)
         except sqlite3.Error as e:
             wrapper = wrap_error(QueryExecutionError, "Failed to create record")
             raise wrapper(e) from e
+        return self._cursor.lastrowid
+
+    def _create_many(self, rows: Iterable[dict[str, str]]) -> int:
+        # All rows are validated before anything is written so a chunk is
+        # either inserted in full, in one transaction, or not at all.
+        values = []
+        for data in rows:
+            self._validate_data(data)
+            values.append(tuple(data.get(col) for col in self.table_columns))
+
+        placeholders = ", ".join("?" for _ in self.table_columns)
+        col_list = ", ".join(self.table_columns)
+        query = (
+            f"INSERT INTO {self._table_name.value} ({col_list}) "
+            f"VALUES({placeholders})"
+        )
+
+        try:
+            self._execute_many(query, values)
+            commit(self._connection)
+        except sqlite3.Error as e:
+            rollback(self._connection)
+            wrapper = wrap_error(
+                QueryExecutionError, "Failed to create records"
+            )
+            raise wrapper(e) from e
+        return len(values)
+
+    def _upsert_many(self, rows: Iterable[dict[str, str]]) -> int:
+        # Rows carrying an id are matched on it; the rest on the table's
+        # natural key, looked up per chunk. Matches are updated in place,
+        # others inserted.
+        rows = list(rows)
+        for data in rows:
+            self._validate_data(data)
+
+        key_columns = NATURAL_KEYS[self._table_name]
+        matches = self._ids_by_natural_key(
+            {data[key_columns[0]] for data in rows if data.get("id") is None}
+        )
+
+        by_id: dict[int, tuple] = {}
+        new: dict[tuple, tuple] = {}
+        for data in rows:
+            values = tuple(data.get(col) for col in self.table_columns)
+            if data.get("id") is not None:
+                by_id[data["id"]] = values
+                continue
+            key = self._natural_key(data)
+            ids = matches.get(key, [])
+            if len(ids) > 1:
+                raise QueryExecutionError(
+                    f"Failed to upsert records: {' / '.join(map(str, key))} "
+                    f"matches {len(ids)} records; include an id to choose "
+                    "one."
+                )
+            if ids:
+                by_id[ids[0]] = values
+            else:
+                # A key repeated within the file updates its own insert
+                new[key] = values
+
+        table = self._table_name.value
+        columns = ", ".join(self.table_columns)
+        placeholders = ", ".join("?" for _ in self.table_columns)
+        assignments = ", ".join(
+            [f"{col} = excluded.{col}" for col in self.table_columns]
+            + self._version_bump()
+        )
+        try:
+            if new:
+                self._execute_many(
+                    f"INSERT INTO {table} ({columns}) VALUES({placeholders})",
+                    list(new.values()),
+                )
+            if by_id:
+                self._execute_many(
+                    f"INSERT INTO {table} (id, {columns}) "
+                    f"VALUES(?, {placeholders}) "
+                    f"ON CONFLICT(id) DO UPDATE SET {assignments}",
+                    [(id, *values) for id, values in by_id.items()],
+                )
+            commit(self._connection)
+        except sqlite3.Error as e:
+            rollback(self._connection)
+            wrapper = wrap_error(
+                QueryExecutionError, "Failed to upsert records"
+            )
+            raise wrapper(e) from e
+        return len(rows)
+
+    def _natural_key(self, data: dict) -> tuple:
+        # A missing alias and an empty one name the same account
+        return tuple(
+            data.get(col) or "" for col in NATURAL_KEYS[self._table_name]
+        )
+
+    def _ids_by_natural_key(self, providers: set) -> dict[tuple, list[int]]:
+        key_columns = NATURAL_KEYS[self._table_name]
+        found: dict[tuple, list[int]] = {}
+        providers_list = list(providers)
+        try:
+            for start in range(0, len(providers_list), LOOKUP_SIZE):
+                group = providers_list[start : start + LOOKUP_SIZE]
+                self._cursor.execute(
+                    f"SELECT id, {', '.join(key_columns)} "  # noqa: S608
+                    f"FROM {self._source} "
+                    f"WHERE {key_columns[0]} IN "
+                    f"({', '.join('?' for _ in group)}) ORDER BY id",
+                    group,
+                )
+                for id, *key in self._cursor.fetchall():
+                    found.setdefault(
+                        tuple(value or "" for value in key), []
+                    ).append(id)
+        except sqlite3.Error as e:
+            wrapper = wrap_error(
+                QueryExecutionError, "Failed to look up records"
+            )
+            raise wrapper(e) from e
+        return found
 
     def exists(self, id: int) -> bool:
         try:
             self._cursor.execute(
-                f"SELECT 1 FROM {self._table_name.value} WHERE id = ?",  # noqa: S608
+                f"SELECT 1 FROM {self._source} WHERE id = ?",  # noqa: S608
                 (id,),
             )
             return self._cursor.fetchone() is not None
@@ -79,7 +270,19 @@ class Table:
             wrapper = wrap_error(QueryExecutionError, "Failed to lookup record")
             raise wrapper(e) from e
 
-    def _update(self, id: int, data: dict[str, str]) -> None:
+    def _update(
+        self,
+        id: int,
+        data: dict[str, str],
+        expected_version: int | None = None,
+    ) -> None:
+        """Write ``data`` over a record, keeping fields given as None.
+
+        On a versioned table the write only applies if the record is still
+        at the version it was read at, or at ``expected_version`` if one
+        is given; otherwise WriteConflictError is raised and nothing is
+        written.
+        """
         if not self.exists(id):
             raise RecordNotFoundError(f"Record with ID {id} does not exist")
 
@@ -89,24 +292,52 @@ class Table:
         if not update_columns:
             raise ValidationError("Provided fields do not match database")
 
-        current = self.get_one(id)
+        current = self._fetch_one(id)
 
         values = tuple(
-            data[col] if data[col] is not None else current[0][col]
+            data[col] if data[col] is not None else current[col]
             for col in update_columns
         )
-        assignments = ", ".join(f"{col} = ?" for col in update_columns)
+        assignments = ", ".join(
+            [f"{col} = ?" for col in update_columns] + self._version_bump()
+        )
         query = (
             f"UPDATE {self._table_name.value} SET {assignments} WHERE id = ?"  # noqa: S608
         )
+        params: tuple = (*values, id)
+
+        if self.versioned:
+            version = current[VERSION_COLUMN]
+            if expected_version is None:
+                expected_version = version
+            if int(expected_version) != version:
+                raise WriteConflictError(
+                    f"Record with ID {id} is at version {version}, not "
+                    f"{expected_version}; it was changed by someone else. "
+                    "Reload it and try again."
+                )
+            query += f" AND {VERSION_COLUMN} = ?"
+            params = (*params, version)
 
         try:
-            self._execute_query(query, (*values, id))
-            self._connection.commit()
+            self._execute_query(query, params)
         except sqlite3.Error as e:
             wrapper = wrap_error(QueryExecutionError, "Failed to update record")
             raise wrapper(e) from e
 
+        if self._cursor.rowcount == 0:
+            rollback(self._connection)
+            raise WriteConflictError(
+                f"Record with ID {id} was changed by someone else while it "
+                "was being updated. Reload it and try again."
+            )
+        commit(self._connection)
+
+    def _version_bump(self) -> list[str]:
+        if not self.versioned:
+            return []
+        return [f"{VERSION_COLUMN} = {VERSION_COLUMN} + 1"]
+
     def _delete(self, id: int) -> None:
         if not self.exists(id):
             raise RecordNotFoundError(f"Record with ID {id} does not exist")
@@ -114,11 +345,40 @@ class Table:
         query = f"DELETE FROM {self._table_name.value} WHERE id = ?"  # noqa: S608
         try:
             self._execute_query(query, (id,))
-            self._connection.commit()
+            commit(self._connection)
         except sqlite3.Error as e:
             wrapper = wrap_error(QueryExecutionError, "Failed to delete record")
             raise wrapper(e) from e
 
+    def _close(self, id: int) -> None:
+        """Delete a record, or mark it closed if transactions refer to it."""
+        if not self.exists(id):
+            raise RecordNotFoundError(f"Record with ID {id} does not exist")
+
+        catalog = AccountCatalog(self._connection)
+        account = catalog.resolve(
+            TYPE_CONFIG[self._table_name]["display_name"], id
+        )
+        history = account is not None and catalog.has_history(account)
+        if not (self.closable and history):
+            self._delete(id)
+            return
+
+        assignments = ", ".join(
+            [f"{CLOSED_COLUMN} = ?"] + self._version_bump()
+        )
+        query = (
+            f"UPDATE {self._table_name.value} SET {assignments} WHERE id = ?"  # noqa: S608
+        )
+        try:
+            self._execute_query(
+                query, (datetime.now().isoformat(timespec="seconds"), id)
+            )
+            commit(self._connection)
+        except sqlite3.Error as e:
+            wrapper = wrap_error(QueryExecutionError, "Failed to close record")
+            raise wrapper(e) from e
+
     def _row_to_dict(self, row: sqlite3.Row) -> dict[str, str]:
         column_names = [column[0] for column in self._cursor.description]
         if len(column_names) != len(row):
@@ -128,6 +388,18 @@ class Table:
             )
         return dict(zip(column_names, row))
 
+    def _visible(
+        self,
+        record: dict[str, str],
+        hidden: tuple[str, ...] | None = None,
+    ) -> dict[str, str]:
+        hidden = self.hidden_columns if hidden is None else hidden
+        if not hidden:
+            return record
+        return {
+            key: value for key, value in record.items() if key not in hidden
+        }
+
     def _validate_data(self, data: dict[str, str]) -> None:
         missing_fields = [
             field
@@ -141,11 +413,18 @@ class Table:
 
     def _execute_query(self, query: str, params: tuple = ()) -> None:
         try:
-            self._cursor.execute(query, params)
+            retry_busy(
+                self._connection, lambda: self._cursor.execute(query, params)
+            )
         except sqlite3.Error as e:
             wrapper = wrap_error(QueryExecutionError, "Database error")
             raise wrapper(e) from e
 
+    def _execute_many(self, query: str, values: list[tuple]) -> None:
+        retry_busy(
+            self._connection, lambda: self._cursor.executemany(query, values)
+        )
+
     def _get_balance(self, id: int) -> float:
         record = self.get_one(id)
         balance = record[0].get("balance")
@@ -0,0 +1,93 @@
+import time
+import random
+import sqlite3
+
+from typing import TypeVar, Callable
+
+from utils.constants import BUSY_RETRIES, BUSY_TIMEOUT, BUSY_RETRY_DELAY
+
+T = TypeVar("T")
+
+_busy_timeout = BUSY_TIMEOUT
+
+
+class LockStats:
+    """Time this process spent waiting on other connections' locks."""
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.acquisitions = 0
+        self.waited = 0.0
+        self.longest = 0.0
+        self.retries = 0
+        self.slept = 0.0
+        self.failures = 0
+
+    def record_wait(self, seconds: float) -> None:
+        self.acquisitions += 1
+        self.waited += seconds
+        self.longest = max(self.longest, seconds)
+
+    def as_dict(self) -> dict:
+        return {
+            "acquisitions": self.acquisitions,
+            "waited": self.waited,
+            "longest": self.longest,
+            "retries": self.retries,
+            "slept": self.slept,
+            "failures": self.failures,
+        }
+
+
+lock_stats = LockStats()
+
+
+def busy_timeout() -> float:
+    return _busy_timeout
+
+
+def set_busy_timeout(seconds: float) -> None:
+    global _busy_timeout
+    _busy_timeout = max(seconds, 0.0)
+
+
+def is_busy(error: Exception) -> bool:
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    # Extended codes, such as SQLITE_BUSY_SNAPSHOT, share the low byte
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    return "locked" in str(error) or "busy" in str(error)
+
+
+def retry_busy(
+    connection: sqlite3.Connection,
+    operation: Callable[[], T],
+    attempts: int = BUSY_RETRIES,
+    delay: float = BUSY_RETRY_DELAY,
+) -> T:
+    """Run ``operation``, retrying while the database is busy.
+
+    Each retry waits a random time of up to ``delay`` doubled per attempt,
+    so writers queued behind the same lock do not all retry at once. An
+    operation that changed rows before failing is not retried, since
+    running it again would repeat those changes.
+    """
+    for attempt in range(max(attempts, 1)):
+        changes = connection.total_changes
+        try:
+            return operation()
+        except sqlite3.OperationalError as e:
+            last = attempt >= attempts - 1
+            if not is_busy(e) or last or connection.total_changes != changes:
+                if is_busy(e):
+                    lock_stats.failures += 1
+                raise
+        pause = random.uniform(0, delay * 2**attempt)
+        lock_stats.retries += 1
+        lock_stats.slept += pause
+        time.sleep(pause)
+    raise AssertionError("unreachable")
@@ -0,0 +1,215 @@
+import sqlite3
+
+from typing import Iterator
+from datetime import datetime
+
+from utils.types import TableName
+from utils.helpers import wrap_error
+from core.exceptions import QueryExecutionError
+from core.unit_of_work import atomic, commit
+
+CREATE_CHANGE_LOG_TABLE = """
+    CREATE TABLE IF NOT EXISTS change_log (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        op TEXT NOT NULL
+    )
+"""
+
+CREATE_CHANGE_LOG_INDEX = """
+    CREATE INDEX IF NOT EXISTS idx_change_log_table_seq
+    ON change_log (table_name, seq)
+"""
+
+CREATE_EXPORT_WATERMARKS_TABLE = """
+    CREATE TABLE IF NOT EXISTS export_watermarks (
+        destination TEXT NOT NULL,
+        table_name TEXT NOT NULL,
+        seq INTEGER NOT NULL,
+        exported_at TEXT NOT NULL,
+        PRIMARY KEY (destination, table_name)
+    )
+"""
+
+# Tables whose changes are logged, from the start of their first
+# incremental export, before any destination has a watermark for them
+CREATE_CHANGE_TRACKING_TABLE = """
+    CREATE TABLE IF NOT EXISTS change_tracking (
+        table_name TEXT PRIMARY KEY,
+        tracked_at TEXT NOT NULL
+    )
+"""
+
+_TRIGGERS = [
+    ("insert", "INSERT", "NEW"),
+    ("update", "UPDATE", "NEW"),
+    ("delete", "DELETE", "OLD"),
+]
+
+
+def create_change_triggers(cursor: sqlite3.Cursor, table: str) -> None:
+    for op, event, row in _TRIGGERS:
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {table}_log_{op} "
+            f"AFTER {event} ON {table} BEGIN "
+            "INSERT INTO change_log (table_name, row_id, op) "
+            f"VALUES ('{table}', {row}.id, '{op}'); "
+            "END"
+        )
+
+
+def sync_change_triggers(cursor: sqlite3.Cursor) -> None:
+    """Log changes to exactly the tables exported incrementally.
+
+    Writes only pay for the change log once an incremental export has
+    started from their table. Tracked tables get their triggers back if
+    they are missing.
+    """
+    cursor.execute(
+        "SELECT table_name FROM change_tracking "
+        "UNION SELECT table_name FROM export_watermarks"
+    )
+    tracked = {row[0] for row in cursor.fetchall()}
+    for table_name in TableName:
+        table = table_name.value
+        if table in tracked:
+            create_change_triggers(cursor, table)
+            continue
+        for op, _, _ in _TRIGGERS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {table}_log_{op}")
+        cursor.execute("DELETE FROM change_log WHERE table_name = ?", (table,))
+
+
+class ChangeLog:
+    """Rows changed since a destination's last export, by change sequence.
+
+    Once a table has been exported incrementally, triggers append to
+    change_log on every write to it. Each destination keeps a watermark
+    per table; entries below every destination's watermark are pruned
+    once exported.
+    """
+
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self._connection = connection
+        self._cursor = connection.cursor()
+
+    def track(self, table: str) -> None:
+        """Start logging changes to a table for a new destination."""
+        try:
+            # Recorded with the triggers so that other connections opening
+            # the database keep them
+            with atomic(self._connection):
+                self._cursor.execute(
+                    "INSERT OR IGNORE INTO change_tracking "
+                    "(table_name, tracked_at) VALUES (?, ?)",
+                    (table, datetime.now().isoformat(timespec="seconds")),
+                )
+                create_change_triggers(self._cursor, table)
+        except sqlite3.Error as e:
+            wrapper = wrap_error(
+                QueryExecutionError, "Failed to track changes"
+            )
+            raise wrapper(e) from e
+
+    def latest_seq(self) -> int:
+        try:
+            self._cursor.execute("SELECT IFNULL(MAX(seq), 0) FROM change_log")
+            return self._cursor.fetchone()[0]
+        except sqlite3.Error as e:
+            wrapper = wrap_error(
+                QueryExecutionError, "Failed to read change log"
+            )
+            raise wrapper(e) from e
+
+    def get_watermark(self, destination: str, table: str) -> int | None:
+        try:
+            self._cursor.execute(
+                "SELECT seq FROM export_watermarks "
+                "WHERE destination = ? AND table_name = ?",
+                (destination, table),
+            )
+            row = self._cursor.fetchone()
+        except sqlite3.Error as e:
+            wrapper = wrap_error(
+                QueryExecutionError, "Failed to read export watermark"
+            )
+            raise wrapper(e) from e
+        return row[0] if row else None
+
+    def set_watermark(self, destination: str, table: str, seq: int) -> None:
+        try:
+            self._cursor.execute(
+                "INSERT INTO export_watermarks "
+                "(destination, table_name, seq, exported_at) "
+                "VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(destination, table_name) DO UPDATE SET "
+                "seq = excluded.seq, exported_at = excluded.exported_at",
+                (
+                    destination,
+                    table,
+                    seq,
+                    datetime.now().isoformat(timespec="seconds"),
+                ),
+            )
+            self._cursor.execute(
+                "DELETE FROM change_log WHERE table_name = ? AND seq <= ("
+                "SELECT MIN(seq) FROM export_watermarks WHERE table_name = ?"
+                ")",
+                (table, table),
+            )
+            commit(self._connection)
+        except sqlite3.Error as e:
+            wrapper = wrap_error(
+                QueryExecutionError, "Failed to save export watermark"
+            )
+            raise wrapper(e) from e
+
+    def iter_changes(
+        self,
+        table: str,
+        since: int,
+        until: int,
+        batch_size: int,
+        source: str | None = None,
+    ) -> Iterator[list[dict]]:
+        """Yield the latest state of each row changed in (since, until].
+
+        Rows are read from ``source``, a view over the table, if given.
+        Deleted rows come back as tombstones: every column empty apart
+        from the id, with ``_change`` set to "delete".
+        """
+        cursor = self._connection.cursor()
+        try:
+            cursor.execute(
+                f"SELECT c.op, c.row_id, t.* FROM ("  # noqa: S608
+                "SELECT row_id, MAX(seq) AS seq FROM change_log "
+                "WHERE table_name = ? AND seq > ? AND seq <= ? "
+                "GROUP BY row_id"
+                ") latest "
+                "JOIN change_log c ON c.seq = latest.seq "
+                f"LEFT JOIN {source or table} t ON t.id = c.row_id "
+                "ORDER BY c.seq",
+                (table, since, until),
+            )
+            names = [column[0] for column in cursor.description][2:]
+            while rows := cursor.fetchmany(batch_size):
+                yield [self._change(names, row) for row in rows]
+        except sqlite3.Error as e:
+            wrapper = wrap_error(
+                QueryExecutionError, "Failed to read changes"
+            )
+            raise wrapper(e) from e
+        finally:
+            cursor.close()
+
+    def _change(self, names: list[str], row: tuple) -> dict:
+        op, row_id, *values = row
+        record = dict(zip(names, values))
+        if op == "delete" or record.get("id") is None:
+            tombstone = dict.fromkeys(names)
+            tombstone["id"] = row_id
+            tombstone["_change"] = "delete"
+            return tombstone
+        record["_change"] = "upsert"
+        return record
@@ -0,0 +1,116 @@
+import sqlite3
+import hashlib
+
+from pathlib import Path
+from datetime import datetime
+
+from utils.helpers import wrap_error
+from core.exceptions import QueryExecutionError
+from core.unit_of_work import commit
+
+CREATE_IMPORT_CHECKPOINTS_TABLE = """
+    CREATE TABLE IF NOT EXISTS import_checkpoints (
+        fingerprint TEXT NOT NULL,
+        account_type TEXT NOT NULL,
+        file TEXT NOT NULL,
+        rows INTEGER NOT NULL,
+        byte_offset INTEGER,
+        updated_at TEXT NOT NULL,
+        PRIMARY KEY (fingerprint, account_type)
+    )
+"""
+
+# Bytes hashed from each end of a file to identify it
+FINGERPRINT_SAMPLE_SIZE = 1024 * 1024
+
+
+def file_fingerprint(path: Path) -> str:
+    """Identify a file by its size and the bytes at either end.
+
+    Cheap enough for multi-gigabyte files, and stable when the file is
+    renamed or moved between attempts.
+    """
+    size = path.stat().st_size
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with path.open("rb") as f:
+        digest.update(f.read(FINGERPRINT_SAMPLE_SIZE))
+        if size > FINGERPRINT_SAMPLE_SIZE:
+            tail = max(size - FINGERPRINT_SAMPLE_SIZE, FINGERPRINT_SAMPLE_SIZE)
+            f.seek(tail)
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class Checkpoint:
+    """Progress of one account import, saved with each committed chunk.
+
+    Records how many input rows, and for split CSV imports how many
+    bytes, have been written so an interrupted import can pick up from
+    there instead of starting over.
+    """
+
+    def __init__(
+        self, connection: sqlite3.Connection, file: Path, account_type: str
+    ) -> None:
+        self._connection = connection
+        self._cursor = connection.cursor()
+        self.file = file
+        self.account_type = account_type
+        self.fingerprint = file_fingerprint(file)
+
+    def load(self) -> tuple[int, int | None]:
+        """Return the rows and byte offset written so far, if any."""
+        try:
+            self._cursor.execute(
+                "SELECT rows, byte_offset FROM import_checkpoints "
+                "WHERE fingerprint = ? AND account_type = ?",
+                (self.fingerprint, self.account_type),
+            )
+            row = self._cursor.fetchone()
+        except sqlite3.Error as e:
+            wrapper = wrap_error(
+                QueryExecutionError, "Failed to read import checkpoint"
+            )
+            raise wrapper(e) from e
+        return (row[0], row[1]) if row else (0, None)
+
+    def save(self, rows: int, offset: int | None = None) -> None:
+        # Not committed here: callers save inside the atomic block that
+        # writes the chunk, so the checkpoint and the rows land together.
+        try:
+            self._cursor.execute(
+                "INSERT INTO import_checkpoints (fingerprint, account_type, "
+                "file, rows, byte_offset, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(fingerprint, account_type) DO UPDATE SET "
+                "file = excluded.file, rows = excluded.rows, "
+                "byte_offset = excluded.byte_offset, "
+                "updated_at = excluded.updated_at",
+                (
+                    self.fingerprint,
+                    self.account_type,
+                    str(self.file),
+                    rows,
+                    offset,
+                    datetime.now().isoformat(timespec="seconds"),
+                ),
+            )
+        except sqlite3.Error as e:
+            wrapper = wrap_error(
+                QueryExecutionError, "Failed to save import checkpoint"
+            )
+            raise wrapper(e) from e
+
+    def clear(self) -> None:
+        try:
+            self._cursor.execute(
+                "DELETE FROM import_checkpoints "
+                "WHERE fingerprint = ? AND account_type = ?",
+                (self.fingerprint, self.account_type),
+            )
+            commit(self._connection)
+        except sqlite3.Error as e:
+            wrapper = wrap_error(
+                QueryExecutionError, "Failed to clear import checkpoint"
+            )
+            raise wrapper(e) from e
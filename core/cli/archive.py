@@ -0,0 +1,55 @@
+import argparse
+
+from datetime import date
+
+from core.db import get_connection
+from utils.helpers import msg
+from core.archive import TransactionArchive
+from core.exceptions import DatabaseError
+
+
+def register_archive_command(subparsers: argparse._SubParsersAction) -> None:
+    parser = subparsers.add_parser(
+        "archive",
+        help="Move transactions from past years into yearly archive files.",
+    )
+    parser.add_argument(
+        "--before",
+        type=int,
+        default=date.today().year - 1,
+        help=(
+            "Archive transactions dated before this year "
+            "(default: last year, keeping it and this year)"
+        ),
+    )
+    parser.add_argument(
+        "--vacuum",
+        action="store_true",
+        help="Rebuild the main database afterwards to reclaim the space",
+    )
+    parser.set_defaults(func=handle_archive)
+
+
+def handle_archive(args: argparse.Namespace) -> None:
+    conn = get_connection()
+    archive = TransactionArchive(conn)
+
+    try:
+        results = archive.archive_before(args.before)
+    except DatabaseError as e:
+        msg(f"❌ {e}")
+        return
+
+    if not results:
+        msg(f"No transactions dated before {args.before} to archive.")
+        return
+
+    for result in results:
+        msg(
+            f"Archived {result['rows']} transactions from {result['year']} "
+            f"to {result['file']}."
+        )
+
+    if args.vacuum:
+        conn.execute("VACUUM")
+        msg("Reclaimed space in the main database.")
@@ -0,0 +1,155 @@
+import os
+import time
+import argparse
+
+from pathlib import Path
+
+from InquirerPy import inquirer
+
+from core.db import init_schema, get_connection
+from utils.helpers import msg
+from utils.profiles import active_profile
+from core.backup import (
+    backup_path,
+    rotate_backups,
+    backup_database,
+    restore_database,
+)
+from core.file_io import detect_compression
+from utils.constants import COMPRESSIONS, BACKUP_KEEP, BACKUP_PAGES
+
+
+def register_backup_command(subparsers: argparse._SubParsersAction) -> None:
+    parser = subparsers.add_parser(
+        "backup", help="Back up the database while it is in use."
+    )
+    parser.add_argument(
+        "--path",
+        type=str,
+        help=(
+            "Backup file, or directory to write a timestamped backup into "
+            "(default: backups in the profile's data directory)"
+        ),
+    )
+    parser.add_argument(
+        "--compression",
+        type=str,
+        choices=list(COMPRESSIONS),
+        help="Compress the backup. Inferred from a --path suffix if omitted.",
+    )
+    parser.add_argument(
+        "--compression-level",
+        type=int,
+        help="Compression level (gzip/bz2: 1-9, xz: 0-9)",
+    )
+    parser.add_argument(
+        "--keep",
+        type=int,
+        default=BACKUP_KEEP,
+        help=(
+            "Timestamped backups kept in the directory; older ones are "
+            "deleted (0 keeps all)"
+        ),
+    )
+    parser.add_argument(
+        "--pages",
+        type=int,
+        default=BACKUP_PAGES,
+        help="Database pages copied per step; writers wait for one step",
+    )
+    parser.set_defaults(func=handle_backup)
+
+
+def register_restore_command(subparsers: argparse._SubParsersAction) -> None:
+    parser = subparsers.add_parser(
+        "restore", help="Replace the database with a backup."
+    )
+    parser.add_argument("--file", type=str, help="Backup file to restore")
+    parser.add_argument(
+        "--yes", action="store_true", help="Restore without confirming"
+    )
+    parser.set_defaults(func=handle_restore)
+
+
+def handle_backup(args: argparse.Namespace) -> None:
+    conn = get_connection()
+
+    path_arg = Path(args.path).expanduser().resolve() if args.path else None
+    folder: Path | None = None
+    if path_arg is None:
+        folder = active_profile().backup_dir
+    elif (
+        path_arg.is_dir()
+        or args.path.endswith(("/", os.sep))
+        or not path_arg.suffix
+    ):
+        # A trailing separator or a name without a suffix is a directory,
+        # created if it does not exist yet.
+        folder = path_arg
+
+    if folder is not None:
+        compression = args.compression
+        target = backup_path(folder, compression)
+    else:
+        compression = args.compression or detect_compression(path_arg)
+        target = path_arg
+
+    try:
+        started = time.perf_counter()
+        result = backup_database(
+            conn,
+            target,
+            compression,
+            args.compression_level,
+            max(args.pages, 1),
+        )
+        elapsed = time.perf_counter() - started
+    except Exception as e:
+        msg(f"❌ Backup failed: {e}")
+        return
+
+    msg(
+        f"✅ Backed up {result['pages']} pages to {target} "
+        f"({result['bytes']:,} bytes) in {elapsed:.2f}s. "
+        "Integrity check passed."
+    )
+
+    # Only timestamped backups in a backup directory are rotated, never a
+    # file named explicitly with --path.
+    if folder is not None and args.keep > 0:
+        removed = rotate_backups(folder, args.keep)
+        if removed:
+            msg(f"Removed {len(removed)} old backups from {folder}.")
+
+
+def handle_restore(args: argparse.Namespace) -> None:
+    file_path = (
+        args.file
+        or inquirer.filepath(
+            message="Select backup to restore:",
+            default=f"{active_profile().backup_dir}/",
+            only_files=True,
+        ).execute()
+    )
+    file = Path(file_path).expanduser().resolve()
+    if not file.is_file():
+        msg(f"File not found: {file}")
+        return
+
+    if not args.yes and not inquirer.confirm(
+        message=f"Replace all current data with {file.name}?",
+        default=False,
+    ).execute():
+        msg("Restore cancelled.")
+        return
+
+    conn = get_connection()
+    try:
+        result = restore_database(conn, file)
+        # Backups from older versions are brought up to the current schema
+        init_schema(conn)
+    except Exception as e:
+        msg(f"❌ Restore failed: {e}")
+        return
+
+    msg(f"✅ Restored {result['pages']} pages from {file}.")
@@ -1,16 +1,33 @@
-import csv
-import json
+import time
+import sqlite3
 import argparse
 
 from pathlib import Path
 from datetime import datetime
+from itertools import chain
 
 from InquirerPy import inquirer
 
-from core.db import get_connection
+from core.db import get_connection, get_read_connection
 from utils.helpers import msg
+from core.file_io import (
+    open_text,
+    write_records,
+    detect_format,
+    detect_compression,
+)
 from core.controller import Controller
-from utils.constants import EXTENDED_MENU
+from utils.constants import (
+    COMPRESSIONS,
+    EXTENDED_MENU,
+    EXPORT_FORMATS,
+    EXPORT_ALL_FORMAT,
+    EXPORT_BATCH_SIZE,
+    EXPORT_BUFFER_SIZE,
+)
+from core.export_service import ExportService
+from core.cli.utils.print_table import print_table
+from features.settings.settings import SettingsManager
 
 
 def register_export_command(subparsers: argparse._SubParsersAction) -> None:
@@ -23,20 +40,64 @@ def register_export_command(subparsers: argparse._SubParsersAction) -> None:
     parser.add_argument(
         "--filetype",
         type=str,
-        choices=["json", "csv", "txt"],
+        choices=EXPORT_FORMATS,
         help="Export format",
     )
     parser.add_argument(
         "--path", type=str, help="File path to save exported data"
     )
+    parser.add_argument(
+        "--compression",
+        type=str,
+        choices=list(COMPRESSIONS),
+        help="Compress the export. Inferred from a --path suffix if omitted.",
+    )
+    parser.add_argument(
+        "--compression-level",
+        type=int,
+        help="Compression level (gzip/bz2: 1-9, xz: 0-9)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=EXPORT_BATCH_SIZE,
+        help="Number of rows read from the database per batch",
+    )
+    parser.add_argument(
+        "--incremental",
+        type=str,
+        metavar="DESTINATION",
+        help=(
+            "Export only rows added, changed or deleted since the last "
+            "export to this named destination. The first export is full."
+        ),
+    )
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help=(
+            "Export every account type and transactions into one directory, "
+            "or a .zip archive given by --path, with a manifest"
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of tables read at once with --all (default: CPUs)",
+    )
     parser.set_defaults(func=handle_export)
 
 
 def handle_export(args: argparse.Namespace) -> None:
-    conn = get_connection()
+    # Incremental exports record what they sent, so they need to write
+    conn = get_connection() if args.incremental else get_read_connection()
     model = Controller(conn)
     settings = args.settings
 
+    if args.all:
+        _handle_export_all(args, conn, settings)
+        return
+
     account_type = (
         args.account_type
         or inquirer.select(
@@ -45,26 +106,51 @@ def handle_export(args: argparse.Namespace) -> None:
         ).execute()
     )
 
-    records = model.list({"account_type": account_type})
-    if not records:
-        msg(f"No {account_type} accounts found to export.")
+    data = {"account_type": account_type}
+    batch_size = max(args.batch_size, 1)
+    watermark = 0
+    full = True
+    if args.incremental:
+        batches, watermark, full = model.iter_changes(
+            data, args.incremental, batch_size
+        )
+    else:
+        batches = model.iter_batches(data, batch_size)
+
+    first_batch = next(batches, None)
+    if not first_batch:
+        if args.incremental:
+            model.set_watermark(data, args.incremental, watermark)
+        if full:
+            msg(f"No {account_type} accounts found to export.")
+        else:
+            msg(f"No changes since last export to {args.incremental}.")
         return
 
+    path_arg = Path(args.path) if args.path else None
+
     file_format = (
         args.filetype
+        or (path_arg and _export_format(path_arg))
         or inquirer.select(
             message="Select export format:",
-            choices=["json", "csv", "txt"],
+            choices=EXPORT_FORMATS,
         ).execute()
     )
 
+    compression = args.compression or (
+        path_arg and detect_compression(path_arg)
+    )
+    suffix = f".{file_format}{COMPRESSIONS.get(compression or '', '')}"
+
     timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M")
-    filename = f"{timestamp}-{account_type}_accounts.{file_format}"
+    delta = "" if full else "-delta"
+    filename = f"{timestamp}-{account_type}_accounts{delta}{suffix}"
 
     output_file: Path | None = None
 
-    if args.path:
-        output_file = Path(args.path).expanduser().resolve()
+    if path_arg:
+        output_file = path_arg.expanduser().resolve()
     else:
         default_dir = Path(settings.get("export_path"))
         default_path = default_dir / filename
@@ -93,7 +179,7 @@ def handle_export(args: argparse.Namespace) -> None:
                 message="Enter custom file path:",
                 default=str(default_path),
                 only_files=True,
-                validate=lambda p: p.endswith(f".{file_format}"),
+                validate=lambda p: p.endswith(suffix),
             ).execute()
             output_file = Path(custom_path).expanduser().resolve()
 
@@ -111,18 +197,87 @@ def handle_export(args: argparse.Namespace) -> None:
 
     output_file.parent.mkdir(parents=True, exist_ok=True)
 
+    records = (
+        record for batch in chain([first_batch], batches) for record in batch
+    )
+
+    try:
+        started = time.perf_counter()
+        with open_text(
+            output_file,
+            "w",
+            compression=compression,
+            level=args.compression_level,
+            buffering=EXPORT_BUFFER_SIZE,
+        ) as f:
+            count = write_records(f, records, file_format)
+        elapsed = time.perf_counter() - started
+        if args.incremental:
+            model.set_watermark(data, args.incremental, watermark)
+        rate = count / elapsed if elapsed else float(count)
+
+        msg(
+            f"✅ Exported {count} records to {output_file} "
+            f"in {elapsed:.2f}s ({rate:,.0f} records/s)"
+        )
+    except Exception as e:
+        msg(f"❌ Failed to export data: {e}")
+
+
+def _handle_export_all(
+    args: argparse.Namespace,
+    conn: sqlite3.Connection,
+    settings: SettingsManager,
+) -> None:
+    if args.account_type or args.incremental:
+        msg("--account-type and --incremental are not supported with --all.")
+        return
+
+    path_arg = Path(args.path) if args.path else None
+    if path_arg:
+        output = path_arg.expanduser().resolve()
+    else:
+        timestamp = datetime.now().strftime("%Y-%m-%d-%H-%M")
+        output = (
+            Path(settings.get("export_path")).expanduser()
+            / f"{timestamp}-all_accounts"
+        )
+
+    file_format = args.filetype or EXPORT_ALL_FORMAT
     try:
-        if file_format == "json":
-            output_file.write_text(json.dumps(records, indent=4))
-        elif file_format == "csv":
-            with output_file.open("w", newline="") as f:
-                writer = csv.DictWriter(f, fieldnames=records[0].keys())
-                writer.writeheader()
-                writer.writerows(records)
-        elif file_format == "txt":
-            lines = [str(r) for r in records]
-            output_file.write_text("\n".join(lines))
-
-        msg(f"✅ Exported {len(records)} records to {output_file}")
+        started = time.perf_counter()
+        manifest = ExportService(conn).export_all(
+            output,
+            file_format,
+            args.compression,
+            args.compression_level,
+            max(args.batch_size, 1),
+            args.workers,
+        )
+        elapsed = time.perf_counter() - started
     except Exception as e:
         msg(f"❌ Failed to export data: {e}")
+        return
+
+    print_table(
+        [
+            {
+                "account_type": entry["account_type"],
+                "rows": entry["rows"],
+                "file": entry["file"],
+                "sha256": entry["sha256"][:12],
+            }
+            for entry in manifest["files"]
+        ],
+        title="Export summary: ",
+    )
+    rows = sum(entry["rows"] for entry in manifest["files"])
+    msg(
+        f"✅ Exported {rows} records in {len(manifest['files'])} files "
+        f"to {output} in {elapsed:.2f}s"
+    )
+
+
+def _export_format(path: Path) -> str | None:
+    file_format = detect_format(path)
+    return file_format if file_format in EXPORT_FORMATS else None
@@ -1,5 +1,3 @@
-import csv
-import json
 import argparse
 
 from pathlib import Path
@@ -8,8 +6,27 @@ from InquirerPy import inquirer
 
 from core.db import get_connection
 from utils.helpers import msg
-from core.controller import Controller
-from utils.constants import EXTENDED_MENU
+from core.file_io import detect_format, detect_compression
+from utils.constants import (
+    COMPRESSIONS,
+    IMPORT_MODES,
+    EXTENDED_MENU,
+    IMPORT_FORMATS,
+    DRY_RUN_EXAMPLES,
+    IMPORT_CHUNK_SIZE,
+    STATEMENT_FORMATS,
+    WATCH_POLL_INTERVAL,
+)
+from core.watcher import move_into, watch_directory
+from core.utils.validator import TYPE_VALIDATORS
+from core.import_service import (
+    TRANSACTION,
+    DESTINATION_TYPES,
+    ImportService,
+    new_result,
+    summarize_rejects,
+)
+from core.cli.utils.print_table import print_table
 
 
 def register_import_command(subparsers: argparse._SubParsersAction) -> None:
@@ -19,20 +36,145 @@ def register_import_command(subparsers: argparse._SubParsersAction) -> None:
     parser.add_argument(
         "--account-type", type=str, help="Type of account to import into"
     )
-    parser.add_argument("--file", type=str, help="Path to the JSON or CSV file")
+    parser.add_argument(
+        "--file",
+        type=str,
+        help="Path to the JSON, NDJSON, CSV, QIF or OFX file",
+    )
+    parser.add_argument(
+        "--filetype",
+        type=str,
+        choices=IMPORT_FORMATS,
+        help="Import format. Inferred from the file suffix if omitted.",
+    )
+    parser.add_argument(
+        "--compression",
+        type=str,
+        choices=list(COMPRESSIONS),
+        help="Decompress the file. Inferred from the file suffix if omitted.",
+    )
+    parser.add_argument(
+        "--statement-account-type",
+        type=str,
+        choices=DESTINATION_TYPES,
+        help="Type of the account a QIF or OFX statement belongs to",
+    )
+    parser.add_argument(
+        "--statement-account-id",
+        type=int,
+        help="ID of the account a QIF or OFX statement belongs to",
+    )
+    parser.add_argument(
+        "--day-first",
+        action="store_true",
+        help="Read QIF dates as day/month/year (UK style) not month/day/year",
+    )
+    parser.add_argument(
+        "--dir",
+        type=str,
+        help="Import every matching file in a directory in parallel",
+    )
+    parser.add_argument(
+        "--watch",
+        type=str,
+        help=(
+            "Import files as they arrive in a directory, moving each to "
+            "processed/ or failed/. Add --dedupe to skip transactions "
+            "already imported."
+        ),
+    )
+    parser.add_argument(
+        "--glob",
+        type=str,
+        default="*",
+        help="Filename pattern used with --dir (default: all supported files)",
+    )
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help=(
+            "Split one large uncompressed CSV at record boundaries and "
+            "parse the pieces in parallel"
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help=(
+            "Number of parser processes used with --dir or --parallel "
+            "(default: CPUs)"
+        ),
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=IMPORT_CHUNK_SIZE,
+        help="Number of records inserted per database transaction",
+    )
+    parser.add_argument(
+        "--mode",
+        type=str,
+        choices=IMPORT_MODES,
+        default="insert",
+        help=(
+            "insert adds every record; upsert updates accounts matching on "
+            "id, or on provider (and alias for banks), and adds the rest"
+        ),
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Validate every record and report errors without importing",
+    )
+    parser.add_argument(
+        "--rejects-file",
+        type=str,
+        help="With --dry-run, write rejected records here (CSV or NDJSON)",
+    )
+    parser.add_argument(
+        "--examples",
+        type=int,
+        default=DRY_RUN_EXAMPLES,
+        help="With --dry-run, row numbers listed per kind of error",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help=(
+            "Continue an interrupted account import from its last "
+            "committed chunk instead of starting over"
+        ),
+    )
+    parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help=(
+            "Skip transactions already in the database or repeated in the "
+            "file (matched on date, amount, accounts, description and "
+            "statement reference)"
+        ),
+    )
     parser.set_defaults(func=handle_import)
 
 
 def handle_import(args: argparse.Namespace) -> None:
     conn = get_connection()
-    model = Controller(conn)
+    service = ImportService(conn)
+
+    if args.watch:
+        _handle_watch(args, service)
+        return
+
+    if args.dir:
+        _handle_directory_import(args, service)
+        return
 
     file_path = (
         args.file
         or inquirer.filepath(
             message="Select file to import:",
             only_files=True,
-            validate=lambda p: p.endswith(".json") or p.endswith(".csv"),
+            validate=lambda p: detect_format(Path(p)) in IMPORT_FORMATS,
         ).execute()
     )
 
@@ -41,38 +183,319 @@ def handle_import(args: argparse.Namespace) -> None:
         msg(f"File not found: {file}")
         return
 
-    account_type = (
-        args.account_type
-        or inquirer.select(
-            message="Select account type to import into:",
-            choices=EXTENDED_MENU,
-        ).execute()
-    )
+    file_format = args.filetype or detect_format(file)
+    if file_format not in IMPORT_FORMATS:
+        msg("Unsupported file format.")
+        return
+
+    statement_account = None
+    if file_format in STATEMENT_FORMATS:
+        account_type = TRANSACTION
+        statement_account = _get_statement_account(args)
+    else:
+        account_type = _get_account_type(args)
+    if not _check_options(args, account_type):
+        return
+
+    compression = args.compression or detect_compression(file)
+
+    if args.dry_run:
+        _handle_dry_run(
+            args, service, file, account_type, compression, statement_account
+        )
+        return
+
+    if args.parallel and (file_format != "csv" or compression):
+        msg("--parallel only supports uncompressed CSV files.")
+        return
 
     try:
-        if file.suffix == ".json":
-            records = json.loads(file.read_text())
-        elif file.suffix == ".csv":
-            with file.open(newline="") as f:
-                reader = csv.DictReader(f)
-                records = list(reader)
+        if args.parallel:
+            result = service.import_large_csv(
+                file,
+                account_type,
+                max(args.chunk_size, 1),
+                args.workers,
+                dedupe=args.dedupe,
+                upsert=args.mode == "upsert",
+                resume=args.resume,
+            )
         else:
-            msg("Unsupported file format.")
-            return
+            result = service.import_file(
+                file,
+                account_type,
+                max(args.chunk_size, 1),
+                file_format,
+                compression,
+                args.dedupe,
+                args.mode == "upsert",
+                args.resume,
+                statement_account,
+                args.day_first,
+            )
     except Exception as e:
-        msg(f"Failed to read file: {e}")
+        msg(f"{e}")
         return
 
-    if not records:
+    for row, reason in result["rejects"]:
+        msg(f"Failed to import record on row {row}\nReason: {reason}")
+
+    if result["error"]:
+        msg(
+            f"Failed to import file after {result['rows']} records: "
+            f"{result['error']}"
+        )
+
+    if not result["rows"]:
         msg("No data found in file.")
         return
 
-    success = 0
-    for record in records:
-        try:
-            model.open({"account_type": account_type, **record})
-            success += 1
-        except Exception as e:
-            msg(f"Failed to import record: {record}\nReason: {e}")
+    if result["resumed"]:
+        msg(f"Resumed after row {result['resumed']}.")
+
+    action = "Upserted" if args.mode == "upsert" else "Imported"
+    msg(
+        f"{action} {result['imported']} of {result['rows']} records "
+        f"into {account_type}."
+    )
+    if result["duplicates"]:
+        msg(f"Skipped {result['duplicates']} duplicate records.")
+    if result["accounts"]:
+        msg(f"Applied net balance changes to {result['accounts']} accounts.")
 
-    msg(f"Imported {success} of {len(records)} records into {account_type}.")
+
+def _handle_dry_run(
+    args: argparse.Namespace,
+    service: ImportService,
+    file: Path,
+    account_type: str,
+    compression: str | None,
+    statement_account: tuple[str, int] | None,
+) -> None:
+    rejects_file = (
+        Path(args.rejects_file).expanduser().resolve()
+        if args.rejects_file
+        else None
+    )
+    result = service.validate_file(
+        file,
+        account_type,
+        max(args.chunk_size, 1),
+        args.filetype,
+        compression,
+        rejects_file,
+        statement_account,
+        args.day_first,
+    )
+
+    if result["error"]:
+        msg(
+            f"Stopped reading file after {result['rows']} records: "
+            f"{result['error']}"
+        )
+
+    if result["rejects"]:
+        print_table(
+            summarize_rejects(result["rejects"], max(args.examples, 0)),
+            title="Rejected records: ",
+        )
+        if rejects_file:
+            msg(
+                f"Wrote {len(result['rejects'])} rejected records to "
+                f"{rejects_file}"
+            )
+
+    msg(
+        f"Dry run: {result['valid']} of {result['rows']} records in "
+        f"{file.name} are valid for {account_type}. Nothing was imported."
+    )
+
+
+def _handle_watch(args: argparse.Namespace, service: ImportService) -> None:
+    directory = Path(args.watch).expanduser().resolve()
+    if not directory.is_dir():
+        msg(f"Directory not found: {directory}")
+        return
+
+    account_type = _get_account_type(args)
+    if account_type not in EXTENDED_MENU:
+        msg(f"Unknown account type: {account_type}")
+        return
+    if args.resume or args.dry_run:
+        msg("--resume and --dry-run are not supported with --watch.")
+        return
+    if args.mode == "upsert" and account_type == TRANSACTION:
+        msg("--mode upsert only applies to account imports.")
+        return
+
+    statement_account = None
+    if args.statement_account_type and args.statement_account_id:
+        statement_account = (
+            args.statement_account_type,
+            args.statement_account_id,
+        )
+
+    msg(f"Watching {directory} for new files. Press Ctrl+C to stop.")
+    try:
+        for file in watch_directory(directory, WATCH_POLL_INTERVAL):
+            _import_watched_file(
+                args, service, directory, file, account_type, statement_account
+            )
+    except KeyboardInterrupt:
+        msg("Stopped watching.")
+
+
+def _import_watched_file(
+    args: argparse.Namespace,
+    service: ImportService,
+    directory: Path,
+    file: Path,
+    account_type: str,
+    statement_account: tuple[str, int] | None,
+) -> None:
+    # A watcher runs unattended for days: one bad file is reported and set
+    # aside, never allowed to stop it.
+    if detect_format(file) in STATEMENT_FORMATS:
+        file_type = TRANSACTION
+    else:
+        file_type = account_type
+    try:
+        result = service.import_file(
+            file,
+            file_type,
+            max(args.chunk_size, 1),
+            dedupe=args.dedupe and file_type == TRANSACTION,
+            upsert=args.mode == "upsert",
+            statement_account=statement_account,
+            day_first=args.day_first,
+        )
+    except Exception as e:
+        result = new_result(file)
+        result["error"] = str(e)
+
+    folder = "failed" if result["error"] else "processed"
+    try:
+        moved = move_into(file, directory / folder)
+    except OSError as e:
+        msg(f"{file.name}: could not move to {folder}/: {e}")
+        return
+    msg(
+        f"{file.name}: imported {result['imported']} of "
+        f"{result['rows']} records, {len(result['rejects'])} "
+        f"rejected, {result['duplicates']} duplicates. "
+        f"Moved to {folder}/{moved.name}."
+        + (f"\nError: {result['error']}" if result["error"] else "")
+    )
+
+
+def _handle_directory_import(
+    args: argparse.Namespace, service: ImportService
+) -> None:
+    directory = Path(args.dir).expanduser().resolve()
+    if not directory.is_dir():
+        msg(f"Directory not found: {directory}")
+        return
+
+    files = sorted(
+        path
+        for path in directory.glob(args.glob)
+        if path.is_file() and detect_format(path) in IMPORT_FORMATS
+    )
+    if not files:
+        msg(f"No importable files matching '{args.glob}' in {directory}")
+        return
+
+    statement_account = None
+    if any(detect_format(path) in STATEMENT_FORMATS for path in files):
+        account_type = TRANSACTION
+        statement_account = _get_statement_account(args)
+    else:
+        account_type = _get_account_type(args)
+    if not _check_options(args, account_type):
+        return
+
+    try:
+        results = service.import_files(
+            files,
+            account_type,
+            max(args.chunk_size, 1),
+            args.workers,
+            args.dedupe,
+            args.mode == "upsert",
+            statement_account,
+            args.day_first,
+        )
+    except Exception as e:
+        msg(f"{e}")
+        return
+
+    summary = [
+        {
+            "file": Path(result["file"]).name,
+            "rows": result["rows"],
+            "imported": result["imported"],
+            "rejected": len(result["rejects"]),
+            "failed": result["failed"],
+            "duplicates": result["duplicates"],
+            "accounts": result["accounts"],
+            "status": result["error"] or "ok",
+        }
+        for result in results
+    ]
+    print_table(summary, title="Import summary: ")
+
+    imported = sum(result["imported"] for result in results)
+    rows = sum(result["rows"] for result in results)
+    msg(
+        f"Imported {imported} of {rows} records from {len(files)} files "
+        f"into {account_type}."
+    )
+
+
+def _check_options(args: argparse.Namespace, account_type: str) -> bool:
+    if args.dedupe and account_type != TRANSACTION:
+        msg("--dedupe only applies to transaction imports.")
+        return False
+    if args.mode == "upsert" and account_type == TRANSACTION:
+        msg("--mode upsert only applies to account imports.")
+        return False
+    if args.resume and account_type == TRANSACTION:
+        msg(
+            "Transaction imports are all-or-nothing and never leave a "
+            "partial load; run the import again without --resume."
+        )
+        return False
+    if args.resume and args.dir:
+        msg("--resume is not supported with --dir.")
+        return False
+    if args.dry_run and args.dir:
+        msg("--dry-run is not supported with --dir.")
+        return False
+    return True
+
+
+def _get_account_type(args: argparse.Namespace) -> str:
+    return (
+        args.account_type
+        or inquirer.select(
+            message="Select account type to import into:",
+            choices=EXTENDED_MENU,
+        ).execute()
+    )
+
+
+def _get_statement_account(args: argparse.Namespace) -> tuple[str, int]:
+    account_type = (
+        args.statement_account_type
+        or inquirer.select(
+            message="Select the type of account this statement is for:",
+            choices=DESTINATION_TYPES,
+        ).execute()
+    )
+    account_id = args.statement_account_id or int(
+        inquirer.text(
+            message=f"Enter the ID of the {account_type} account: ",
+            validate=TYPE_VALIDATORS[int],
+        ).execute()
+    )
+    return account_type, account_id
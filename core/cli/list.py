@@ -2,7 +2,7 @@ import argparse
 
 from InquirerPy import inquirer
 
-from core.db import get_connection
+from core.db import get_read_connection
 from utils.helpers import msg
 from core.controller import Controller
 from utils.constants import EXTENDED_MENU
@@ -18,11 +18,24 @@ def register_list_command(subparsers: argparse._SubParsersAction) -> None:
         "--account-type", type=str, help="The type of account you want to list."
     )
 
+    parser.add_argument(
+        "--from",
+        dest="start",
+        type=str,
+        help="Transactions only: earliest date to list",
+    )
+    parser.add_argument(
+        "--to",
+        dest="end",
+        type=str,
+        help="Transactions only: latest date to list",
+    )
+
     parser.set_defaults(func=handle_list)
 
 
 def handle_list(args: argparse.Namespace) -> None:
-    conn = get_connection()
+    conn = get_read_connection()
     model = Controller(conn)
 
     account_type = args.account_type
@@ -31,7 +44,9 @@ def handle_list(args: argparse.Namespace) -> None:
             message="Please select an account type: ", choices=EXTENDED_MENU
         ).execute()
 
-    accounts = model.list({"account_type": account_type})
+    accounts = model.list(
+        {"account_type": account_type, "start": args.start, "end": args.end}
+    )
 
     if not accounts:
         msg(f"No {account_type} accounts found.")
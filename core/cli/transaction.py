@@ -43,12 +43,6 @@ def register_transact_command(subparsers: argparse._SubParsersAction) -> None:
         help="ID of the account that is the source of the funds",
     )
 
-    parser.add_argument(
-        "--source-provider",
-        type=str,
-        help="The name of the provider of the source account",
-    )
-
     parser.add_argument(
         "--destination-type",
         type=str,
@@ -61,11 +55,10 @@ def register_transact_command(subparsers: argparse._SubParsersAction) -> None:
         help="ID of the account that will receive the funds",
     )
 
-    parser.add_argument(
-        "--destination-provider",
-        type=str,
-        help="The name of the provider that will receive the amount",
-    )
+    # Ignored: names come from the accounts. Kept so older scripts that
+    # still pass them keep working.
+    for flag in ("--source-provider", "--destination-provider"):
+        parser.add_argument(flag, type=str, help=argparse.SUPPRESS)
 
     parser.add_argument(
         "--description", type=str, help="Transaction description"
@@ -75,6 +68,15 @@ def register_transact_command(subparsers: argparse._SubParsersAction) -> None:
         "--amount", type=float, help="The value of the transaction"
     )
 
+    parser.add_argument(
+        "--idempotency-key",
+        type=str,
+        help=(
+            "Unique key for this transaction. Repeating a key returns the "
+            "original transaction instead of applying it again."
+        ),
+    )
+
     parser.set_defaults(func=handle_transaction)
 
 
@@ -91,10 +93,8 @@ def handle_transaction(args: argparse.Namespace) -> None:
     transaction_type = args.type
     source_type = args.source_type
     source_id = args.source_id
-    source_provider = args.source_provider
     destination_type = args.destination_type
     destination_id = args.destination_id
-    destination_provider = args.destination_provider
     description = args.description
     amount = args.amount
 
@@ -113,7 +113,6 @@ def handle_transaction(args: argparse.Namespace) -> None:
         source_data = _handle_accounts(source_id, source_type, "source", model)
         source_type = source_data["account_type"]
         source_id = source_data["id"]
-        source_provider = source_data["provider"]
 
     if transaction_type_map[transaction_type] != "withdraw":
         destination_data = _handle_accounts(
@@ -121,7 +120,6 @@ def handle_transaction(args: argparse.Namespace) -> None:
         )
         destination_type = destination_data["account_type"]
         destination_id = destination_data["id"]
-        destination_provider = destination_data["provider"]
 
     if not description:
         description = inquirer.text(
@@ -139,20 +137,26 @@ def handle_transaction(args: argparse.Namespace) -> None:
         "transaction_type": transaction_type_map[transaction_type],
         "source_type": source_type,
         "source_id": source_id,
-        "source_provider": source_provider,
         "destination_type": destination_type,
         "destination_id": destination_id,
-        "destination_provider": destination_provider,
         "description": description,
         "amount": amount,
+        "idempotency_key": args.idempotency_key,
     }
 
     try:
-        model.transaction(data)
+        result = model.transaction(data)
     except Exception as e:
         msg(f"{e}")
         return
 
+    if result["replayed"]:
+        msg(
+            f"Idempotency key {args.idempotency_key} was already used by "
+            f"transaction {result['id']}. Nothing was applied."
+        )
+        return
+
     msg("Transaction logged!")
     print_table(model.list({"account_type": "transaction"}))
 
@@ -160,7 +164,7 @@ def handle_transaction(args: argparse.Namespace) -> None:
 def _handle_accounts(
     id: int, account_type: str, transaction: str, model: Controller
 ) -> dict:
-    data = {}
+    data = {"account_type": account_type, "id": id}
 
     if not account_type:
         data["account_type"] = inquirer.select(
@@ -193,11 +197,4 @@ def _handle_accounts(
         msg(f"Cannot find {account_type} id {id}")
         return {}
 
-    alias = account[0].get("alias")
-    data["provider"] = (
-        f"{account[0]['provider']} ({alias})"
-        if alias
-        else account[0]["provider"]
-    )
-
     return data
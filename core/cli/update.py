@@ -6,6 +6,7 @@ from InquirerPy.validator import EmptyInputValidator
 from core.db import get_connection
 from utils.helpers import msg
 from core.controller import Controller
+from core.exceptions import WriteConflictError
 from utils.constants import FIELD_MAP, ACCOUNT_TYPES
 from core.utils.validator import TYPE_VALIDATORS
 from core.cli.utils.print_table import print_table
@@ -109,15 +110,19 @@ def handle_update(args: argparse.Namespace) -> None:
                 break
 
         # 6) TODO: try/except update
+        # Refused if the account changed since it was shown above
         data = {
             "account_type": account_type,
             "id": id,
+            "version": account[0].get("version"),
             **updates,
         }
 
         try:
             model.update(data)
             msg("Account updated successfully.")
+        except WriteConflictError as e:
+            msg(f"Nothing was updated: {e}")
         except Exception as e:
             msg(f"Failed to update account: {e}")
 
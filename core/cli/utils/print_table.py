@@ -6,12 +6,13 @@ from utils.decorators import pretty_output
 
 
 @pretty_output
-def print_table(data: list[dict]) -> None:
+def print_table(data: list[dict], title: str = "Your accounts: ") -> None:
     """
     Print a list of dictionaries as a formatted table with spacing.
 
     Args:
         data (list of dict): The rows to display.
+        title (str): The heading printed above the table.
     """
     if not data:
         return
@@ -23,5 +24,5 @@ def print_table(data: list[dict]) -> None:
         data, currency_fields, symbol=currency
     )
 
-    print("Your accounts: ")
+    print(title)
     print(tabulate(formatted_data, headers="keys", tablefmt="github"))
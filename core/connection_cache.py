@@ -0,0 +1,87 @@
+import time
+import sqlite3
+
+from typing import Callable
+from collections import OrderedDict
+
+from core.db import open_connection
+from utils.profiles import Profile
+from utils.constants import CONNECTION_CACHE_SIZE, CONNECTION_IDLE_TIMEOUT
+
+
+class ConnectionCache:
+    """Open connections to many profiles' databases from one process.
+
+    At most ``size`` connections are kept; opening another closes the one
+    used least recently. Connections unused for ``idle_timeout`` seconds
+    are closed on the next call. A connection with a transaction still
+    open is never closed by the cache.
+
+    Like the connections it holds, a cache belongs to one thread.
+    """
+
+    def __init__(
+        self,
+        size: int = CONNECTION_CACHE_SIZE,
+        idle_timeout: float = CONNECTION_IDLE_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._size = max(size, 1)
+        self._idle_timeout = idle_timeout
+        self._clock = clock
+        # Profile name -> (connection, last used), least recent first
+        self._connections: OrderedDict[
+            str, tuple[sqlite3.Connection, float]
+        ] = OrderedDict()
+
+    def __enter__(self) -> "ConnectionCache":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._connections
+
+    def get(self, name: str) -> sqlite3.Connection:
+        """Return the connection for a profile, opening it if needed."""
+        now = self._clock()
+        self.evict_idle(now)
+
+        if name in self._connections:
+            connection, _ = self._connections.pop(name)
+        else:
+            connection = open_connection(Profile(name).db_path)
+        self._connections[name] = (connection, now)
+
+        for other in list(self._connections)[:-1]:
+            if len(self._connections) <= self._size:
+                break
+            self._close_unless_busy(other)
+        return connection
+
+    def evict_idle(self, now: float | None = None) -> list[str]:
+        """Close connections unused for longer than the idle timeout."""
+        now = self._clock() if now is None else now
+        expired = [
+            name
+            for name, (_, used) in self._connections.items()
+            if now - used > self._idle_timeout
+        ]
+        return [name for name in expired if self._close_unless_busy(name)]
+
+    def close(self) -> None:
+        for connection, _ in self._connections.values():
+            connection.close()
+        self._connections.clear()
+
+    def _close_unless_busy(self, name: str) -> bool:
+        connection, _ = self._connections[name]
+        if connection.in_transaction:
+            return False
+        del self._connections[name]
+        connection.close()
+        return True
@@ -1,11 +1,19 @@
 import sqlite3
 
+from typing import Iterator
+
 from utils.types import IDKeys, AccountTypeKeys, TransactionType
 from utils.helpers import wrap_error
+from core.change_log import ChangeLog
+from core.unit_of_work import atomic
+from core.archive import TransactionArchive
 from core.utility_service import UtilityService
 from core.transaction_service import TransactionService
 from features.transactions.model import Transaction
-from features.transactions.exceptions import TransactionError
+from features.transactions.exceptions import (
+    TransactionError,
+    DuplicateTransactionError,
+)
 
 
 class Controller:
@@ -14,6 +22,62 @@ class Controller:
         self._cursor = db_connection.cursor()
         self.utility = UtilityService(db_connection)
         self.transactions = TransactionService(db_connection)
+        self.changes = ChangeLog(db_connection)
+        self.archive = TransactionArchive(db_connection)
+
+    def iter_batches(
+        self, data: dict, batch_size: int, include_closed: bool = False
+    ) -> Iterator[list[dict]]:
+        account_type = self.utility._get_account_type(
+            data, AccountTypeKeys.DEFAULT
+        )
+        model = self.utility._get_model(account_type)
+        if isinstance(model, Transaction):
+            # Transactions moved out to yearly archives are still exported
+            return self.archive.iter_batches(batch_size)
+        return model.iter_batches(batch_size, include_closed)
+
+    def iter_changes(
+        self, data: dict, destination: str, batch_size: int
+    ) -> tuple[Iterator[list[dict]], int, bool]:
+        """Rows changed since the last export of this type to destination.
+
+        Returns the batches, the change sequence to save as the new
+        watermark once they are written, and whether this is a full export
+        because the destination has no watermark yet.
+        """
+        account_type = self.utility._get_account_type(
+            data, AccountTypeKeys.DEFAULT
+        )
+        model = self.utility._get_model(account_type)
+        table = model._table_name.value
+
+        since = self.changes.get_watermark(destination, table)
+        if since is None:
+            self.changes.track(table)
+        # Read before the rows so changes made during the export are
+        # picked up again next time rather than lost.
+        until = self.changes.latest_seq()
+        if since is None:
+            batches = (
+                [{**record, "_change": "upsert"} for record in batch]
+                for batch in self.iter_batches(data, batch_size)
+            )
+            return batches, until, True
+        changes = (
+            [model._visible(record) for record in batch]
+            for batch in self.changes.iter_changes(
+                table, since, until, batch_size, model._source
+            )
+        )
+        return changes, until, False
+
+    def set_watermark(self, data: dict, destination: str, seq: int) -> None:
+        account_type = self.utility._get_account_type(
+            data, AccountTypeKeys.DEFAULT
+        )
+        model = self.utility._get_model(account_type)
+        self.changes.set_watermark(destination, model._table_name.value, seq)
 
     def list(self, data: dict) -> list[dict]:
         account_type = self.utility._get_account_type(
@@ -24,6 +88,9 @@ class Controller:
         if "id" in data:
             id_ = self.utility._get_id(data, IDKeys.ID)
             return model.get_one(id_)
+        if isinstance(model, Transaction):
+            # Archived years are attached only if the dates reach them
+            return self.archive.query(data.get("start"), data.get("end"))
         return model.get_many()
 
     def open(self, data: dict) -> None:
@@ -50,7 +117,15 @@ class Controller:
         if not isinstance(model, Transaction):
             model.close(_id)
 
-    def transaction(self, data: dict) -> None:
+    def transaction(self, data: dict) -> dict:
+        """Apply a transaction and return its logged row.
+
+        The row is logged before any balance changes, in the same database
+        transaction. If ``idempotency_key`` matches an earlier transaction,
+        the unique index rejects the log and the original row is returned
+        without touching any balances. ``replayed`` in the result tells the
+        two cases apart.
+        """
         try:
             transaction_type_str = self.utility._require_non_empty_str(
                 data.get("transaction_type"), "transaction_type"
@@ -63,26 +138,48 @@ class Controller:
                     f"Invalid transaction type: {transaction_type_str}"
                 ) from e
 
-            match transaction_type:
-                case TransactionType.WITHDRAW | TransactionType.PAY_ONLY:
-                    self.transactions.withdraw(data)
+            key = data.get("idempotency_key")
+            # The unique index only covers transactions not yet archived
+            archived = key and self.archive.get_by_idempotency_key(
+                key, data.get("date")
+            )
+            if archived:
+                return {**archived, "replayed": True}
 
-                case TransactionType.DEPOSIT:
-                    self.transactions.deposit(data)
+            try:
+                with atomic(self.db_connection):
+                    transaction_id = self.transactions.log_transaction(data)
+                    self._apply_transaction(transaction_type, data)
+            except DuplicateTransactionError:
+                original = self.transactions.get_by_idempotency_key(
+                    data["idempotency_key"]
+                )
+                return {**original, "replayed": True}
+
+            row = self.transactions.get_transaction(transaction_id)
+            return {**row, "replayed": False}
 
-                case TransactionType.TRANSFER:
-                    self.transactions.withdraw(data)
-                    self.transactions.deposit(data)
+        except Exception as e:
+            raise wrap_error(TransactionError, "Transaction failed")(e) from e
 
-                case _:
-                    raise ValueError(
-                        f"Invalid transaction type: {transaction_type_str}"
-                    )
+    def _apply_transaction(
+        self, transaction_type: TransactionType, data: dict
+    ) -> None:
+        match transaction_type:
+            case TransactionType.WITHDRAW | TransactionType.PAY_ONLY:
+                self.transactions.withdraw(data)
 
-            self.transactions.log_transaction(data)
+            case TransactionType.DEPOSIT:
+                self.transactions.deposit(data)
 
-        except Exception as e:
-            raise wrap_error(TransactionError, "Transaction failed")(e) from e
+            case TransactionType.TRANSFER:
+                self.transactions.withdraw(data)
+                self.transactions.deposit(data)
+
+            case _:
+                raise ValueError(
+                    f"Invalid transaction type: {transaction_type.value}"
+                )
 
     def update(self, data: dict) -> None:
         account_type = self.utility._get_account_type(
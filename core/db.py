@@ -1,31 +1,210 @@
 import sqlite3
 
+from typing import Iterator
 from pathlib import Path
+from contextlib import contextmanager
+
+from core.busy import busy_timeout
+from utils.profiles import active_profile
+from utils.constants import DATA_DIR, NATURAL_KEYS
+from core.change_log import (
+    CREATE_CHANGE_LOG_TABLE,
+    CREATE_CHANGE_LOG_INDEX,
+    CREATE_CHANGE_TRACKING_TABLE,
+    CREATE_EXPORT_WATERMARKS_TABLE,
+    sync_change_triggers,
+)
+from core.archive import (
+    TransactionArchive,
+    CREATE_TRANSACTIONS_DATE_INDEX,
+    CREATE_TRANSACTION_ROLLUPS_TABLE,
+    CREATE_TRANSACTION_ARCHIVES_TABLE,
+)
+from core.checkpoints import CREATE_IMPORT_CHECKPOINTS_TABLE
+from core.accounts_catalog import (
+    CLOSED_NOW,
+    ACCOUNT_TYPE_CODES,
+    CREATE_ACCOUNTS_PROVIDER_INDEX,
+    create_catalog,
+    rebuild_catalog,
+)
 
 from features.accounts.loan.schema import CREATE_LOAN_TABLE
 from features.payable.bill.schema import CREATE_BILLS_TABLE
-from features.transactions.schema import CREATE_TRANSACTIONS_TABLE
+from features.transactions.model import transaction_fingerprint
+from features.transactions.schema import (
+    CREATE_TRANSACTIONS_TABLE,
+    CREATE_TRANSACTION_DETAILS_VIEW,
+    CREATE_TRANSACTIONS_IDEMPOTENCY_INDEX,
+    CREATE_TRANSACTIONS_FINGERPRINT_INDEX,
+    CREATE_TRANSACTIONS_SOURCE_ACCOUNT_INDEX,
+    CREATE_TRANSACTIONS_DESTINATION_ACCOUNT_INDEX,
+)
 from features.accounts.bank.schema import CREATE_BANKS_TABLE
 from features.accounts.store_card.schema import CREATE_STORE_CARDS_TABLE
 from features.accounts.credit_card.schema import CREATE_CREDIT_CARDS_TABLE
 from features.payable.subscription.schema import CREATE_SUBSCRIPTIONS_TABLE
 
-ROOT_DIR = Path(__file__).resolve().parent.parent
-DATA_DIR = ROOT_DIR / "data"
+# The default profile's database; see utils.profiles for the others
 DB_PATH = DATA_DIR / "financli.db"
 
+# Columns added after the first release, applied to existing databases
+ADDED_COLUMNS = {
+    "transactions": [
+        ("fingerprint", "TEXT"),
+        ("idempotency_key", "TEXT"),
+        ("reference", "TEXT"),
+        ("source_account_id", "INTEGER REFERENCES accounts (id)"),
+        ("destination_account_id", "INTEGER REFERENCES accounts (id)"),
+    ],
+    **{
+        table: [
+            ("version", "INTEGER NOT NULL DEFAULT 0"),
+            ("closed_at", "TEXT"),
+        ]
+        for table in (
+            "banks",
+            "credit_cards",
+            "store_cards",
+            "loans",
+            "bills",
+            "subscriptions",
+        )
+    },
+}
+
+# Stored in PRAGMA user_version once init_schema() has run. Raise it with
+# every change above so read-only connections know to migrate first.
+SCHEMA_VERSION = 7
+
+INDEXES = [
+    CREATE_TRANSACTIONS_FINGERPRINT_INDEX,
+    CREATE_TRANSACTIONS_IDEMPOTENCY_INDEX,
+    CREATE_TRANSACTIONS_DATE_INDEX,
+    CREATE_TRANSACTIONS_SOURCE_ACCOUNT_INDEX,
+    CREATE_TRANSACTIONS_DESTINATION_ACCOUNT_INDEX,
+    CREATE_ACCOUNTS_PROVIDER_INDEX,
+]
+
+# Returned by get_connection() instead of the file while set, see
+# use_connection()
+_active_connection: sqlite3.Connection | None = None
+
 
 def create_data_path() -> None:
-    """Ensure the data directory exists."""
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    """Ensure the active profile's data directory exists."""
+    active_profile().data_dir.mkdir(parents=True, exist_ok=True)
 
 
 def get_connection() -> sqlite3.Connection:
-    """Establish a connection to the main app database and initialize tables."""
-    create_data_path()
-    conn = sqlite3.connect(DB_PATH)
+    """Connect to the active profile's database and initialize tables."""
+    if _active_connection is not None:
+        return _active_connection
+    return open_connection(active_profile().db_path)
+
+
+def open_connection(path: Path) -> sqlite3.Connection:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=busy_timeout())
+    # WAL lets readers, such as export --all, run alongside a writer
+    conn.execute("PRAGMA journal_mode=WAL")
+    init_schema(conn)
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def get_read_connection() -> sqlite3.Connection:
+    """Connect read-only to the active profile's database, for reports."""
+    if _active_connection is not None:
+        return _active_connection
+    return open_read_connection(active_profile().db_path)
+
+
+def open_read_connection(
+    path: Path, check_same_thread: bool = True
+) -> sqlite3.Connection:
+    """Open ``path`` so that nothing read through it can take a write lock.
+
+    Tables are not created on the way in. A database that is missing or
+    older than the current schema is first brought up to date through a
+    normal connection.
+    """
+    if path.exists():
+        conn = _connect_read_only(path, check_same_thread)
+        (version,) = conn.execute("PRAGMA user_version").fetchone()
+        if version >= SCHEMA_VERSION:
+            return conn
+        conn.close()
+    open_connection(path).close()
+    return _connect_read_only(path, check_same_thread)
+
+
+def _connect_read_only(
+    path: Path, check_same_thread: bool
+) -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        f"{path.resolve().as_uri()}?mode=ro",
+        uri=True,
+        timeout=busy_timeout(),
+        check_same_thread=check_same_thread,
+    )
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+@contextmanager
+def snapshot(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """Read everything in the block as of the moment it starts.
+
+    In WAL mode the snapshot holds no lock that writers wait on. Databases
+    cannot be attached inside it.
+    """
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN")
+    # A deferred transaction fixes its snapshot at the first read
+    conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchall()
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+
+
+@contextmanager
+def use_connection(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """Make get_connection() return ``conn`` inside the block."""
+    global _active_connection
+    previous, _active_connection = _active_connection, conn
+    try:
+        yield conn
+    finally:
+        _active_connection = previous
+
+
+def database_path(conn: sqlite3.Connection) -> Path | None:
+    """Return the file behind a connection, or None if it is in memory."""
+    for _, name, file in conn.execute("PRAGMA database_list"):
+        if name == "main":
+            return Path(file) if file else None
+    return None
+
+
+def init_schema(conn: sqlite3.Connection) -> None:
+    """Create any missing tables and migrate existing ones."""
     cursor = conn.cursor()
+    # Migrations rebuild tables that others refer to, which foreign keys
+    # would refuse part way through
+    (enforced,) = cursor.execute("PRAGMA foreign_keys").fetchone()
+    cursor.execute("PRAGMA foreign_keys = OFF")
+    try:
+        _create_tables(conn)
+    finally:
+        cursor.execute(f"PRAGMA foreign_keys = {enforced}")
 
+
+def _create_tables(conn: sqlite3.Connection) -> None:
+    cursor = conn.cursor()
     cursor.execute(CREATE_BANKS_TABLE)
     cursor.execute(CREATE_CREDIT_CARDS_TABLE)
     cursor.execute(CREATE_BILLS_TABLE)
@@ -33,6 +212,165 @@ def get_connection() -> sqlite3.Connection:
     cursor.execute(CREATE_SUBSCRIPTIONS_TABLE)
     cursor.execute(CREATE_TRANSACTIONS_TABLE)
     cursor.execute(CREATE_LOAN_TABLE)
+    cursor.execute(CREATE_IMPORT_CHECKPOINTS_TABLE)
+    cursor.execute(CREATE_CHANGE_LOG_TABLE)
+    cursor.execute(CREATE_CHANGE_LOG_INDEX)
+    cursor.execute(CREATE_EXPORT_WATERMARKS_TABLE)
+    cursor.execute(CREATE_CHANGE_TRACKING_TABLE)
+    cursor.execute(CREATE_TRANSACTION_ARCHIVES_TABLE)
+    cursor.execute(CREATE_TRANSACTION_ROLLUPS_TABLE)
+    create_catalog(cursor)
 
+    migrate(conn)
+    sync_change_triggers(cursor)
+    cursor.execute(CREATE_TRANSACTION_DETAILS_VIEW)
+
+    cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
     conn.commit()
-    return conn
+
+
+def migrate(conn: sqlite3.Connection) -> None:
+    """Bring tables created by older versions up to the current schema."""
+    cursor = conn.cursor()
+
+    for table, columns in ADDED_COLUMNS.items():
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in cursor.fetchall()}
+        for column, definition in columns:
+            if column not in existing:
+                cursor.execute(
+                    f"ALTER TABLE {table} ADD COLUMN {column} {definition}"
+                )
+
+    _backfill_fingerprints(conn)
+    (version,) = cursor.execute("PRAGMA user_version").fetchone()
+    if version < 2:
+        _backfill_account_refs(conn)
+    if version < 4:
+        rebuild_catalog(cursor)
+        _clear_dangling_refs(conn)
+    if version < 3:
+        _detach_missing_accounts(conn)
+        _drop_copied_account_columns(conn)
+    if version < 4:
+        cursor.execute(
+            f"UPDATE accounts SET closed_at = {CLOSED_NOW} "  # noqa: S608
+            "WHERE type_id IS NULL AND closed_at IS NULL"
+        )
+        cursor.execute("DROP INDEX IF EXISTS idx_accounts_provider")
+    if version < 5:
+        # Re-created by init_schema() with the columns added since
+        cursor.execute("DROP VIEW IF EXISTS transaction_details")
+    if version < 7:
+        # Delete triggers that also keep accounts with archived history
+        rebuild_catalog(cursor)
+        TransactionArchive(conn).mark_archived_accounts()
+
+    for index in INDEXES:
+        cursor.execute(index)
+
+    for table_name, natural_key in NATURAL_KEYS.items():
+        table = table_name.value
+        # Earlier versions made the natural key unique, which refused a
+        # second card or bill from the same provider.
+        cursor.execute(f"DROP INDEX IF EXISTS idx_{table}_natural_key")
+        # Lookups only ever match open accounts, so closed ones are left
+        # out of the index
+        cursor.execute(f"DROP INDEX IF EXISTS idx_{table}_lookup")
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_open "
+            f"ON {table} ({', '.join(natural_key)}) "
+            "WHERE closed_at IS NULL"
+        )
+
+    conn.commit()
+
+
+def _copied_account_columns(conn: sqlite3.Connection) -> list[str]:
+    # Written on every transaction before accounts were referenced by id
+    rows = conn.execute("PRAGMA table_info(transactions)").fetchall()
+    existing = {row[1] for row in rows}
+    return [
+        f"{role}_{field}"
+        for role in ("source", "destination")
+        for field in ("provider", "type", "id")
+        if f"{role}_{field}" in existing
+    ]
+
+
+def _backfill_account_refs(conn: sqlite3.Connection) -> None:
+    # Transactions logged before the catalog existed, matched on type name
+    # and per-type id
+    if not _copied_account_columns(conn):
+        return
+    for role in ("source", "destination"):
+        conn.execute(
+            f"UPDATE transactions SET {role}_account_id = ("  # noqa: S608
+            "SELECT a.id FROM accounts a JOIN account_types t "
+            "ON t.code = a.type_code "
+            f"WHERE t.name = lower(trim(transactions.{role}_type)) "
+            f"AND a.type_id = transactions.{role}_id"
+            f") WHERE {role}_account_id IS NULL AND {role}_id IS NOT NULL"
+        )
+
+
+def _clear_dangling_refs(conn: sqlite3.Connection) -> None:
+    # Catalog rows of accounts deleted before they could be detached; the
+    # copied names, where still present, detach them again below
+    for role in ("source", "destination"):
+        conn.execute(
+            f"UPDATE transactions SET {role}_account_id = NULL "  # noqa: S608
+            f"WHERE {role}_account_id NOT IN (SELECT id FROM accounts)"
+        )
+
+
+def _detach_missing_accounts(conn: sqlite3.Connection) -> None:
+    # Accounts deleted before the catalog existed are known only by the
+    # names copied onto their transactions; keep those as detached entries
+    if len(_copied_account_columns(conn)) < 6:
+        return
+    for role in ("source", "destination"):
+        missing = conn.execute(
+            f"SELECT DISTINCT lower(trim({role}_type)), {role}_id, "  # noqa: S608
+            f"{role}_provider FROM transactions "
+            f"WHERE {role}_account_id IS NULL AND {role}_type IS NOT NULL"
+        ).fetchall()
+        for account_type, type_id, provider in missing:
+            code = ACCOUNT_TYPE_CODES.get(account_type)
+            if code is None:
+                continue
+            account_id = conn.execute(
+                "INSERT INTO accounts "  # noqa: S608
+                "(type_code, type_id, provider, closed_at) "
+                f"VALUES (?, NULL, ?, {CLOSED_NOW})",
+                (code, provider or f"{account_type} {type_id}"),
+            ).lastrowid
+            conn.execute(
+                f"UPDATE transactions SET {role}_account_id = ? "  # noqa: S608
+                f"WHERE {role}_account_id IS NULL "
+                f"AND lower(trim({role}_type)) = ? "
+                f"AND {role}_id IS ? AND {role}_provider IS ?",
+                (account_id, account_type, type_id, provider),
+            )
+
+
+def _drop_copied_account_columns(conn: sqlite3.Connection) -> None:
+    # Older SQLite cannot drop columns; they are left unused
+    if sqlite3.sqlite_version_info < (3, 35, 0):
+        return
+    for column in _copied_account_columns(conn):
+        conn.execute(f"ALTER TABLE transactions DROP COLUMN {column}")
+
+
+def _backfill_fingerprints(conn: sqlite3.Connection) -> None:
+    reader = conn.cursor()
+    reader.execute("SELECT * FROM transactions WHERE fingerprint IS NULL")
+    columns = [column[0] for column in reader.description]
+    while rows := reader.fetchmany(1000):
+        conn.executemany(
+            "UPDATE transactions SET fingerprint = ? WHERE id = ?",
+            [
+                (transaction_fingerprint(dict(zip(columns, row))), row[0])
+                for row in rows
+            ],
+        )
@@ -16,3 +16,11 @@ class QueryExecutionError(DatabaseError):
 
 class ColumnMismatchError(DatabaseError):
     pass
+
+
+class BackupError(DatabaseError):
+    pass
+
+
+class WriteConflictError(DatabaseError):
+    pass
@@ -0,0 +1,195 @@
+import os
+import json
+import sqlite3
+import hashlib
+import zipfile
+import tempfile
+
+from pathlib import Path
+from datetime import datetime
+from functools import partial
+from contextlib import ExitStack
+from concurrent.futures import ThreadPoolExecutor
+
+from core.db import snapshot, database_path, open_read_connection
+from utils.helpers import wrap_error
+from core.file_io import open_text, write_records
+from core.exceptions import QueryExecutionError
+from core.controller import Controller
+from utils.constants import (
+    COMPRESSIONS,
+    EXTENDED_MENU,
+    EXPORT_BATCH_SIZE,
+    EXPORT_BUFFER_SIZE,
+)
+
+MANIFEST_NAME = "manifest.json"
+HASH_READ_SIZE = 1024 * 1024
+# Tries at opening one snapshot per type before reading them in turn
+SNAPSHOT_ATTEMPTS = 3
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        while block := f.read(HASH_READ_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _data_version(connection: sqlite3.Connection) -> int:
+    return connection.execute("PRAGMA data_version").fetchone()[0]
+
+
+class ExportService:
+    """Export every account type in one pass.
+
+    Each type is read on its own read-only connection in a thread pool and
+    written to its own file, alongside a manifest of row counts and
+    checksums. Every connection reads from the same snapshot, so the files
+    agree with each other without keeping writers out. Databases in memory
+    cannot be shared, so they are read in turn. Closed accounts are
+    included with their ``closed_at``, since past transactions refer to
+    them.
+    """
+
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self.connection = connection
+
+    def export_all(
+        self,
+        output: Path,
+        file_format: str,
+        compression: str | None = None,
+        level: int | None = None,
+        batch_size: int = EXPORT_BATCH_SIZE,
+        workers: int | None = None,
+    ) -> dict:
+        """Export into ``output``, a directory or a ``.zip`` archive."""
+        path = database_path(self.connection)
+        workers = workers or min(len(EXTENDED_MENU), os.cpu_count() or 1)
+        suffix = f".{file_format}{COMPRESSIONS.get(compression or '', '')}"
+        archive = output.suffix.lower() == ".zip"
+
+        with ExitStack() as stack:
+            if archive:
+                output.parent.mkdir(parents=True, exist_ok=True)
+                folder = Path(
+                    stack.enter_context(
+                        tempfile.TemporaryDirectory(dir=output.parent)
+                    )
+                )
+            else:
+                output.mkdir(parents=True, exist_ok=True)
+                folder = output
+
+            export = partial(
+                self._export_type,
+                folder,
+                suffix,
+                file_format,
+                compression,
+                level,
+                batch_size,
+            )
+            files = self._read_all(path, export, workers)
+
+            manifest = {
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "format": file_format,
+                "compression": compression,
+                "files": files,
+            }
+            with (folder / MANIFEST_NAME).open("w") as f:
+                json.dump(manifest, f, indent=4)
+
+            if archive:
+                _write_archive(folder, output, compression is None)
+
+        return manifest
+
+    def _read_all(
+        self, path: Path | None, export: partial, workers: int
+    ) -> list[dict]:
+        with ExitStack() as stack:
+            connections = None
+            if path is not None and not self.connection.in_transaction:
+                try:
+                    connections = self._open_snapshots(path, stack)
+                except sqlite3.Error as e:
+                    wrapper = wrap_error(
+                        QueryExecutionError, "Failed to open export snapshots"
+                    )
+                    raise wrapper(e) from e
+            if connections is None:
+                with snapshot(self.connection):
+                    return [
+                        export(self.connection, kind) for kind in EXTENDED_MENU
+                    ]
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(export, connections, EXTENDED_MENU))
+
+    def _open_snapshots(
+        self, path: Path, stack: ExitStack
+    ) -> list[sqlite3.Connection] | None:
+        # The snapshots match if no other connection committed while they
+        # were being opened, which data_version shows.
+        for _ in range(SNAPSHOT_ATTEMPTS):
+            attempt = ExitStack()
+            with attempt:
+                version = _data_version(self.connection)
+                connections = []
+                for _ in EXTENDED_MENU:
+                    connection = open_read_connection(
+                        path, check_same_thread=False
+                    )
+                    attempt.callback(connection.close)
+                    attempt.enter_context(snapshot(connection))
+                    connections.append(connection)
+                if _data_version(self.connection) == version:
+                    stack.enter_context(attempt.pop_all())
+                    return connections
+        return None
+
+    def _export_type(
+        self,
+        folder: Path,
+        suffix: str,
+        file_format: str,
+        compression: str | None,
+        level: int | None,
+        batch_size: int,
+        connection: sqlite3.Connection,
+        account_type: str,
+    ) -> dict:
+        file = folder / f"{account_type}_accounts{suffix}"
+        batches = Controller(connection).iter_batches(
+            {"account_type": account_type}, batch_size, include_closed=True
+        )
+        records = (record for batch in batches for record in batch)
+        with open_text(
+            file,
+            "w",
+            compression=compression,
+            level=level,
+            buffering=EXPORT_BUFFER_SIZE,
+        ) as f:
+            rows = write_records(f, records, file_format)
+
+        return {
+            "account_type": account_type,
+            "file": file.name,
+            "rows": rows,
+            "bytes": file.stat().st_size,
+            "sha256": file_sha256(file),
+        }
+
+
+def _write_archive(folder: Path, output: Path, deflate: bool) -> None:
+    # Files compressed by the export are stored as they are
+    method = zipfile.ZIP_DEFLATED if deflate else zipfile.ZIP_STORED
+    staged = output.with_name(f".{output.name}.part")
+    with zipfile.ZipFile(staged, "w", compression=method) as archive:
+        for file in sorted(folder.iterdir()):
+            archive.write(file, file.name)
+    staged.replace(output)
@@ -0,0 +1,417 @@
+import io
+import re
+import bz2
+import csv
+import gzip
+import html
+import json
+import lzma
+import mmap
+
+from typing import IO, Iterable, Iterator, Generator
+from pathlib import Path
+from datetime import datetime
+
+from utils.constants import COMPRESSIONS, EXPORT_FORMATS, IMPORT_FORMATS
+
+JSON_READ_SIZE = 64 * 1024
+OFX_READ_SIZE = 64 * 1024
+QUOTE_SCAN_SIZE = 8 * 1024 * 1024
+
+_WHITESPACE = re.compile(r"\s*")
+_SUFFIX_ALIASES = {"jsonl": "ndjson", "qfx": "ofx"}
+_KNOWN_FORMATS = {*EXPORT_FORMATS, *IMPORT_FORMATS}
+
+# QIF sections holding statement lines; others (categories, classes,
+# account lists) are skipped.
+_QIF_STATEMENT_SECTIONS = {"bank", "cash", "ccard", "oth a", "oth l"}
+_QIF_DATE_FORMATS = ["%m/%d/%Y", "%m/%d/%y", "%m-%d-%Y", "%m-%d-%y", "%Y-%m-%d"]
+# Quicken writes dates in the locale's order; UK and most European files
+# put the day first.
+_QIF_DAY_FIRST_FORMATS = [
+    "%d/%m/%Y",
+    "%d/%m/%y",
+    "%d-%m-%Y",
+    "%d-%m-%y",
+    "%Y-%m-%d",
+]
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+
+def detect_compression(path: Path) -> str | None:
+    """Return the compression implied by a file's last suffix, if any."""
+    suffix = path.suffix.lower()
+    for compression, compression_suffix in COMPRESSIONS.items():
+        if suffix == compression_suffix:
+            return compression
+    return None
+
+
+def detect_format(path: Path) -> str | None:
+    """Return the record format implied by a file's suffix, if known."""
+    if detect_compression(path):
+        path = path.with_suffix("")
+    suffix = path.suffix.lstrip(".").lower()
+    suffix = _SUFFIX_ALIASES.get(suffix, suffix)
+    return suffix if suffix in _KNOWN_FORMATS else None
+
+
+def open_text(
+    path: Path,
+    mode: str,
+    compression: str | None = None,
+    level: int | None = None,
+    buffering: int = -1,
+) -> IO[str]:
+    """Open a text stream, compressing or decompressing it on the fly."""
+    if compression is None:
+        return path.open(mode, newline="", buffering=buffering)
+
+    text_mode = f"{mode}t"
+    if compression == "gzip":
+        if level is None:
+            return gzip.open(path, text_mode, newline="")
+        return gzip.open(path, text_mode, compresslevel=level, newline="")
+    if compression == "bz2":
+        if level is None:
+            return bz2.open(path, text_mode, newline="")
+        return bz2.open(path, text_mode, compresslevel=level, newline="")
+    if compression == "xz":
+        return lzma.open(path, text_mode, preset=level, newline="")
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+def open_binary(
+    path: Path,
+    mode: str,
+    compression: str | None = None,
+    level: int | None = None,
+) -> IO[bytes]:
+    """Open a byte stream, compressing or decompressing it on the fly."""
+    if compression is None:
+        return path.open(f"{mode}b")
+    binary_mode = f"{mode}b"
+    if compression == "gzip":
+        if level is None:
+            return gzip.open(path, binary_mode)
+        return gzip.open(path, binary_mode, compresslevel=level)
+    if compression == "bz2":
+        if level is None:
+            return bz2.open(path, binary_mode)
+        return bz2.open(path, binary_mode, compresslevel=level)
+    if compression == "xz":
+        return lzma.open(path, binary_mode, preset=level)
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+def read_records(
+    f: IO[str], file_format: str, day_first: bool = False
+) -> Iterator[dict]:
+    """Yield records from an open file one at a time.
+
+    ``day_first`` reads QIF dates as day/month/year rather than the US
+    month/day/year.
+    """
+    if file_format == "json":
+        return _read_json_array(f)
+    if file_format == "ndjson":
+        return _read_ndjson(f)
+    if file_format == "csv":
+        return iter(csv.DictReader(f))
+    if file_format == "qif":
+        return _read_qif(f, day_first)
+    if file_format == "ofx":
+        return _read_ofx(f)
+    raise ValueError(f"Unsupported import format: {file_format}")
+
+
+def write_records(
+    f: IO[str], records: Iterable[dict], file_format: str
+) -> int:
+    """Write records to an open file as they arrive and return the count."""
+    if file_format == "json":
+        return _write_json_array(f, records)
+    if file_format == "ndjson":
+        return _write_ndjson(f, records)
+    if file_format == "csv":
+        return _write_csv(f, records)
+    if file_format == "txt":
+        return _write_txt(f, records)
+    raise ValueError(f"Unsupported export format: {file_format}")
+
+
+def csv_record_ranges(
+    path: Path, target_size: int, start: int | None = None
+) -> tuple[list[str], list[tuple[int, int]]]:
+    """Split an uncompressed CSV file into byte ranges of whole records.
+
+    Returns the header fields and ``(start, end)`` offsets of roughly
+    ``target_size`` bytes each. Splits only happen on a newline outside a
+    quoted field, so each range can be parsed on its own. ``start``, if
+    given, must be a record boundary such as the end of an earlier range.
+    """
+    with path.open("rb") as f:
+        if not path.stat().st_size:
+            return [], []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            header_end = _next_record_end(mm, 0, 0)
+            header = mm[:header_end].decode("utf-8-sig")
+            fields = next(csv.reader(io.StringIO(header, newline="")), [])
+
+            ranges = []
+            start = max(start or header_end, header_end)
+            while start < size:
+                end = _next_record_end(mm, start, start + target_size)
+                ranges.append((start, end))
+                start = end
+    return fields, ranges
+
+
+def read_csv_range(
+    path: Path, start: int, end: int, fields: list[str]
+) -> Iterator[dict]:
+    """Yield the records in one byte range found by csv_record_ranges."""
+    with path.open("rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            text = mm[start:end].decode("utf-8")
+    yield from csv.DictReader(io.StringIO(text, newline=""), fieldnames=fields)
+
+
+def _next_record_end(mm: mmap.mmap, start: int, target: int) -> int:
+    # Quote parity from ``start`` tells whether a newline ends a record or
+    # sits inside a quoted field; escaped quotes ("") keep parity intact.
+    size = len(mm)
+    if target >= size:
+        return size
+
+    quotes = _count_quotes(mm, start, target)
+    pos = target
+    while True:
+        newline = mm.find(b"\n", pos)
+        if newline == -1:
+            return size
+        quotes += _count_quotes(mm, pos, newline)
+        pos = newline + 1
+        if quotes % 2 == 0:
+            return pos
+
+
+def _count_quotes(mm: mmap.mmap, start: int, end: int) -> int:
+    count = 0
+    for offset in range(start, end, QUOTE_SCAN_SIZE):
+        count += mm[offset : min(offset + QUOTE_SCAN_SIZE, end)].count(b'"')
+    return count
+
+
+def _read_ndjson(f: IO[str]) -> Iterator[dict]:
+    for line_number, line in enumerate(f, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(
+                f"Invalid JSON on line {line_number}: {e}"
+            ) from e
+
+
+def _read_json_array(f: IO[str]) -> Iterator[dict]:
+    # Decodes one array element at a time from a sliding buffer so that only
+    # the current element, not the whole file, is held in memory.
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+    started = False
+    expect_value = True
+
+    while True:
+        pos = _WHITESPACE.match(buffer, pos).end()
+
+        if pos == len(buffer):
+            if eof:
+                raise ValueError("Unexpected end of JSON data")
+            chunk = f.read(JSON_READ_SIZE)
+            buffer, pos = buffer[pos:] + chunk, 0
+            eof = not chunk
+            continue
+
+        char = buffer[pos]
+        if not started:
+            if char != "[":
+                raise ValueError("JSON data must be an array of records")
+            started = True
+            pos += 1
+        elif char == "]":
+            return
+        elif not expect_value:
+            if char != ",":
+                raise ValueError(f"Expected ',' in JSON array, got '{char}'")
+            expect_value = True
+            pos += 1
+        else:
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(JSON_READ_SIZE)
+                buffer, pos = buffer[pos:] + chunk, 0
+                eof = not chunk
+                continue
+            yield record
+            pos = end
+            expect_value = False
+
+
+def _read_qif(f: IO[str], day_first: bool = False) -> Iterator[dict]:
+    # One field per line, keyed by its first character; "^" ends a record
+    # and "!Type:" lines start a new section.
+    in_statement = True
+    record: dict = {}
+    for line_number, line in enumerate(f, start=1):
+        line = line.rstrip("\r\n")
+        if not line:
+            continue
+
+        code, value = line[0], line[1:].strip()
+        if code == "!":
+            kind, _, section = value.partition(":")
+            in_statement = (
+                kind.lower() == "type"
+                and section.strip().lower() in _QIF_STATEMENT_SECTIONS
+            )
+            record = {}
+        elif code == "^":
+            if in_statement and record:
+                yield record
+            record = {}
+        elif not in_statement:
+            continue
+        elif code == "D":
+            record["date"] = _qif_date(value, line_number, day_first)
+        elif code in "TU" and "amount" not in record:
+            record["amount"] = value.replace(",", "")
+        elif code == "P":
+            record["payee"] = value
+        elif code == "M":
+            record["memo"] = value
+        elif code == "N":
+            record["reference"] = value
+
+    if in_statement and record:
+        yield record
+
+
+def _qif_date(value: str, line_number: int, day_first: bool = False) -> str:
+    # Quicken pads single digits with spaces and writes 2000s years as 'YY
+    text = value.replace(" ", "").replace("'", "/")
+    formats = _QIF_DAY_FIRST_FORMATS if day_first else _QIF_DATE_FORMATS
+    for date_format in formats:
+        try:
+            return datetime.strptime(text, date_format).date().isoformat()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid QIF date on line {line_number}: {value}")
+
+
+def _read_ofx(f: IO[str]) -> Iterator[dict]:
+    # Tokenises OFX 1.x SGML (leaf tags are never closed) and OFX 2.x XML
+    # alike, keeping only the open statement transaction in memory.
+    buffer = ""
+    record: dict | None = None
+    while chunk := f.read(OFX_READ_SIZE):
+        buffer += chunk
+        # A tag cut off at the end of the chunk waits for the next read
+        cut = buffer.rfind("<")
+        if cut == -1:
+            # Still in the plain-text OFX 1.x header
+            buffer = ""
+            continue
+        text, buffer = buffer[:cut], buffer[cut:]
+        for closing, tag, value in _OFX_TAG.findall(text):
+            record = yield from _ofx_token(record, closing, tag, value)
+    for closing, tag, value in _OFX_TAG.findall(buffer):
+        record = yield from _ofx_token(record, closing, tag, value)
+
+
+def _ofx_token(
+    record: dict | None, closing: str, tag: str, value: str
+) -> Generator[dict, None, dict | None]:
+    tag = tag.upper()
+    if tag == "STMTTRN":
+        if not closing:
+            return {}
+        if record:
+            yield record
+        return None
+    if record is None or closing:
+        return record
+
+    value = html.unescape(value.strip())
+    if tag == "DTPOSTED":
+        record["date"] = _ofx_date(value)
+    elif tag == "TRNAMT":
+        record["amount"] = value.replace(",", ".")
+    elif tag == "NAME":
+        record["payee"] = value
+    elif tag == "MEMO":
+        record["memo"] = value
+    elif tag == "FITID":
+        record["reference"] = value
+    return record
+
+
+def _ofx_date(value: str) -> str:
+    try:
+        return datetime.strptime(value[:8], "%Y%m%d").date().isoformat()
+    except ValueError as e:
+        raise ValueError(f"Invalid OFX date: {value}") from e
+
+
+def _write_json_array(f: IO[str], records: Iterable[dict]) -> int:
+    # Produces the same layout as json.dumps(records, indent=4) without
+    # materialising the list.
+    count = 0
+    f.write("[")
+    for record in records:
+        if count:
+            f.write(",")
+        body = json.dumps(record, indent=4).replace("\n", "\n    ")
+        f.write(f"\n    {body}")
+        count += 1
+    f.write("\n]" if count else "]")
+    return count
+
+
+def _write_ndjson(f: IO[str], records: Iterable[dict]) -> int:
+    count = 0
+    for record in records:
+        f.write(json.dumps(record))
+        f.write("\n")
+        count += 1
+    return count
+
+
+def _write_csv(f: IO[str], records: Iterable[dict]) -> int:
+    writer: csv.DictWriter | None = None
+    count = 0
+    for record in records:
+        if writer is None:
+            writer = csv.DictWriter(f, fieldnames=record.keys())
+            writer.writeheader()
+        writer.writerow(record)
+        count += 1
+    return count
+
+
+def _write_txt(f: IO[str], records: Iterable[dict]) -> int:
+    count = 0
+    for record in records:
+        if count:
+            f.write("\n")
+        f.write(str(record))
+        count += 1
+    return count
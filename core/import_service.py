@@ -0,0 +1,784 @@
+import os
+import csv
+import json
+import sqlite3
+
+from typing import IO, Callable, Iterable, Iterator
+from pathlib import Path
+from itertools import islice
+from contextlib import ExitStack, contextmanager
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    ProcessPoolExecutor,
+    wait,
+)
+
+from core.file_io import (
+    open_text,
+    read_records,
+    detect_format,
+    read_csv_range,
+    csv_record_ranges,
+    detect_compression,
+)
+from utils.types import TableName, TransactionType
+from core.exceptions import ValidationError
+from core.checkpoints import Checkpoint
+from core.archive import TransactionArchive, transaction_year
+from utils.constants import (
+    FIELD_MAP,
+    TYPE_CONFIG,
+    CSV_SPLIT_SIZE,
+    IMPORT_FORMATS,
+    STATEMENT_FORMATS,
+    TRANSACTION_FIELDS,
+    STATEMENT_DESCRIPTION,
+)
+from core.unit_of_work import atomic
+from utils.model_types import ModelType
+from core.utility_service import UtilityService
+from features.accounts.base import Accounts
+from features.transactions.model import Transaction, transaction_fingerprint
+
+TRANSACTION = TYPE_CONFIG[TableName.TRANSACTIONS]["display_name"]
+SOURCE_TYPES = [
+    config["display_name"]
+    for config in TYPE_CONFIG.values()
+    if config["is_source"]
+]
+DESTINATION_TYPES = [
+    config["display_name"]
+    for config in TYPE_CONFIG.values()
+    if config["is_destination"]
+]
+
+
+def coerce_record(record: dict, account_type: str) -> dict:
+    if not isinstance(record, dict):
+        raise ValueError("Record must be an object of field names to values")
+
+    fields = (
+        TRANSACTION_FIELDS
+        if account_type == TRANSACTION
+        else FIELD_MAP.get(account_type, [])
+    )
+    if "id" in record and account_type != TRANSACTION:
+        fields = [("id", int), *fields]
+
+    coerced = dict(record)
+    for field, field_type in fields:
+        value = coerced.get(field)
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == "":
+            coerced[field] = None
+            continue
+        try:
+            coerced[field] = field_type(value)
+        except (TypeError, ValueError) as e:
+            raise ValueError(
+                f"Invalid value for {field}. Expected {field_type.__name__}."
+            ) from e
+    return coerced
+
+
+def validate_record(record: dict, required_columns: list[str]) -> dict:
+    missing_fields = [
+        field for field in required_columns if record.get(field) is None
+    ]
+    if missing_fields:
+        raise ValidationError(
+            f"Missing required fields: {', '.join(missing_fields)}"
+        )
+    return record
+
+
+def validate_transaction(record: dict) -> dict:
+    raw_type = record.get("transaction_type")
+    try:
+        transaction_type = TransactionType(str(raw_type).lower())
+    except ValueError as e:
+        raise ValueError(f"Invalid transaction type: {raw_type}") from e
+    record["transaction_type"] = transaction_type.value
+
+    if record["amount"] <= 0:
+        raise ValueError("Amount must be greater than zero.")
+
+    if transaction_type != TransactionType.DEPOSIT:
+        if record.get("source_type") not in SOURCE_TYPES:
+            raise ValueError(
+                f"Unsupported source account type: {record.get('source_type')}"
+            )
+        if record.get("source_id") is None:
+            raise ValueError("source_id is required.")
+
+    if transaction_type in (TransactionType.DEPOSIT, TransactionType.TRANSFER):
+        destination_type = record.get("destination_type")
+        if destination_type not in DESTINATION_TYPES:
+            raise ValueError(
+                f"Unsupported destination account type: {destination_type}"
+            )
+        if record.get("destination_id") is None:
+            raise ValueError("destination_id is required.")
+
+    return record
+
+
+def statement_transaction(
+    record: dict, account_type: str, account_id: int
+) -> dict:
+    """Turn a QIF or OFX statement line into a transaction on one account.
+
+    Negative amounts are withdrawals from the account and positive ones
+    deposits into it. Bad values are passed through for coercion to
+    reject.
+    """
+    transaction = {
+        "date": record.get("date"),
+        "description": (
+            record.get("payee")
+            or record.get("memo")
+            or record.get("reference")
+            or STATEMENT_DESCRIPTION
+        ),
+        "amount": record.get("amount"),
+        "reference": record.get("reference"),
+    }
+    try:
+        amount = float(record["amount"])
+    except (KeyError, TypeError, ValueError):
+        return transaction
+
+    transaction["amount"] = abs(amount)
+    if amount < 0:
+        transaction["transaction_type"] = TransactionType.WITHDRAW.value
+        transaction["source_type"] = account_type
+        transaction["source_id"] = account_id
+    else:
+        transaction["transaction_type"] = TransactionType.DEPOSIT.value
+        transaction["destination_type"] = account_type
+        transaction["destination_id"] = account_id
+    return transaction
+
+
+def iter_valid_chunks(
+    file: Path,
+    account_type: str,
+    required_columns: list[str],
+    chunk_size: int,
+    result: dict,
+    file_format: str | None = None,
+    compression: str | None = None,
+    skip_rows: int = 0,
+    on_reject: Callable[[int, dict, str], None] | None = None,
+    statement_account: tuple[str, int] | None = None,
+    day_first: bool = False,
+) -> Iterator[list[dict]]:
+    """Parse a file and yield chunks of coerced, validated records.
+
+    Row counts and rejected rows are recorded on ``result`` as the file is
+    read, so the caller can report on them once the generator is exhausted.
+    The first ``skip_rows`` rows are counted but not validated or yielded.
+    Statement files (QIF, OFX) become transactions on ``statement_account``;
+    ``day_first`` reads QIF dates as day/month/year.
+    """
+    file_format = file_format or detect_format(file)
+    if file_format not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported file format: {file.name}")
+    compression = compression or detect_compression(file)
+
+    is_statement = file_format in STATEMENT_FORMATS
+    if is_statement and (
+        account_type != TRANSACTION or statement_account is None
+    ):
+        raise ValueError(
+            f"{file.name} is a statement; import it as transactions for "
+            "one account."
+        )
+
+    with open_text(file, "r", compression=compression) as f:
+        records = read_records(f, file_format, day_first)
+        if is_statement:
+            records = (
+                statement_transaction(record, *statement_account)
+                for record in records
+            )
+        yield from _chunk_valid_records(
+            records,
+            account_type,
+            required_columns,
+            chunk_size,
+            result,
+            skip_rows,
+            on_reject,
+        )
+
+
+def _chunk_valid_records(
+    records: Iterable[dict],
+    account_type: str,
+    required_columns: list[str],
+    chunk_size: int,
+    result: dict,
+    skip_rows: int = 0,
+    on_reject: Callable[[int, dict, str], None] | None = None,
+) -> Iterator[list[dict]]:
+    chunk: list[dict] = []
+    for row, record in enumerate(records, start=1):
+        result["rows"] = row
+        if row <= skip_rows:
+            continue
+        try:
+            coerced = coerce_record(record, account_type)
+            validate_record(coerced, required_columns)
+            if account_type == TRANSACTION:
+                validate_transaction(coerced)
+            chunk.append(coerced)
+        except (ValueError, ValidationError) as e:
+            result["rejects"].append((row, str(e)))
+            if on_reject:
+                on_reject(row, record, str(e))
+            continue
+
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+
+def _reject_writer(
+    f: IO[str], as_csv: bool
+) -> Callable[[int, dict, str], None]:
+    writer: csv.DictWriter | None = None
+
+    def write(row: int, record: dict, reason: str) -> None:
+        nonlocal writer
+        fields = record if isinstance(record, dict) else {"record": record}
+        rejected = {"row": row, "error": reason, **fields}
+        if not as_csv:
+            f.write(json.dumps(rejected) + "\n")
+            return
+        if writer is None:
+            writer = csv.DictWriter(
+                f, fieldnames=list(rejected), extrasaction="ignore"
+            )
+            writer.writeheader()
+        writer.writerow(rejected)
+
+    return write
+
+
+def summarize_rejects(
+    rejects: list[tuple[int, str]], examples: int
+) -> list[dict]:
+    """Group rejected rows by the kind of error, most frequent first."""
+    groups: dict[str, dict] = {}
+    for row, reason in rejects:
+        kind = reason.partition(":")[0]
+        group = groups.setdefault(
+            kind, {"error": kind, "count": 0, "rows": [], "example": reason}
+        )
+        group["count"] += 1
+        if len(group["rows"]) < examples:
+            group["rows"].append(row)
+
+    summary = sorted(groups.values(), key=lambda group: -group["count"])
+    for group in summary:
+        group["rows"] = ", ".join(str(row) for row in group["rows"])
+    return summary
+
+
+def new_result(file: Path) -> dict:
+    return {
+        "file": str(file),
+        "rows": 0,
+        "valid": 0,
+        "imported": 0,
+        "failed": 0,
+        "accounts": 0,
+        "duplicates": 0,
+        "resumed": 0,
+        "rejects": [],
+        "error": None,
+    }
+
+
+def parse_file(
+    path: str,
+    account_type: str,
+    required_columns: list[str],
+    chunk_size: int,
+    statement_account: tuple[str, int] | None = None,
+    day_first: bool = False,
+) -> dict:
+    # Runs in a worker process: parsing, decoding and type coercion happen
+    # here, leaving only the inserts to the writer in the parent process.
+    file = Path(path)
+    result = new_result(file)
+    try:
+        result["chunks"] = list(
+            iter_valid_chunks(
+                file,
+                account_type,
+                required_columns,
+                chunk_size,
+                result,
+                statement_account=statement_account,
+                day_first=day_first,
+            )
+        )
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def parse_csv_range(
+    path: str,
+    start: int,
+    end: int,
+    fields: list[str],
+    account_type: str,
+    required_columns: list[str],
+    chunk_size: int,
+) -> dict:
+    # Worker for one byte range of a large CSV. Row numbers in the result
+    # are relative to the range; the parent offsets them as it consumes the
+    # ranges in order.
+    result = new_result(Path(path))
+    result["end"] = end
+    try:
+        records = read_csv_range(Path(path), start, end, fields)
+        result["chunks"] = list(
+            _chunk_valid_records(
+                records, account_type, required_columns, chunk_size, result
+            )
+        )
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def _ordered_map(
+    executor: Executor,
+    fn: Callable[..., dict],
+    arguments: Iterable[tuple],
+    window: int,
+) -> Iterator[dict]:
+    # Like Executor.map, but only keeps ``window`` tasks in flight so parsed
+    # ranges cannot pile up in memory faster than the writer drains them.
+    arguments = iter(arguments)
+    pending = deque(
+        executor.submit(fn, *args) for args in islice(arguments, window)
+    )
+    while pending:
+        result = pending.popleft().result()
+        for args in islice(arguments, 1):
+            pending.append(executor.submit(fn, *args))
+        yield result
+
+
+def _unordered_map(
+    executor: Executor,
+    fn: Callable[..., dict],
+    arguments: Iterable[tuple],
+    window: int,
+) -> Iterator[dict]:
+    # As _ordered_map, but yields tasks as they finish so one slow file
+    # does not hold back the others.
+    arguments = iter(arguments)
+    pending = {
+        executor.submit(fn, *args) for args in islice(arguments, window)
+    }
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            for args in islice(arguments, 1):
+                pending.add(executor.submit(fn, *args))
+            yield future.result()
+
+
+class TransactionBatch:
+    """Log transaction rows in bulk and net their balance changes.
+
+    Balances are not touched while rows are added. ``apply`` then updates
+    each affected account once with its net change, checked against the
+    account's limits, so the work scales with accounts rather than rows.
+
+    With ``dedupe`` set, rows whose fingerprint is already stored, in the
+    main database or the archives of the years a chunk covers, or was
+    already seen earlier in the same import, are skipped and counted.
+    """
+
+    def __init__(
+        self,
+        utility: UtilityService,
+        result: dict,
+        dedupe: bool = False,
+        archive: TransactionArchive | None = None,
+    ) -> None:
+        self.utility = utility
+        self.result = result
+        self.dedupe = dedupe
+        self.archive = archive
+        self.deltas: dict[tuple[str, int], float] = {}
+        self._refs: dict[tuple[str, int], int] = {}
+        self._seen: set[str] = set()
+
+    def add(self, chunk: list[dict]) -> None:
+        if self.dedupe:
+            chunk = self._new_records(chunk)
+            if not chunk:
+                return
+
+        for record in chunk:
+            transaction_type = TransactionType(record["transaction_type"])
+            amount = record["amount"]
+
+            if transaction_type != TransactionType.DEPOSIT:
+                source = (record["source_type"], record["source_id"])
+                record["source_account_id"] = self._account_ref(*source)
+                self._add_delta(source, -amount)
+
+            if record.get("destination_type") and record.get(
+                "destination_id"
+            ):
+                destination = (
+                    record["destination_type"],
+                    record["destination_id"],
+                )
+                record["destination_account_id"] = self._account_ref(
+                    *destination
+                )
+                if transaction_type in (
+                    TransactionType.DEPOSIT,
+                    TransactionType.TRANSFER,
+                ):
+                    self._add_delta(destination, amount)
+
+        self.result["imported"] += self.utility.transaction_model.log_many(
+            chunk
+        )
+
+    def apply(self) -> None:
+        for (account_type, account_id), delta in self.deltas.items():
+            model = self.utility._get_model(account_type)
+            if not isinstance(model, Accounts):
+                continue
+            try:
+                model.adjust_balance(account_id, delta)
+            except Exception as e:
+                raise ValueError(f"{account_type} {account_id}: {e}") from e
+            self.result["accounts"] += 1
+
+    def _new_records(self, chunk: list[dict]) -> list[dict]:
+        fingerprints = [transaction_fingerprint(record) for record in chunk]
+        unseen = set(fingerprints) - self._seen
+        existing = self.utility.transaction_model.existing_fingerprints(
+            list(unseen)
+        )
+        if self.archive is not None:
+            existing |= self.archive.archived_fingerprints(
+                unseen - existing,
+                {transaction_year(record["date"]) for record in chunk},
+            )
+
+        records = []
+        for record, fingerprint in zip(chunk, fingerprints):
+            if fingerprint in self._seen or fingerprint in existing:
+                self.result["duplicates"] += 1
+                continue
+            self._seen.add(fingerprint)
+            records.append(record)
+        return records
+
+    def _add_delta(self, account: tuple[str, int], amount: float) -> None:
+        self.deltas[account] = self.deltas.get(account, 0.0) + amount
+
+    def _account_ref(self, account_type: str, account_id: int) -> int:
+        # Catalog id of each account, looked up once per import
+        key = (account_type, account_id)
+        if key not in self._refs:
+            catalog = self.utility.transaction_model.catalog
+            try:
+                self.utility._get_model(account_type)
+                ref = catalog.resolve(account_type, account_id)
+            except Exception as e:
+                raise ValueError(f"{account_type} {account_id}: {e}") from e
+            if ref is None:
+                raise ValueError(
+                    f"{account_type} {account_id}: Record with ID "
+                    f"{account_id} does not exist"
+                )
+            self._refs[key] = ref
+        return self._refs[key]
+
+
+class ImportService:
+    def __init__(self, db_connection: sqlite3.Connection) -> None:
+        self.db_connection = db_connection
+        self.utility = UtilityService(db_connection)
+        self.archive = TransactionArchive(db_connection)
+
+    def import_file(
+        self,
+        file: Path,
+        account_type: str,
+        chunk_size: int,
+        file_format: str | None = None,
+        compression: str | None = None,
+        dedupe: bool = False,
+        upsert: bool = False,
+        resume: bool = False,
+        statement_account: tuple[str, int] | None = None,
+        day_first: bool = False,
+    ) -> dict:
+        model = self.utility._get_model(account_type)
+        result = new_result(file)
+        try:
+            checkpoint = self._checkpoint(file, account_type, model)
+            if checkpoint and resume:
+                result["resumed"], _ = checkpoint.load()
+
+            chunks = iter_valid_chunks(
+                file,
+                account_type,
+                model.required_columns,
+                chunk_size,
+                result,
+                file_format,
+                compression,
+                result["resumed"],
+                statement_account=statement_account,
+                day_first=day_first,
+            )
+            with self._writer(
+                model, result, dedupe, upsert, checkpoint
+            ) as write:
+                for chunk in chunks:
+                    write(chunk)
+
+            if checkpoint:
+                checkpoint.clear()
+        except Exception as e:
+            result["error"] = str(e)
+        return result
+
+    def validate_file(
+        self,
+        file: Path,
+        account_type: str,
+        chunk_size: int,
+        file_format: str | None = None,
+        compression: str | None = None,
+        rejects_file: Path | None = None,
+        statement_account: tuple[str, int] | None = None,
+        day_first: bool = False,
+    ) -> dict:
+        """Check every record in a file without writing to the database.
+
+        Rejected records can be streamed to ``rejects_file`` (CSV, or
+        NDJSON for any other suffix) with their row number and error.
+        """
+        model = self.utility._get_model(account_type)
+        result = new_result(file)
+        try:
+            with ExitStack() as stack:
+                on_reject = None
+                if rejects_file:
+                    f = stack.enter_context(rejects_file.open("w", newline=""))
+                    on_reject = _reject_writer(
+                        f, detect_format(rejects_file) == "csv"
+                    )
+
+                for chunk in iter_valid_chunks(
+                    file,
+                    account_type,
+                    model.required_columns,
+                    chunk_size,
+                    result,
+                    file_format,
+                    compression,
+                    on_reject=on_reject,
+                    statement_account=statement_account,
+                    day_first=day_first,
+                ):
+                    result["valid"] += len(chunk)
+        except Exception as e:
+            result["error"] = str(e)
+        return result
+
+    def import_files(
+        self,
+        files: list[Path],
+        account_type: str,
+        chunk_size: int,
+        workers: int | None = None,
+        dedupe: bool = False,
+        upsert: bool = False,
+        statement_account: tuple[str, int] | None = None,
+        day_first: bool = False,
+    ) -> list[dict]:
+        model = self.utility._get_model(account_type)
+        results = []
+        workers = workers or os.cpu_count() or 1
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            arguments = (
+                (
+                    str(file),
+                    account_type,
+                    model.required_columns,
+                    chunk_size,
+                    statement_account,
+                    day_first,
+                )
+                for file in files
+            )
+            # This process is the only writer; chunks are inserted as each
+            # file finishes parsing while the next files are still in
+            # flight in the pool.
+            for result in _unordered_map(
+                executor, parse_file, arguments, workers * 2
+            ):
+                with self._writer(model, result, dedupe, upsert) as write:
+                    for chunk in result.pop("chunks", []):
+                        write(chunk)
+                results.append(result)
+
+        return sorted(results, key=lambda result: result["file"])
+
+    def import_large_csv(
+        self,
+        file: Path,
+        account_type: str,
+        chunk_size: int,
+        workers: int | None = None,
+        split_size: int = CSV_SPLIT_SIZE,
+        dedupe: bool = False,
+        upsert: bool = False,
+        resume: bool = False,
+    ) -> dict:
+        model = self.utility._get_model(account_type)
+        result = new_result(file)
+        workers = workers or os.cpu_count() or 1
+
+        try:
+            checkpoint = self._checkpoint(file, account_type, model)
+            offset = None
+            if checkpoint and resume:
+                result["resumed"], offset = checkpoint.load()
+                if result["resumed"] and offset is None:
+                    raise ValueError(
+                        "This import was interrupted without --parallel; "
+                        "resume it the same way."
+                    )
+                result["rows"] = result["resumed"]
+
+            fields, ranges = csv_record_ranges(file, split_size, offset)
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                arguments = (
+                    (
+                        str(file),
+                        start,
+                        end,
+                        fields,
+                        account_type,
+                        model.required_columns,
+                        chunk_size,
+                    )
+                    for start, end in ranges
+                )
+                parsed_ranges = _ordered_map(
+                    executor, parse_csv_range, arguments, workers * 2
+                )
+                with self._writer(model, result, dedupe, upsert) as write:
+                    for parsed in parsed_ranges:
+                        offset = result["rows"]
+                        result["rows"] += parsed["rows"]
+                        result["rejects"].extend(
+                            (offset + row, reason)
+                            for row, reason in parsed["rejects"]
+                        )
+                        if parsed["error"]:
+                            raise ValueError(parsed["error"])
+                        # Each range is committed with its checkpoint, so
+                        # a resume restarts at the first unwritten range.
+                        with atomic(self.db_connection):
+                            for chunk in parsed["chunks"]:
+                                write(chunk)
+                            if checkpoint:
+                                checkpoint.save(result["rows"], parsed["end"])
+
+            if checkpoint:
+                checkpoint.clear()
+        except Exception as e:
+            result["error"] = str(e)
+        return result
+
+    @contextmanager
+    def _writer(
+        self,
+        model: ModelType,
+        result: dict,
+        dedupe: bool = False,
+        upsert: bool = False,
+        checkpoint: Checkpoint | None = None,
+    ) -> Iterator[Callable[[list[dict]], None]]:
+        # Accounts commit chunk by chunk. Transactions are all-or-nothing:
+        # the log rows and the balance updates share one database
+        # transaction, so a limit breach or missing account rolls back the
+        # whole file.
+        if not isinstance(model, Transaction):
+            yield lambda chunk: self._write_chunk(
+                model, chunk, result, upsert, checkpoint
+            )
+            return
+        if upsert:
+            result["error"] = "Upsert is not supported for transactions."
+            yield lambda chunk: self._reject_chunk(chunk, result)
+            return
+
+        batch = TransactionBatch(self.utility, result, dedupe, self.archive)
+        try:
+            with atomic(self.db_connection):
+                yield batch.add
+                batch.apply()
+        except Exception as e:
+            result["failed"] += result["imported"]
+            result["imported"] = 0
+            result["accounts"] = 0
+            result["error"] = str(e)
+
+    def _write_chunk(
+        self,
+        model: ModelType,
+        chunk: list[dict],
+        result: dict,
+        upsert: bool = False,
+        checkpoint: Checkpoint | None = None,
+    ) -> None:
+        try:
+            with atomic(self.db_connection):
+                count = model.open_many(chunk, upsert)
+                if checkpoint:
+                    checkpoint.save(result["rows"])
+            result["imported"] += count
+        except Exception as e:
+            self._reject_chunk(chunk, result)
+            result["error"] = str(e)
+
+    def _checkpoint(
+        self, file: Path, account_type: str, model: ModelType
+    ) -> Checkpoint | None:
+        # Transaction imports are all-or-nothing, so they never leave a
+        # partial load to resume.
+        if isinstance(model, Transaction):
+            return None
+        return Checkpoint(self.db_connection, file, account_type)
+
+    def _reject_chunk(self, chunk: list[dict], result: dict) -> None:
+        result["failed"] += len(chunk)
@@ -1,19 +1,25 @@
 import argparse
 
-from core.db import create_data_path
+from core.db import use_connection, create_data_path
 from core.setup import setup
+from utils.helpers import msg
+from core.memory_db import in_memory
+from core.exceptions import DatabaseError
+from core.busy import lock_stats, set_busy_timeout
+from utils.profiles import set_active_profile
+from utils.constants import PROFILE_ENV, BUSY_TIMEOUT, DEFAULT_PROFILE
 from core.cli.list import register_list_command
 from core.cli.open import register_open_command
 from core.cli.close import register_close_command
+from core.cli.archive import register_archive_command
 from core.cli.export import register_export_command
 from core.cli.update import register_update_command
 from core.cli.imports import register_import_command
 from core.cli.transaction import register_transact_command
+from core.cli.backup import register_backup_command, register_restore_command
 
 
 def main() -> None:
-    create_data_path()
-    settings = setup()
     parser = argparse.ArgumentParser(
         prog="fcli",
         description=(
@@ -21,6 +27,39 @@ def main() -> None:
         ),
     )
 
+    parser.add_argument(
+        "--profile",
+        type=str,
+        help=(
+            "Ledger to use, each with its own database and settings "
+            f"(default: ${PROFILE_ENV}, or {DEFAULT_PROFILE})"
+        ),
+    )
+    parser.add_argument(
+        "--in-memory",
+        action="store_true",
+        help=(
+            "Run against a copy of the database in memory and write it back "
+            "when the command succeeds. Faster for bulk imports; other "
+            "processes wait until it finishes."
+        ),
+    )
+    parser.add_argument(
+        "--busy-timeout",
+        type=float,
+        default=BUSY_TIMEOUT,
+        metavar="SECONDS",
+        help=(
+            "How long to wait for another process's lock on the database "
+            f"before retrying (default: {BUSY_TIMEOUT:g})"
+        ),
+    )
+    parser.add_argument(
+        "--lock-stats",
+        action="store_true",
+        help="Report time spent waiting for the database write lock",
+    )
+
     subparsers = parser.add_subparsers(dest="command", required=True)
 
     register_open_command(subparsers)
@@ -30,11 +69,45 @@ def main() -> None:
     register_list_command(subparsers)
     register_export_command(subparsers)
     register_import_command(subparsers)
+    register_backup_command(subparsers)
+    register_restore_command(subparsers)
+    register_archive_command(subparsers)
 
     args = parser.parse_args()
-    args.settings = settings
+    try:
+        profile = set_active_profile(args.profile)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.busy_timeout < 0:
+        parser.error("--busy-timeout cannot be negative")
+    set_busy_timeout(args.busy_timeout)
+
+    create_data_path()
+    args.settings = setup()
+
+    if args.in_memory and getattr(args, "watch", None):
+        parser.error("--in-memory cannot be used with --watch")
 
-    if hasattr(args, "func"):
+    if hasattr(args, "func") and args.in_memory:
+        try:
+            with in_memory(profile.db_path) as conn, use_connection(conn):
+                args.func(args)
+        except DatabaseError as e:
+            msg(f"❌ {e}")
+    elif hasattr(args, "func"):
         args.func(args)
     else:
         parser.print_help()
+
+    if args.lock_stats:
+        _report_lock_stats()
+
+
+def _report_lock_stats() -> None:
+    stats = lock_stats.as_dict()
+    msg(
+        f"🔒 Waited {stats['waited']:.3f}s for the write lock over "
+        f"{stats['acquisitions']} transaction(s), {stats['longest']:.3f}s at "
+        f"most; {stats['retries']} busy retries slept {stats['slept']:.3f}s, "
+        f"{stats['failures']} gave up."
+    )
@@ -0,0 +1,139 @@
+import os
+import sqlite3
+
+from typing import Iterator
+from pathlib import Path
+from contextlib import contextmanager
+
+from core.db import init_schema
+from core.busy import busy_timeout
+from core.backup import check_integrity
+from utils.helpers import wrap_error
+from core.exceptions import BackupError, WriteConflictError
+
+
+def staging_path(path: Path) -> Path:
+    """Return where the copy written back from memory is staged."""
+    return path.with_name(f".{path.name}.tmp")
+
+
+@contextmanager
+def in_memory(path: Path) -> Iterator[sqlite3.Connection]:
+    """Work on an in-memory copy of ``path`` and write it back on success.
+
+    If no other connection has the file open, it is locked for the whole
+    run and the copy replaces it by rename. Otherwise the copy is written
+    into the live file in one step, which other connections can keep
+    using, and refused if they changed it in the meantime. Either way the
+    copy is staged and checked first, so a crash leaves the old file.
+    """
+    staged = staging_path(path)
+    # Left behind by a run that stopped before the swap
+    staged.unlink(missing_ok=True)
+
+    disk = sqlite3.connect(path, timeout=busy_timeout(), isolation_level=None)
+    memory = sqlite3.connect(":memory:")
+    memory.execute("PRAGMA foreign_keys = ON")
+    try:
+        with _wrapped("Failed to load the database into memory"):
+            disk.execute("PRAGMA journal_mode=WAL")
+            init_schema(disk)
+            disk.backup(memory)
+            version = _data_version(disk)
+            exclusive = _lock(disk)
+            if exclusive and _data_version(disk) != version:
+                # Written to between the copy and the lock
+                disk.backup(memory)
+                version = _data_version(disk)
+
+        yield memory
+
+        with _wrapped("Failed to write the in-memory database back"):
+            # Work left uncommitted would be lost on disk too
+            if memory.in_transaction:
+                memory.rollback()
+            _stage(memory, staged)
+            if _data_version(disk) != version:
+                raise WriteConflictError(
+                    f"{path.name} was changed by another process; "
+                    "the in-memory changes were not written back"
+                )
+            if exclusive:
+                _replace(disk, staged, path)
+            else:
+                _copy_into(disk, staged)
+    finally:
+        memory.close()
+        disk.close()
+        staged.unlink(missing_ok=True)
+
+
+@contextmanager
+def _wrapped(message: str) -> Iterator[None]:
+    try:
+        yield
+    except sqlite3.Error as e:
+        wrapper = wrap_error(BackupError, message)
+        raise wrapper(e) from e
+
+
+def _data_version(connection: sqlite3.Connection) -> int:
+    # Changes when another connection commits to the file
+    return connection.execute("PRAGMA data_version").fetchone()[0]
+
+
+def _lock(disk: sqlite3.Connection) -> bool:
+    # In exclusive mode the lock is held until the connection closes. It
+    # is only granted while no other connection has the file open.
+    disk.execute("PRAGMA busy_timeout = 0")
+    disk.execute("PRAGMA locking_mode=EXCLUSIVE")
+    try:
+        disk.execute("BEGIN EXCLUSIVE")
+        disk.execute("ROLLBACK")
+        return True
+    except sqlite3.OperationalError:
+        disk.execute("PRAGMA locking_mode=NORMAL")
+        return False
+    finally:
+        disk.execute(f"PRAGMA busy_timeout = {int(busy_timeout() * 1000)}")
+
+
+def _stage(memory: sqlite3.Connection, staged: Path) -> None:
+    copy = sqlite3.connect(staged)
+    try:
+        memory.backup(copy)
+        # Like every connection from get_connection(). Other connections
+        # to a WAL file can be seen by _lock() even while they are idle.
+        copy.execute("PRAGMA journal_mode=WAL")
+        check_integrity(copy)
+    finally:
+        copy.close()
+    _fsync(staged)
+
+
+def _replace(disk: sqlite3.Connection, staged: Path, path: Path) -> None:
+    # Nothing from the old WAL may be replayed into the new file, and the
+    # lock on the old file must not let closing it remove the new file's
+    # WAL after the rename.
+    disk.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    disk.setconfig(sqlite3.SQLITE_DBCONFIG_NO_CKPT_ON_CLOSE)
+    for suffix in ("-wal", "-shm"):
+        path.with_name(path.name + suffix).unlink(missing_ok=True)
+    staged.replace(path)
+    _fsync(path.parent)
+
+
+def _copy_into(disk: sqlite3.Connection, staged: Path) -> None:
+    copy = sqlite3.connect(staged)
+    try:
+        copy.backup(disk)
+    finally:
+        copy.close()
+
+
+def _fsync(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
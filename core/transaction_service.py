@@ -5,7 +5,10 @@ from utils.helpers import wrap_error
 from core.utility_service import UtilityService
 from features.payable.base import PayOnly
 from features.transactions.model import Transaction
-from features.transactions.exceptions import TransactionLogError
+from features.transactions.exceptions import (
+    TransactionLogError,
+    DuplicateTransactionError,
+)
 
 
 class TransactionService:
@@ -35,10 +38,18 @@ class TransactionService:
             raise ValueError(f"Cannot withdraw from {account_type}.")
         model.withdraw(account_id, amount)
 
-    def log_transaction(self, data: dict) -> None:
+    def log_transaction(self, data: dict) -> int:
         try:
-            self.transactions.log(data)
+            return self.transactions.log(data)
+        except DuplicateTransactionError:
+            raise
         except TransactionLogError as e:
             raise wrap_error(TransactionLogError, "Transaction logging failed")(
                 e
             ) from e
+
+    def get_transaction(self, id: int) -> dict:
+        return self.transactions.get_one(id)[0]
+
+    def get_by_idempotency_key(self, key: str) -> dict:
+        return self.transactions.get_by_idempotency_key(key)[0]
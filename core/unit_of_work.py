@@ -0,0 +1,68 @@
+import time
+import sqlite3
+import itertools
+
+from typing import Iterator
+from contextlib import contextmanager
+
+from core.busy import lock_stats, retry_busy
+
+# Connections currently inside an atomic() block. Commits requested by the
+# models while a connection is listed here are deferred to the block's end.
+_active: set[int] = set()
+_savepoints = itertools.count()
+
+
+@contextmanager
+def atomic(connection: sqlite3.Connection) -> Iterator[None]:
+    """Run every write in the block as a single transaction.
+
+    Nested blocks on the same connection run inside a savepoint of the
+    outermost one: an error caught around a nested block undoes only that
+    block's writes.
+
+    The outermost block takes the write lock when it starts, so it waits
+    for other writers up front instead of failing partway through.
+    """
+    key = id(connection)
+    if key in _active:
+        name = f"atomic_{next(_savepoints)}"
+        connection.execute(f"SAVEPOINT {name}")
+        try:
+            yield
+        except BaseException:
+            connection.execute(f"ROLLBACK TO {name}")
+            connection.execute(f"RELEASE {name}")
+            raise
+        connection.execute(f"RELEASE {name}")
+        return
+
+    _active.add(key)
+    try:
+        if not connection.in_transaction:
+            started = time.perf_counter()
+            retry_busy(
+                connection, lambda: connection.execute("BEGIN IMMEDIATE")
+            )
+            lock_stats.record_wait(time.perf_counter() - started)
+        yield
+        retry_busy(connection, connection.commit)
+    except BaseException:
+        connection.rollback()
+        raise
+    finally:
+        _active.discard(key)
+
+
+def in_atomic(connection: sqlite3.Connection) -> bool:
+    return id(connection) in _active
+
+
+def commit(connection: sqlite3.Connection) -> None:
+    if not in_atomic(connection):
+        retry_busy(connection, connection.commit)
+
+
+def rollback(connection: sqlite3.Connection) -> None:
+    if not in_atomic(connection):
+        connection.rollback()
@@ -6,6 +6,7 @@ from utils.model_types import ModelType
 from features.payable.bill.model import Bills
 from features.transactions.model import Transaction
 from features.accounts.bank.model import Bank
+from features.accounts.loan.model import Loan
 from features.accounts.store_card.model import StoreCard
 from features.accounts.credit_card.model import CreditCard
 from features.payable.subscription.model import Subscriptions
@@ -16,6 +17,7 @@ class UtilityService:
         self.bank_model = Bank(db_connection)
         self.credit_card_model = CreditCard(db_connection)
         self.store_card_model = StoreCard(db_connection)
+        self.loan_model = Loan(db_connection)
         self.bill_model = Bills(db_connection)
         self.subscription_model = Subscriptions(db_connection)
         self.transaction_model = Transaction(db_connection)
@@ -32,6 +34,7 @@ class UtilityService:
             TYPE_CONFIG[TableName.STORECARDS][
                 "display_name"
             ]: self.store_card_model,
+            TYPE_CONFIG[TableName.LOANS]["display_name"]: self.loan_model,
             TYPE_CONFIG[TableName.SUBSCRIPTIONS][
                 "display_name"
             ]: self.subscription_model,
@@ -0,0 +1,164 @@
+import os
+import sys
+import time
+import ctypes
+import struct
+import ctypes.util
+
+from typing import Iterator
+from pathlib import Path
+from datetime import datetime
+
+from core.file_io import detect_format
+from utils.constants import IMPORT_FORMATS
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_ISDIR = 0x40000000
+_IN_CLOEXEC = 0o2000000
+
+# struct inotify_event: int wd; uint32_t mask, cookie, len; char name[]
+_EVENT = struct.Struct("iIII")
+_READ_SIZE = 64 * 1024
+
+
+def _inotify() -> ctypes.CDLL | None:
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(
+            ctypes.util.find_library("c") or "libc.so.6", use_errno=True
+        )
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+def is_importable(path: Path) -> bool:
+    return (
+        not path.name.startswith(".")
+        and path.is_file()
+        and detect_format(path) in IMPORT_FORMATS
+    )
+
+
+class InotifyWatcher:
+    """Report files closed after writing, or moved into, a directory.
+
+    Blocks in the kernel between events, so an idle watcher costs nothing.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        libc = _inotify()
+        if libc is None:
+            raise OSError("inotify is not available on this system")
+
+        self.directory = directory
+        self._fd = libc.inotify_init1(_IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        mask = _IN_CLOSE_WRITE | _IN_MOVED_TO
+        if libc.inotify_add_watch(self._fd, bytes(directory), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(error, f"Cannot watch {directory}")
+
+    def wait(self) -> list[Path]:
+        data = os.read(self._fd, _READ_SIZE)
+        paths = []
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if name and not mask & _IN_ISDIR:
+                paths.append(self.directory / os.fsdecode(name))
+        return paths
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Fallback that rescans a directory every ``interval`` seconds.
+
+    A file is reported once its size and modification time are unchanged
+    between two scans, so files still being written are left alone.
+    """
+
+    def __init__(self, directory: Path, interval: float) -> None:
+        self.directory = directory
+        self.interval = interval
+        self._pending: dict[Path, tuple[int, int]] = {}
+
+    def wait(self) -> list[Path]:
+        while not (ready := self.poll()):
+            time.sleep(self.interval)
+        return ready
+
+    def poll(self) -> list[Path]:
+        pending = {}
+        ready = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                path = Path(entry.path)
+                if not is_importable(path):
+                    continue
+                stat = entry.stat()
+                signature = (stat.st_size, stat.st_mtime_ns)
+                if self._pending.get(path) == signature:
+                    ready.append(path)
+                else:
+                    pending[path] = signature
+        # Only files still in the directory are remembered, so memory stays
+        # flat however long the watcher runs.
+        self._pending = pending
+        return sorted(ready)
+
+    def close(self) -> None:
+        pass
+
+
+def watch_directory(directory: Path, interval: float) -> Iterator[Path]:
+    """Yield files that are ready to import, waiting for new ones forever.
+
+    Uses inotify where available and falls back to polling. Files already
+    in the directory when watching starts are yielded first.
+    """
+    watcher: InotifyWatcher | PollingWatcher
+    try:
+        watcher = InotifyWatcher(directory)
+    except OSError:
+        watcher = PollingWatcher(directory, interval)
+
+    try:
+        if isinstance(watcher, InotifyWatcher):
+            yield from sorted(
+                path for path in directory.iterdir() if is_importable(path)
+            )
+        while True:
+            for path in watcher.wait():
+                if is_importable(path):
+                    yield path
+    finally:
+        watcher.close()
+
+
+def move_into(path: Path, folder: Path) -> Path:
+    """Move a file into ``folder`` without overwriting an earlier one."""
+    folder.mkdir(exist_ok=True)
+    target = folder / path.name
+    if target.exists():
+        # The stamp goes before every suffix so "a.csv.gz" keeps its format
+        stem, dot, suffixes = path.name.partition(".")
+        stamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        count = 0
+        while target.exists():
+            count += 1
+            target = folder / f"{stem}-{stamp}-{count}{dot}{suffixes}"
+    path.replace(target)
+    return target
@@ -5,6 +5,7 @@ from typing import override
 from utils.types import TableName
 from utils.loader import get_currency
 from utils.helpers import wrap_error
+from core.exceptions import WriteConflictError
 from features.accounts.base import Accounts
 from features.accounts.exceptions import (
     AccountHasBalanceError,
@@ -32,6 +33,18 @@ class Bank(Accounts):
             )
             raise wrapper(e) from e
 
+    @override
+    def open_many(
+        self, records: list[dict], upsert: bool = False
+    ) -> int:
+        try:
+            return super().open_many(records, upsert)
+        except Exception as e:
+            wrapper = wrap_error(
+                BankAccountOpenError, "Unable to open bank accounts."
+            )
+            raise wrapper(e) from e
+
     @override
     def close(self, id: int) -> None:
         try:
@@ -80,6 +93,15 @@ class Bank(Accounts):
             )
             raise wrapper(e) from e
 
+    @override
+    def check_balance(self, account: dict, balance: float) -> None:
+        limit = float(account.get("limiter", 0.0))
+        if balance < -limit:
+            raise AccountHasBalanceError(
+                f"A balance of {get_currency()}{balance:.2f} "
+                "would go below the overdraft limit."
+            )
+
     @override
     def deposit(self, id: int, amount: float) -> None:
         try:
@@ -94,6 +116,8 @@ class Bank(Accounts):
     def update(self, id: int, data: dict) -> None:
         try:
             super().update(id, data)
+        except WriteConflictError:
+            raise
         except Exception as e:
             wrapper = wrap_error(
                 BankAccountUpdateError, "Unable to update bank account "
@@ -4,6 +4,8 @@ CREATE_BANKS_TABLE = """
         provider TEXT NOT NULL,
         alias TEXT,
         balance REAL NOT NULL,
-        limiter REAL NOT NULL
+        limiter REAL NOT NULL,
+        version INTEGER NOT NULL DEFAULT 0,
+        closed_at TEXT
     )
 """
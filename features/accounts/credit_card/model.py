@@ -5,6 +5,7 @@ from typing import override
 from utils.types import TableName
 from utils.loader import get_currency
 from utils.helpers import wrap_error
+from core.exceptions import WriteConflictError
 from features.accounts.base import Accounts
 from features.accounts.exceptions import AccountHasBalanceError
 from features.accounts.credit_card.exceptions import (
@@ -22,13 +23,7 @@ class CreditCard(Accounts):
 
     @override
     def open(self, data: dict) -> None:
-        balance = data.get("balance")
-        limiter = data.get("limiter")
-
-        if balance is not None:
-            data["balance"] = -float(balance)
-        if limiter is not None:
-            data["limiter"] = -float(limiter)
+        self._negate_amounts(data)
 
         try:
             super().open(data)
@@ -39,6 +34,22 @@ class CreditCard(Accounts):
             )
             raise wrapper(e) from e
 
+    @override
+    def open_many(
+        self, records: list[dict], upsert: bool = False
+    ) -> int:
+        for data in records:
+            self._negate_amounts(data)
+
+        try:
+            return super().open_many(records, upsert)
+        except Exception as e:
+            wrapper = wrap_error(
+                CreditCardAccountOpenError,
+                "Unable to open credit card accounts.",
+            )
+            raise wrapper(e) from e
+
     @override
     def close(self, id: int) -> None:
         try:
@@ -87,6 +98,20 @@ class CreditCard(Accounts):
             )
             raise wrapper(e) from e
 
+    @override
+    def check_balance(self, account: dict, balance: float) -> None:
+        limit = float(account.get("limiter", 0.0))
+        if balance < -limit:
+            raise AccountHasBalanceError(
+                f"A balance of {get_currency()}{balance:.2f} "
+                "would go over the credit limit."
+            )
+        if balance > 0:
+            raise AccountHasBalanceError(
+                f"A balance of {get_currency()}{balance:.2f} "
+                "would overpay the card."
+            )
+
     @override
     def deposit(self, id: int, amount: float) -> None:
         try:
@@ -112,9 +137,20 @@ class CreditCard(Accounts):
     def update(self, id: int, data: dict) -> None:
         try:
             super().update(id, data)
+        except WriteConflictError:
+            raise
         except Exception as e:
             wrapper = wrap_error(
                 CreditCardAccountUpdateError,
                 "Unable to update credit card account ",
             )
             raise wrapper(e) from e
+
+    def _negate_amounts(self, data: dict) -> None:
+        balance = data.get("balance")
+        limiter = data.get("limiter")
+
+        if balance is not None:
+            data["balance"] = -float(balance)
+        if limiter is not None:
+            data["limiter"] = -float(limiter)
@@ -3,6 +3,8 @@ CREATE_CREDIT_CARDS_TABLE = """
         id INTEGER PRIMARY KEY,
         provider TEXT NOT NULL,
         balance REAL NOT NULL,
-        limiter REAL NOT NULL
+        limiter REAL NOT NULL,
+        version INTEGER NOT NULL DEFAULT 0,
+        closed_at TEXT
     )
 """
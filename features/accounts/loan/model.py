@@ -5,6 +5,7 @@ from typing import override
 from utils.types import TableName
 from utils.loader import get_currency
 from utils.helpers import wrap_error
+from core.exceptions import WriteConflictError
 from features.accounts.base import Accounts
 from features.accounts.exceptions import AccountHasBalanceError
 from features.accounts.loan.exceptions import (
@@ -31,6 +32,22 @@ class Loan(Accounts):
             )
             raise wrapper(e) from e
 
+    @override
+    def open_many(
+        self, records: list[dict], upsert: bool = False
+    ) -> int:
+        for data in records:
+            balance = data.get("balance") or 0.0
+            data["balance"] = -balance
+
+        try:
+            return super().open_many(records, upsert)
+        except Exception as e:
+            wrapper = wrap_error(
+                LoanAccountOpenError, "Unable to open loan accounts."
+            )
+            raise wrapper(e) from e
+
     @override
     def close(self, id: int) -> None:
         try:
@@ -45,6 +62,14 @@ class Loan(Accounts):
     def withdraw(self, id: int, amount: float) -> None:
         raise NotImplementedError("You cannot withdraw from a loan account")
 
+    @override
+    def check_balance(self, account: dict, balance: float) -> None:
+        if balance > 0:
+            raise AccountHasBalanceError(
+                f"A balance of {get_currency()}{balance:.2f} "
+                "would overpay the loan."
+            )
+
     @override
     def deposit(self, id: int, amount: float) -> None:
         try:
@@ -67,6 +92,8 @@ class Loan(Accounts):
     def update(self, id: int, data: dict) -> None:
         try:
             super().update(id, data)
+        except WriteConflictError:
+            raise
         except Exception as e:
             wrapper = wrap_error(
                 LoanAccountUpdateError, "Unable to update loan account "
@@ -34,6 +34,20 @@ class PayOnly(Table):
             wrapper = wrap_error(PayableOpenError, "Payable creation failed")
             raise wrapper(e) from e
 
+    def open_many(self, records: list[dict], upsert: bool = False) -> int:
+        try:
+            if upsert:
+                return self._upsert_many(records)
+            return self._create_many(records)
+        except ValidationError as e:
+            wrapper = wrap_error(
+                PayableOpenError, "Could not create new payables"
+            )
+            raise wrapper(e) from e
+        except QueryExecutionError as e:
+            wrapper = wrap_error(PayableOpenError, "Payable creation failed")
+            raise wrapper(e) from e
+
     def close(self, id: int) -> None:
         try:
             self.get_one(id)
@@ -42,7 +56,7 @@ class PayOnly(Table):
             raise wrapper(e) from e
 
         try:
-            self._delete(id)
+            self._close(id)
         except RecordNotFoundError as e:
             wrapper = wrap_error(
                 PayableNotFoundError, "Unable to find payable for deletion"
@@ -57,7 +71,7 @@ class PayOnly(Table):
     def update(self, id: int, data: dict) -> None:
         try:
             self.get_one(id)[0]
-            self._update(id, data)
+            self._update(id, data, data.get("version"))
         except RecordNotFoundError as e:
             wrapper = wrap_error(
                 PayableNotFoundError, "Could not find record to update "
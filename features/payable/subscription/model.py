@@ -4,6 +4,7 @@ from typing import override
 
 from utils.types import TableName
 from utils.helpers import wrap_error
+from core.exceptions import WriteConflictError
 from features.payable.base import PayOnly
 from features.payable.subscription.exceptions import (
     SubscriptionUpdateError,
@@ -26,6 +27,18 @@ class Subscriptions(PayOnly):
             )
             raise wrapper(e) from e
 
+    @override
+    def open_many(
+        self, records: list[dict], upsert: bool = False
+    ) -> int:
+        try:
+            return super().open_many(records, upsert)
+        except Exception as e:
+            wrapper = wrap_error(
+                SubscriptionCreationError, "Unable to create subscriptions"
+            )
+            raise wrapper(e) from e
+
     @override
     def close(self, id: int) -> None:
         try:
@@ -40,6 +53,8 @@ class Subscriptions(PayOnly):
     def update(self, id: int, data: dict) -> None:
         try:
             super().update(id, data)
+        except WriteConflictError:
+            raise
         except Exception as e:
             wrapper = wrap_error(
                 SubscriptionUpdateError, "Unable to update bill details "
@@ -2,6 +2,8 @@ CREATE_SUBSCRIPTIONS_TABLE = """
     CREATE TABLE IF NOT EXISTS subscriptions (
         id INTEGER PRIMARY KEY,
         provider TEXT NOT NULL,
-        monthly_charge REAL NOT NULL
+        monthly_charge REAL NOT NULL,
+        version INTEGER NOT NULL DEFAULT 0,
+        closed_at TEXT
     )
 """
@@ -6,6 +6,10 @@ class TransactionLogError(TransactionError):
     pass
 
 
+class DuplicateTransactionError(TransactionLogError):
+    pass
+
+
 class TransactionNotFoundError(TransactionError):
     pass
 
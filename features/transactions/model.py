@@ -1,8 +1,10 @@
 import sqlite3
+import hashlib
 
 from utils.types import TableName
-from utils.helpers import wrap_error
+from utils.helpers import wrap_error, normalize_date
 from core.base_model import Table
+from core.accounts_catalog import AccountCatalog
 from core.exceptions import (
     ValidationError,
     QueryExecutionError,
@@ -13,31 +15,180 @@ from features.transactions.exceptions import (
     TransactionFieldsError,
     TransactionUpdateError,
     TransactionNotFoundError,
+    DuplicateTransactionError,
 )
 
 
+# SQLite's default limit on bound parameters is 999 on older builds
+FINGERPRINT_LOOKUP_SIZE = 500
+
+
+def transaction_fingerprint(data: dict) -> str:
+    """Identify a transaction by its content rather than its row ID.
+
+    Built from the normalised date, amount, accounts and description so
+    the same statement line imported twice produces the same value. A
+    statement's own line reference, where given, tells apart identical
+    lines on the same day.
+    """
+    amount = data.get("amount")
+    try:
+        amount = f"{float(amount):.2f}"
+    except (TypeError, ValueError):
+        amount = str(amount)
+
+    parts = [
+        normalize_date(data.get("date")),
+        amount,
+        str(data.get("source_type") or "").strip().lower(),
+        str(data.get("source_id") or ""),
+        str(data.get("destination_type") or "").strip().lower(),
+        str(data.get("destination_id") or ""),
+        " ".join(str(data.get("description") or "").split()).casefold(),
+    ]
+    reference = str(data.get("reference") or "").strip()
+    if reference:
+        # Left out when empty so earlier fingerprints still match
+        parts.append(reference)
+    content = "|".join(parts).encode()
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
 class Transaction(Table):
+    hidden_columns = (
+        "fingerprint",
+        "idempotency_key",
+        "reference",
+        "source_account_id",
+        "destination_account_id",
+    )
+    read_from = "transaction_details"
+
     def __init__(self, db_connection: sqlite3.Connection) -> None:
         super().__init__(db_connection, TableName.TRANSACTIONS)
+        self.catalog = AccountCatalog(db_connection)
+
+    def _link_accounts(
+        self, data: dict, known: dict[tuple, int | None] | None = None
+    ) -> None:
+        # Points the row at both accounts' catalog ids, looked up once per
+        # account when ``known`` is shared across rows
+        known = {} if known is None else known
+        for role in ("source", "destination"):
+            if data.get(f"{role}_account_id") is not None:
+                continue
+            key = (data.get(f"{role}_type"), data.get(f"{role}_id"))
+            if key not in known:
+                known[key] = self.catalog.resolve(*key)
+            data[f"{role}_account_id"] = known[key]
 
-    def log(self, data: dict) -> None:
+    def log(self, data: dict) -> int:
+        data["fingerprint"] = transaction_fingerprint(data)
+        self._link_accounts(data)
+        data["idempotency_key"] = data.get("idempotency_key") or None
         try:
-            self._create(data)
+            return self._create(data)
         except ValidationError as e:
             wrapper = wrap_error(
                 TransactionLogError, "Could not log transaction"
             )
             raise wrapper(e) from e
+        except QueryExecutionError as e:
+            if data["idempotency_key"] and isinstance(
+                e.__cause__, sqlite3.IntegrityError
+            ):
+                raise DuplicateTransactionError(
+                    "Transaction with idempotency key "
+                    f"{data['idempotency_key']} already exists"
+                ) from e
+            wrapper = wrap_error(
+                TransactionLogError, "Could not log transaction"
+            )
+            raise wrapper(e) from e
+
+    def get_by_idempotency_key(self, key: str) -> list[dict[str, str]]:
+        try:
+            self._cursor.execute(
+                "SELECT * FROM transaction_details WHERE idempotency_key = ?",
+                (key,),
+            )
+            row = self._cursor.fetchone()
+        except sqlite3.Error as e:
+            wrapper = wrap_error(
+                TransactionNotFoundError, "Could not find transaction"
+            )
+            raise wrapper(e) from e
+        if not row:
+            raise TransactionNotFoundError(
+                f"No transaction with idempotency key {key}"
+            )
+        return [self._visible(self._row_to_dict(row))]
+
+    def log_many(self, records: list[dict]) -> int:
+        known: dict[tuple, int | None] = {}
+        for data in records:
+            data["fingerprint"] = transaction_fingerprint(data)
+            self._link_accounts(data, known)
+            # Keys guard single API calls against retries; a bulk import,
+            # such as a re-imported export, never claims them.
+            data["idempotency_key"] = None
+
+        try:
+            return self._create_many(records)
+        except ValidationError as e:
+            wrapper = wrap_error(
+                TransactionLogError, "Could not log transactions"
+            )
+            raise wrapper(e) from e
+        except QueryExecutionError as e:
+            wrapper = wrap_error(
+                TransactionLogError, "Could not log transactions"
+            )
+            raise wrapper(e) from e
+
+    def existing_fingerprints(self, fingerprints: list[str]) -> set[str]:
+        found: set[str] = set()
+        try:
+            for start in range(0, len(fingerprints), FINGERPRINT_LOOKUP_SIZE):
+                group = fingerprints[start : start + FINGERPRINT_LOOKUP_SIZE]
+                placeholders = ", ".join("?" for _ in group)
+                self._cursor.execute(
+                    "SELECT fingerprint FROM transactions "  # noqa: S608
+                    f"WHERE fingerprint IN ({placeholders})",
+                    group,
+                )
+                found.update(row[0] for row in self._cursor.fetchall())
+        except sqlite3.Error as e:
+            wrapper = wrap_error(
+                TransactionLogError, "Could not look up transactions"
+            )
+            raise wrapper(e) from e
+        return found
 
     def update(self, id: int, data: dict) -> None:
         try:
-            self.get_one(id)
+            current = self.get_one(id)[0]
         except RecordNotFoundError as e:
             wrapper = wrap_error(
                 TransactionNotFoundError, "Could not find transaction"
             )
             raise wrapper(e) from e
 
+        changes = {
+            key: value for key, value in data.items() if value is not None
+        }
+        data["fingerprint"] = transaction_fingerprint({**current, **changes})
+        # Accounts left as they were keep their reference, even if detached
+        moved = {
+            f"{role}_account_id": None
+            for role in ("source", "destination")
+            if {f"{role}_type", f"{role}_id"} & changes.keys()
+        }
+        if moved:
+            linked = {**current, **changes, **moved}
+            self._link_accounts(linked)
+            data.update({key: linked[key] for key in moved})
+
         try:
             self._update(id, data)
         except RecordNotFoundError as e:
@@ -3,13 +3,64 @@ CREATE_TRANSACTIONS_TABLE = """
         id INTEGER PRIMARY KEY,
         date TEXT NOT NULL,
         transaction_type TEXT NOT NULL,
-        source_provider TEXT,
-        source_type TEXT,
-        source_id INTEGER,
-        destination_provider TEXT,
-        destination_type TEXT,
-        destination_id INTEGER,
         description TEXT NOT NULL,
-        amount REAL NOT NULL
+        amount REAL NOT NULL,
+        fingerprint TEXT,
+        idempotency_key TEXT,
+        reference TEXT,
+        source_account_id INTEGER REFERENCES accounts (id),
+        destination_account_id INTEGER REFERENCES accounts (id)
     )
 """
+
+CREATE_TRANSACTIONS_FINGERPRINT_INDEX = """
+    CREATE INDEX IF NOT EXISTS idx_transactions_fingerprint
+    ON transactions (fingerprint)
+"""
+
+CREATE_TRANSACTIONS_IDEMPOTENCY_INDEX = """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_transactions_idempotency_key
+    ON transactions (idempotency_key)
+    WHERE idempotency_key IS NOT NULL
+"""
+
+CREATE_TRANSACTIONS_SOURCE_ACCOUNT_INDEX = """
+    CREATE INDEX IF NOT EXISTS idx_transactions_source_account
+    ON transactions (source_account_id)
+"""
+
+CREATE_TRANSACTIONS_DESTINATION_ACCOUNT_INDEX = """
+    CREATE INDEX IF NOT EXISTS idx_transactions_destination_account
+    ON transactions (destination_account_id)
+"""
+
+# Accounts are stored as catalog ids; their names, types and per-type ids
+# are read through this view, in the columns transactions used to store
+CREATE_TRANSACTION_DETAILS_VIEW = """
+    CREATE VIEW IF NOT EXISTS transaction_details AS
+    SELECT
+        t.id,
+        t.date,
+        t.transaction_type,
+        CASE WHEN IFNULL(s.alias, '') = '' THEN s.provider
+            ELSE s.provider || ' (' || s.alias || ')' END AS source_provider,
+        st.name AS source_type,
+        s.type_id AS source_id,
+        CASE WHEN IFNULL(d.alias, '') = '' THEN d.provider
+            ELSE d.provider || ' (' || d.alias || ')'
+            END AS destination_provider,
+        dt.name AS destination_type,
+        d.type_id AS destination_id,
+        t.description,
+        t.amount,
+        t.fingerprint,
+        t.idempotency_key,
+        t.reference,
+        t.source_account_id,
+        t.destination_account_id
+    FROM transactions t
+    LEFT JOIN accounts s ON s.id = t.source_account_id
+    LEFT JOIN account_types st ON st.code = s.type_code
+    LEFT JOIN accounts d ON d.id = t.destination_account_id
+    LEFT JOIN account_types dt ON dt.code = d.type_code
+"""
@@ -0,0 +1,201 @@
+import sqlite3
+import unittest
+
+from core.db import init_schema
+from core.exceptions import RecordNotFoundError
+from core.accounts_catalog import AccountCatalog
+from features.accounts.bank.model import Bank
+from features.payable.bill.model import Bills
+from features.transactions.model import Transaction
+from features.accounts.bank.schema import CREATE_BANKS_TABLE
+from features.accounts.credit_card.model import CreditCard
+
+# The transactions table as written before accounts were referenced by id
+LEGACY_TRANSACTIONS = """
+    CREATE TABLE transactions (
+        id INTEGER PRIMARY KEY,
+        date TEXT NOT NULL,
+        transaction_type TEXT NOT NULL,
+        source_provider TEXT,
+        source_type TEXT,
+        source_id INTEGER,
+        destination_provider TEXT,
+        destination_type TEXT,
+        destination_id INTEGER,
+        description TEXT NOT NULL,
+        amount REAL NOT NULL
+    );
+"""
+
+
+class TestAccountCatalog(unittest.TestCase):
+    def setUp(self) -> None:
+        self.connection = sqlite3.connect(":memory:")
+        init_schema(self.connection)
+        self.catalog = AccountCatalog(self.connection)
+        Bank(self.connection).open(
+            {
+                "provider": "BankA",
+                "alias": "Main",
+                "balance": 10.0,
+                "limiter": 0.0,
+            }
+        )
+        CreditCard(self.connection).open(
+            {"provider": "BankA", "balance": 5.0, "limiter": 100.0}
+        )
+        Bills(self.connection).open({"provider": "Power", "monthly_charge": 40})
+
+    def tearDown(self) -> None:
+        self.connection.close()
+
+    def test_accounts_of_every_type_share_one_id_space(self) -> None:
+        bank = self.catalog.resolve("bank", 1)
+        card = self.catalog.resolve("credit card", 1)
+        self.assertNotEqual(bank, card)
+        self.assertEqual(
+            self.catalog.get(card),
+            {
+                "id": card,
+                "account_type": "credit card",
+                "type_id": 1,
+                "provider": "BankA",
+                "alias": None,
+                "balance": -5.0,
+            },
+        )
+        self.assertEqual(
+            [a["account_type"] for a in self.catalog.find("BankA")],
+            ["bank", "credit card"],
+        )
+
+    def test_catalog_follows_updates_and_deletes(self) -> None:
+        Bank(self.connection).deposit(1, 15.0)
+        bank = self.catalog.resolve("bank", 1)
+        self.assertEqual(self.catalog.get(bank)["balance"], 25.0)
+
+        Bills(self.connection).close(1)
+        self.assertIsNone(self.catalog.resolve("bill", 1))
+        with self.assertRaises(RecordNotFoundError):
+            self.catalog.get(3)
+
+    def test_summary_by_type(self) -> None:
+        summary = {row["account_type"]: row for row in self.catalog.summary()}
+        self.assertEqual(summary["bank"]["balance"], 10.0)
+        self.assertEqual(summary["bill"]["count"], 1)
+        self.assertEqual(summary["loan"]["count"], 0)
+
+    def test_transactions_reference_catalog_ids(self) -> None:
+        transactions = Transaction(self.connection)
+        transactions.log(
+            {
+                "date": "2024-01-01",
+                "transaction_type": "transfer",
+                "source_type": "bank",
+                "source_id": 1,
+                "destination_type": "credit card",
+                "destination_id": 1,
+                "description": "Pay card",
+                "amount": 5.0,
+            }
+        )
+        refs = self.connection.execute(
+            "SELECT source_account_id, destination_account_id "
+            "FROM transactions"
+        ).fetchone()
+        self.assertEqual(
+            refs,
+            (
+                self.catalog.resolve("bank", 1),
+                self.catalog.resolve("credit card", 1),
+            ),
+        )
+
+    def test_account_with_history_is_closed_not_deleted(self) -> None:
+        banks = Bank(self.connection)
+        banks.withdraw(1, 10.0)
+        Transaction(self.connection).log(
+            {
+                "date": "2024-01-01",
+                "transaction_type": "withdraw",
+                "source_type": "bank",
+                "source_id": 1,
+                "description": "Cash",
+                "amount": 10.0,
+            }
+        )
+        account = self.catalog.resolve("bank", 1)
+
+        banks.close(1)
+
+        closed = self.connection.execute(
+            "SELECT closed_at FROM banks WHERE id = 1"
+        ).fetchone()
+        self.assertIsNotNone(closed[0])
+        self.assertEqual(banks.get_many(), [])
+        with self.assertRaises(RecordNotFoundError):
+            banks.get_one(1)
+        self.assertIsNone(self.catalog.resolve("bank", 1))
+        self.assertEqual(self.catalog.get(account)["provider"], "BankA")
+        self.assertEqual(
+            [a["account_type"] for a in self.catalog.find("BankA")],
+            ["credit card"],
+        )
+        provider = self.connection.execute(
+            "SELECT source_provider FROM transaction_details"
+        ).fetchone()
+        self.assertEqual(provider[0], "BankA (Main)")
+
+    def test_open_account_lookups_skip_closed_ones(self) -> None:
+        plan = self.connection.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM "
+            f"{Bank(self.connection)._source} WHERE provider IN (?)",
+            ("BankA",),
+        ).fetchall()
+        self.assertIn("idx_banks_open", " ".join(row[-1] for row in plan))
+
+    def test_older_transactions_are_backfilled(self) -> None:
+        connection = sqlite3.connect(":memory:")
+        self.addCleanup(connection.close)
+        connection.executescript(LEGACY_TRANSACTIONS + CREATE_BANKS_TABLE)
+        connection.execute(
+            "INSERT INTO banks (provider, alias, balance, limiter) "
+            "VALUES ('BankA', 'Main', 10, 0)"
+        )
+        connection.executemany(
+            "INSERT INTO transactions (date, transaction_type, "
+            "source_provider, source_type, source_id, destination_provider, "
+            "destination_type, destination_id, description, amount) "
+            "VALUES ('2024-01-01', ?, ?, ?, ?, ?, ?, ?, 'Pay', 1)",
+            [
+                ("deposit", None, None, None, "BankA", "Bank", 1),
+                ("withdraw", "OldCard", "credit card", 7, None, None, None),
+            ],
+        )
+        connection.commit()
+
+        init_schema(connection)
+
+        catalog = AccountCatalog(connection)
+        columns = {
+            row[1]
+            for row in connection.execute("PRAGMA table_info(transactions)")
+        }
+        self.assertNotIn("source_provider", columns)
+        rows = connection.execute(
+            "SELECT source_provider, source_type, destination_account_id, "
+            "destination_provider FROM transaction_details ORDER BY id"
+        ).fetchall()
+        self.assertEqual(
+            rows,
+            [
+                (None, None, catalog.resolve("bank", 1), "BankA (Main)"),
+                ("OldCard", "credit card", None, None),
+            ],
+        )
+        # The card was closed before the catalog existed
+        self.assertIsNone(catalog.resolve("credit card", 7))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+import sqlite3
+import tempfile
+import unittest
+
+from pathlib import Path
+
+from core.db import init_schema
+from core.controller import Controller
+from core.archive import TransactionArchive
+from core.import_service import ImportService
+from features.accounts.bank.model import Bank
+
+
+class TestTransactionArchive(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = Path(self.tmp.name)
+        self.connection = sqlite3.connect(self.folder / "main.db")
+        init_schema(self.connection)
+        self.archive = TransactionArchive(self.connection, self.folder)
+        self.connection.execute(
+            "INSERT INTO banks (provider, alias, balance, limiter) "
+            "VALUES ('BankA', 'Main', 0, 0)"
+        )
+        for date, amount in [
+            ("2022-03-01", 10.0),
+            ("2022-03-15", 5.0),
+            ("2023-07-01", 20.0),
+            ("2024-01-02", 1.0),
+        ]:
+            self._insert_transaction(date, amount)
+
+    def tearDown(self) -> None:
+        self.connection.close()
+        self.tmp.cleanup()
+
+    def _insert_transaction(self, date: str, amount: float) -> None:
+        self.connection.execute(
+            "INSERT INTO transactions (date, transaction_type, "
+            "destination_account_id, description, amount, fingerprint) "
+            "VALUES (?, 'deposit', 1, 'Pay', ?, ?)",
+            (date, amount, f"{date}-{amount}"),
+        )
+        self.connection.commit()
+
+    def _main_dates(self) -> list[str]:
+        rows = self.connection.execute(
+            "SELECT date FROM transactions ORDER BY date"
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def test_archive_moves_rows_into_yearly_files(self) -> None:
+        results = self.archive.archive_before(2024)
+
+        self.assertEqual(
+            [(r["year"], r["rows"]) for r in results], [(2022, 2), (2023, 1)]
+        )
+        self.assertTrue((self.folder / "2022.db").exists())
+        self.assertEqual(self._main_dates(), ["2024-01-02"])
+        self.assertEqual(self.archive.years(), [2022, 2023])
+
+        rollups = self.archive.rollups()
+        self.assertEqual(
+            [(r["month"], r["count"], r["amount"]) for r in rollups],
+            [("2022-03", 2, 15.0), ("2023-07", 1, 20.0)],
+        )
+
+    def test_exports_include_archived_years(self) -> None:
+        self.archive.archive_before(2024)
+        controller = Controller(self.connection)
+        controller.archive = self.archive
+
+        batches = controller.iter_batches({"account_type": "transaction"}, 2)
+
+        self.assertEqual(
+            [[r["date"] for r in batch] for batch in batches],
+            [["2022-03-01", "2022-03-15"], ["2023-07-01"], ["2024-01-02"]],
+        )
+        self.assertEqual(
+            self.connection.execute("PRAGMA database_list").fetchall()[1:], []
+        )
+
+    def test_dedupe_skips_archived_transactions(self) -> None:
+        path = self.folder / "statement.csv"
+        path.write_text(
+            "date,transaction_type,destination_type,destination_id,"
+            "description,amount\n"
+            "2022-05-01,deposit,bank,1,Refund,4\n"
+            "2024-05-01,deposit,bank,1,Refund,4\n"
+        )
+        service = ImportService(self.connection)
+        service.archive = self.archive
+        service.import_file(path, "transaction", 10, dedupe=True)
+        self.archive.archive_before(2024)
+
+        result = service.import_file(path, "transaction", 10, dedupe=True)
+
+        self.assertEqual((result["imported"], result["duplicates"]), (0, 2))
+
+    def test_archived_idempotency_key_is_replayed(self) -> None:
+        controller = Controller(self.connection)
+        controller.archive = self.archive
+        data = {
+            "transaction_type": "deposit",
+            "destination_type": "bank",
+            "destination_id": 1,
+            "amount": 8.0,
+            "date": "2022-05-01",
+            "description": "Retried deposit",
+            "idempotency_key": "job-7",
+        }
+        first = controller.transaction(dict(data))
+        self.archive.archive_before(2024)
+
+        second = controller.transaction(dict(data))
+
+        self.assertTrue(second.pop("replayed"))
+        self.assertEqual(second["id"], first["id"])
+        self.assertEqual(self._main_dates(), ["2024-01-02"])
+
+    def test_accounts_with_archived_history_are_kept(self) -> None:
+        self.archive.archive_before(2025)
+
+        Bank(self.connection).close(1)
+        closed = self.connection.execute(
+            "SELECT closed_at FROM banks WHERE id = 1"
+        ).fetchone()
+        self.assertIsNotNone(closed[0])
+        self.connection.execute("DELETE FROM banks WHERE id = 1")
+        self.connection.commit()
+
+        names = {r["destination_provider"] for r in self.archive.query()}
+        self.assertEqual(names, {"BankA (Main)"})
+        self.assertEqual(
+            self.connection.execute(
+                "SELECT type_id, closed_at IS NOT NULL FROM accounts "
+                "WHERE id = 1"
+            ).fetchone(),
+            (None, 1),
+        )
+
+    def test_query_reads_archives_in_range(self) -> None:
+        self.archive.archive_before(2024)
+        # Imported after its year was archived
+        self._insert_transaction("2022-12-31", 2.0)
+
+        everything = self.archive.query()
+        self.assertEqual(
+            [r["date"] for r in everything],
+            [
+                "2022-03-01",
+                "2022-03-15",
+                "2022-12-31",
+                "2023-07-01",
+                "2024-01-02",
+            ],
+        )
+        self.assertNotIn("fingerprint", everything[0])
+
+        some = self.archive.query("2022-03-10", "2023-01-01")
+        self.assertEqual(
+            [r["date"] for r in some], ["2022-03-15", "2022-12-31"]
+        )
+        databases = self.connection.execute("PRAGMA database_list")
+        self.assertEqual([row[1] for row in databases], ["main"])
+
+    def test_interrupted_run_is_ignored_then_cleared(self) -> None:
+        self.archive.archive_before(2023)
+        # A run that copied its rows but stopped before deleting them
+        self.connection.execute(
+            "ATTACH DATABASE ? AS stale", (str(self.folder / "2022.db"),)
+        )
+        self.connection.execute(
+            "INSERT INTO stale.transactions (id, date, transaction_type, "
+            "description, amount, archive_run) "
+            "VALUES (99, '2022-05-01', 'deposit', 'Pay', 3, 42)"
+        )
+        self.connection.commit()
+        self.connection.execute("DETACH DATABASE stale")
+
+        dates = [r["date"] for r in self.archive.query(end="2022-12-31")]
+        self.assertEqual(dates, ["2022-03-01", "2022-03-15"])
+
+        self._insert_transaction("2022-06-01", 4.0)
+        self.archive.archive_before(2023)
+        dates = [r["date"] for r in self.archive.query(end="2022-12-31")]
+        self.assertEqual(dates, ["2022-03-01", "2022-03-15", "2022-06-01"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from pathlib import Path
+
+from core.db import init_schema
+from core.backup import (
+    backup_path,
+    rotate_backups,
+    backup_database,
+    restore_database,
+)
+from core.exceptions import BackupError
+
+
+class TestBackup(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.connection = sqlite3.connect(self.dir / "live.db")
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        init_schema(self.connection)
+        self._insert_bank("BankA")
+
+    def tearDown(self) -> None:
+        self.connection.close()
+        self.tmp.cleanup()
+
+    def _insert_bank(self, provider: str) -> None:
+        self.connection.execute(
+            "INSERT INTO banks (provider, alias, balance, limiter) "
+            "VALUES (?, ?, ?, ?)",
+            (provider, "Main", 0.0, 100.0),
+        )
+        self.connection.commit()
+
+    def _providers(self) -> list[str]:
+        rows = self.connection.execute(
+            "SELECT provider FROM banks ORDER BY id"
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def test_backup_and_restore_round_trip(self) -> None:
+        for compression in (None, "gzip", "xz"):
+            with self.subTest(compression=compression):
+                target = backup_path(self.dir / "backups", compression)
+                result = backup_database(
+                    self.connection, target, compression, pages=1
+                )
+                self.assertTrue(target.exists())
+                self.assertGreater(result["pages"], 0)
+
+                self._insert_bank("BankB")
+                restore_database(self.connection, target)
+                self.assertEqual(self._providers(), ["BankA"])
+
+    def test_backup_is_a_single_file(self) -> None:
+        target = self.dir / "copy.db"
+        backup_database(self.connection, target)
+
+        self.assertEqual(
+            sorted(path.name for path in self.dir.iterdir()),
+            sorted(["live.db", "live.db-wal", "live.db-shm", "copy.db"]),
+        )
+        copy = sqlite3.connect(target)
+        mode = copy.execute("PRAGMA journal_mode").fetchone()[0]
+        copy.close()
+        self.assertEqual(mode, "delete")
+
+    def test_restore_rejects_corrupt_file(self) -> None:
+        target = self.dir / "broken.db"
+        target.write_bytes(b"not a database" * 100)
+
+        with self.assertRaises(BackupError):
+            restore_database(self.connection, target)
+        self.assertEqual(self._providers(), ["BankA"])
+
+    def test_backup_path_does_not_overwrite(self) -> None:
+        first = backup_path(self.dir)
+        first.write_text("x")
+        second = backup_path(self.dir)
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(second.suffix, ".db")
+
+    def test_rotate_keeps_newest(self) -> None:
+        names = [f"financli-2024-01-0{day}-000000.db" for day in range(1, 5)]
+        for mtime, name in enumerate(names):
+            path = self.dir / name
+            path.write_text("x")
+            os.utime(path, (mtime, mtime))
+
+        removed = rotate_backups(self.dir, 2)
+
+        self.assertEqual([path.name for path in removed], names[:2])
+        self.assertTrue((self.dir / "live.db").exists())
+        self.assertEqual(len(list(self.dir.glob("financli-*"))), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,9 +2,11 @@ import sqlite3
 import unittest
 
 from utils.loader import get_currency
-from core.exceptions import RecordNotFoundError
+from core.exceptions import WriteConflictError, RecordNotFoundError
+from core.accounts_catalog import create_catalog
 from features.accounts.bank.model import Bank
 from features.accounts.bank.schema import CREATE_BANKS_TABLE
+from features.transactions.schema import CREATE_TRANSACTIONS_TABLE
 from features.accounts.bank.exceptions import (
     BankAccountOpenError,
     BankAccountCloseError,
@@ -19,6 +21,8 @@ class TestBank(unittest.TestCase):
         self.connection = sqlite3.connect(":memory:")
         self.cursor = self.connection.cursor()
         self.cursor.execute(CREATE_BANKS_TABLE)
+        self.cursor.execute(CREATE_TRANSACTIONS_TABLE)
+        create_catalog(self.cursor)
         self.connection.commit()
         self.bank = Bank(self.connection)
 
@@ -45,6 +49,7 @@ class TestBank(unittest.TestCase):
                     "alias": "Savings",
                     "balance": 100.0,
                     "limiter": 50.0,
+                    "version": 0,
                 }
             ],
         )
@@ -103,6 +108,7 @@ class TestBank(unittest.TestCase):
                     "alias": "Savings",
                     "balance": -20.0,
                     "limiter": 50.0,
+                    "version": 1,
                 }
             ],
         )
@@ -153,6 +159,7 @@ class TestBank(unittest.TestCase):
                     "alias": "Savings",
                     "balance": 150.0,
                     "limiter": 50.0,
+                    "version": 1,
                 }
             ],
         )
@@ -186,10 +193,24 @@ class TestBank(unittest.TestCase):
                     "alias": "NewAlias",
                     "balance": 100.0,
                     "limiter": 75.0,
+                    "version": 1,
                 }
             ],
         )
 
+    def test_update_stale_version_raises_conflict(self) -> None:
+        self.cursor.execute(
+            "INSERT INTO banks (provider, alias, balance, limiter) "
+            "VALUES (?, ?, ?, ?)",
+            ("BankA", "OldAlias", 100.0, 50.0),
+        )
+        self.connection.commit()
+        self.bank.update(1, {"alias": "NewAlias", "version": 0})
+
+        with self.assertRaises(WriteConflictError):
+            self.bank.update(1, {"alias": "Other", "version": 0})
+        self.assertEqual(self.bank.get_one(1)[0]["alias"], "NewAlias")
+
     def test_update_account_not_found(self) -> None:
         update_data = {"alias": "UpdatedAlias"}
         with self.assertRaises(BankAccountUpdateError) as context:
@@ -1,13 +1,19 @@
 import sqlite3
+import tempfile
 import unittest
 
+from pathlib import Path
+from unittest import mock
+
 from utils.types import TableName
 from core.base_model import Table
 from core.exceptions import (
     ValidationError,
+    WriteConflictError,
     ColumnMismatchError,
     RecordNotFoundError,
 )
+from features.accounts.bank.schema import CREATE_BANKS_TABLE
 
 
 class TestTable(unittest.TestCase):
@@ -75,6 +81,24 @@ class TestTable(unittest.TestCase):
         result: list[dict[str, str]] = self.table.get_many()
         self.assertEqual(len(result), 2)
 
+    def test_iter_batches(self) -> None:
+        """Test streaming all records in fixed-size batches."""
+        self.cursor.executemany(
+            "INSERT INTO banks (name, balance) VALUES (?, ?)",
+            [(f"Name {i}", float(i)) for i in range(5)],
+        )
+        self.connection.commit()
+
+        batches = list(self.table.iter_batches(2))
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+        self.assertEqual(
+            batches[2], [{"id": 5, "name": "Name 4", "balance": 4.0}]
+        )
+
+    def test_iter_batches_empty(self) -> None:
+        """Test streaming an empty table yields no batches."""
+        self.assertEqual(list(self.table.iter_batches(10)), [])
+
     def test_create_valid(self) -> None:
         """Test inserting a valid record."""
         data: dict[str, str] = {"name": "John Doe", "balance": "100.0"}
@@ -154,5 +178,58 @@ class TestTable(unittest.TestCase):
             self.table._row_to_dict(row)
 
 
+class TestVersionedTable(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        path = Path(self.tmp.name) / "versions.db"
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(CREATE_BANKS_TABLE)
+        self.connection.execute(
+            "INSERT INTO banks (provider, alias, balance, limiter) "
+            "VALUES ('BankA', 'Main', 0, 0)"
+        )
+        self.connection.commit()
+        self.other = sqlite3.connect(path)
+        self.table = Table(self.connection, TableName.BANKS)
+
+    def tearDown(self) -> None:
+        self.other.close()
+        self.connection.close()
+        self.tmp.cleanup()
+
+    def test_version_is_not_required_and_counts_writes(self) -> None:
+        self.assertNotIn("version", self.table.required_columns)
+        self.table._update(1, {"alias": "Bills"})
+        self.table._update(1, {"alias": "Savings"})
+
+        self.assertEqual(self.table.get_one(1)[0]["version"], 2)
+
+    def test_stale_expected_version_is_refused(self) -> None:
+        self.table._update(1, {"alias": "Bills"})
+
+        with self.assertRaises(WriteConflictError):
+            self.table._update(1, {"alias": "Savings"}, expected_version=0)
+        self.assertEqual(self.table.get_one(1)[0]["alias"], "Bills")
+
+    def test_concurrent_write_is_not_overwritten(self) -> None:
+        fetch_one = self.table._fetch_one
+
+        def read_then_race(id: int) -> dict:
+            record = fetch_one(id)
+            # Another process writes between this read and the update
+            self.other.execute(
+                "UPDATE banks SET balance = 50, version = version + 1"
+            )
+            self.other.commit()
+            return record
+
+        with mock.patch.object(self.table, "_fetch_one", read_then_race):
+            with self.assertRaises(WriteConflictError):
+                self.table._update(1, {"balance": "10"})
+
+        record = self.table.get_one(1)[0]
+        self.assertEqual((record["balance"], record["version"]), (50.0, 1))
+
+
 if __name__ == "__main__":
     unittest.main()
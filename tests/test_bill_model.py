@@ -2,8 +2,10 @@ import sqlite3
 import unittest
 
 from core.exceptions import RecordNotFoundError
+from core.accounts_catalog import create_catalog
 from features.payable.bill.model import Bills
 from features.payable.bill.schema import CREATE_BILLS_TABLE
+from features.transactions.schema import CREATE_TRANSACTIONS_TABLE
 from features.payable.bill.exceptions import (
     BillUpdateError,
     BillProviderCloseError,
@@ -16,6 +18,8 @@ class TestBills(unittest.TestCase):
         self.connection = sqlite3.connect(":memory:")
         self.cursor = self.connection.cursor()
         self.cursor.execute(CREATE_BILLS_TABLE)
+        self.cursor.execute(CREATE_TRANSACTIONS_TABLE)
+        create_catalog(self.cursor)
         self.connection.commit()
         self.bills = Bills(self.connection)
 
@@ -38,6 +42,7 @@ class TestBills(unittest.TestCase):
                     "id": 1,
                     "provider": "Electric Co",
                     "monthly_charge": 75.50,
+                    "version": 0,
                 }
             ],
         )
@@ -87,6 +92,7 @@ class TestBills(unittest.TestCase):
                     "id": 1,
                     "provider": "Gas Co",
                     "monthly_charge": 65.00,
+                    "version": 1,
                 }
             ],
         )
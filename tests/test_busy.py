@@ -0,0 +1,126 @@
+import sqlite3
+import tempfile
+import unittest
+import threading
+
+from pathlib import Path
+from unittest import mock
+
+from core.db import open_connection
+from core.unit_of_work import atomic
+from features.accounts.bank.model import Bank
+from core.busy import is_busy, lock_stats, retry_busy, set_busy_timeout
+from utils.constants import BUSY_TIMEOUT
+
+
+def _locked() -> sqlite3.OperationalError:
+    error = sqlite3.OperationalError("database is locked")
+    error.sqlite_errorcode = sqlite3.SQLITE_BUSY
+    return error
+
+
+class TestRetryBusy(unittest.TestCase):
+    def setUp(self) -> None:
+        self.connection = sqlite3.connect(":memory:")
+        lock_stats.reset()
+        patcher = mock.patch("core.busy.time.sleep")
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self) -> None:
+        self.connection.close()
+
+    def test_busy_errors_are_retried(self) -> None:
+        operation = mock.Mock(side_effect=[_locked(), _locked(), "done"])
+
+        self.assertEqual(retry_busy(self.connection, operation), "done")
+        self.assertEqual(operation.call_count, 3)
+        self.assertEqual(lock_stats.retries, 2)
+        # Full jitter: each pause is at most the doubled base delay
+        first, second = (call.args[0] for call in self.sleep.call_args_list)
+        self.assertLessEqual(first, 0.05)
+        self.assertLessEqual(second, 0.1)
+
+    def test_gives_up_after_last_attempt(self) -> None:
+        operation = mock.Mock(side_effect=_locked())
+
+        with self.assertRaises(sqlite3.OperationalError):
+            retry_busy(self.connection, operation, attempts=3)
+        self.assertEqual(operation.call_count, 3)
+        self.assertEqual(lock_stats.failures, 1)
+
+    def test_other_errors_are_not_retried(self) -> None:
+        operation = mock.Mock(side_effect=sqlite3.OperationalError("no"))
+
+        with self.assertRaises(sqlite3.OperationalError):
+            retry_busy(self.connection, operation)
+        self.assertEqual(operation.call_count, 1)
+        self.assertFalse(is_busy(sqlite3.IntegrityError("locked")))
+
+    def test_partly_applied_operation_is_not_repeated(self) -> None:
+        self.connection.execute("CREATE TABLE t (x)")
+
+        def operation() -> None:
+            self.connection.execute("INSERT INTO t VALUES (1)")
+            raise _locked()
+
+        with self.assertRaises(sqlite3.OperationalError):
+            retry_busy(self.connection, operation)
+        count = self.connection.execute("SELECT COUNT(*) FROM t").fetchone()
+        self.assertEqual(count[0], 1)
+
+
+class TestWriteLock(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "live.db"
+        lock_stats.reset()
+        set_busy_timeout(0)
+        self.first = open_connection(self.path)
+        self.second = open_connection(self.path)
+
+    def tearDown(self) -> None:
+        set_busy_timeout(BUSY_TIMEOUT)
+        self.first.close()
+        self.second.close()
+        self.tmp.cleanup()
+
+    def test_atomic_takes_write_lock_at_start(self) -> None:
+        with atomic(self.first):
+            with self.assertRaises(sqlite3.OperationalError) as caught:
+                self.second.execute("BEGIN IMMEDIATE")
+            self.assertTrue(is_busy(caught.exception))
+        self.assertEqual(lock_stats.acquisitions, 1)
+
+    def test_writer_retries_until_lock_is_released(self) -> None:
+        locked = threading.Event()
+
+        def hold_lock() -> None:
+            connection = sqlite3.connect(self.path)
+            connection.execute("BEGIN IMMEDIATE")
+            locked.set()
+            threading.Event().wait(0.02)
+            connection.rollback()
+            connection.close()
+
+        holder = threading.Thread(target=hold_lock)
+        holder.start()
+        locked.wait()
+        try:
+            Bank(self.second).open(
+                {
+                    "provider": "BankA",
+                    "alias": "Main",
+                    "balance": 10.0,
+                    "limiter": 0.0,
+                }
+            )
+        finally:
+            holder.join()
+
+        self.assertGreater(lock_stats.retries, 0)
+        self.assertEqual(len(Bank(self.second).get_many()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+import sqlite3
+import unittest
+
+from core.db import init_schema
+from core.controller import Controller
+
+BANK = {"account_type": "bank"}
+
+
+class TestChangeLog(unittest.TestCase):
+    def setUp(self) -> None:
+        self.connection = sqlite3.connect(":memory:")
+        init_schema(self.connection)
+        self.cursor = self.connection.cursor()
+        self.controller = Controller(self.connection)
+
+    def tearDown(self) -> None:
+        self.connection.close()
+
+    def _insert_bank(self, provider: str) -> None:
+        self.cursor.execute(
+            "INSERT INTO banks (provider, alias, balance, limiter) "
+            "VALUES (?, ?, ?, ?)",
+            (provider, "Main", 0.0, 100.0),
+        )
+        self.connection.commit()
+
+    def _insert_transaction(self) -> None:
+        self.cursor.execute(
+            "INSERT INTO transactions "
+            "(date, transaction_type, description, amount) "
+            "VALUES ('2024-01-01', 'deposit', 'Pay', 1)"
+        )
+        self.connection.commit()
+
+    def _export(self, destination: str) -> tuple[list[dict], bool]:
+        batches, seq, full = self.controller.iter_changes(
+            BANK, destination, 2
+        )
+        records = [record for batch in batches for record in batch]
+        self.controller.set_watermark(BANK, destination, seq)
+        return records, full
+
+    def test_changes_are_only_logged_once_exported(self) -> None:
+        self._insert_bank("BankA")
+        self._insert_transaction()
+        self.cursor.execute("SELECT COUNT(*) FROM change_log")
+        self.assertEqual(self.cursor.fetchone()[0], 0)
+
+        self._export("backup")
+        self._insert_bank("BankB")
+        self._insert_transaction()
+        self.cursor.execute("SELECT table_name FROM change_log")
+        self.assertEqual(self.cursor.fetchall(), [("banks",)])
+
+    def test_first_export_keeps_logging_when_reopened(self) -> None:
+        batches, seq, _ = self.controller.iter_changes(BANK, "backup", 10)
+        list(batches)
+        # Another process opens the database while the export runs
+        init_schema(self.connection)
+        self.controller.set_watermark(BANK, "backup", seq)
+
+        self._insert_bank("BankA")
+        init_schema(self.connection)
+        records, full = self._export("backup")
+        self.assertFalse(full)
+        self.assertEqual([r["provider"] for r in records], ["BankA"])
+
+    def test_missing_triggers_are_restored(self) -> None:
+        self._export("backup")
+        self.cursor.execute("DROP TRIGGER banks_log_insert")
+
+        init_schema(self.connection)
+        self._insert_bank("BankA")
+        records, _ = self._export("backup")
+        self.assertEqual([r["provider"] for r in records], ["BankA"])
+
+    def test_first_export_is_full(self) -> None:
+        self._insert_bank("BankA")
+        self._insert_bank("BankB")
+
+        records, full = self._export("backup")
+        self.assertTrue(full)
+        self.assertEqual(
+            [(r["provider"], r["_change"]) for r in records],
+            [("BankA", "upsert"), ("BankB", "upsert")],
+        )
+
+        records, full = self._export("backup")
+        self.assertFalse(full)
+        self.assertEqual(records, [])
+
+    def test_delta_includes_changes_and_tombstones(self) -> None:
+        self._insert_bank("BankA")
+        self._insert_bank("BankB")
+        self._export("backup")
+
+        self.cursor.execute("UPDATE banks SET balance = 5 WHERE id = 1")
+        self.cursor.execute("UPDATE banks SET balance = 7 WHERE id = 1")
+        self._insert_bank("BankC")
+        self.cursor.execute("DELETE FROM banks WHERE id = 2")
+        self.cursor.execute("DELETE FROM banks WHERE id = 3")
+        self.connection.commit()
+
+        records, _ = self._export("backup")
+        by_id = {record["id"]: record for record in records}
+        self.assertEqual(len(records), 3)
+        self.assertEqual(by_id[1]["_change"], "upsert")
+        self.assertEqual(by_id[1]["balance"], 7.0)
+        self.assertEqual(by_id[2]["_change"], "delete")
+        self.assertIsNone(by_id[2]["provider"])
+        self.assertIn("balance", by_id[2])
+        self.assertEqual(by_id[3]["_change"], "delete")
+
+    def test_destinations_keep_separate_watermarks(self) -> None:
+        self._insert_bank("BankA")
+        self._export("backup")
+        self._export("mirror")
+        self._insert_bank("BankB")
+
+        records, _ = self._export("backup")
+        self.assertEqual([r["provider"] for r in records], ["BankB"])
+
+        # Still needed by "mirror", so not pruned yet
+        self.cursor.execute("SELECT COUNT(*) FROM change_log")
+        self.assertEqual(self.cursor.fetchone()[0], 1)
+
+        records, _ = self._export("mirror")
+        self.assertEqual([r["provider"] for r in records], ["BankB"])
+        self.cursor.execute("SELECT COUNT(*) FROM change_log")
+        self.assertEqual(self.cursor.fetchone()[0], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
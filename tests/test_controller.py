@@ -3,11 +3,18 @@ import unittest
 
 from datetime import datetime
 
+from core.db import init_schema
+from core.accounts_catalog import create_catalog
+from core.archive import CREATE_TRANSACTION_ARCHIVES_TABLE
 from utils.loader import get_currency
 from core.controller import Controller, TransactionError
 from core.exceptions import RecordNotFoundError
 from features.payable.bill.schema import CREATE_BILLS_TABLE
-from features.transactions.schema import CREATE_TRANSACTIONS_TABLE
+from features.transactions.schema import (
+    CREATE_TRANSACTIONS_TABLE,
+    CREATE_TRANSACTION_DETAILS_VIEW,
+    CREATE_TRANSACTIONS_IDEMPOTENCY_INDEX,
+)
 from features.accounts.bank.schema import CREATE_BANKS_TABLE
 from features.payable.bill.exceptions import BillProviderCloseError
 from features.accounts.bank.exceptions import (
@@ -46,6 +53,10 @@ class TestController(unittest.TestCase):
         self.cursor.execute(CREATE_BILLS_TABLE)
         self.cursor.execute(CREATE_SUBSCRIPTIONS_TABLE)
         self.cursor.execute(CREATE_TRANSACTIONS_TABLE)
+        self.cursor.execute(CREATE_TRANSACTIONS_IDEMPOTENCY_INDEX)
+        create_catalog(self.cursor)
+        self.cursor.execute(CREATE_TRANSACTION_DETAILS_VIEW)
+        self.cursor.execute(CREATE_TRANSACTION_ARCHIVES_TABLE)
         self.connection.commit()
         self.controller = Controller(self.connection)
 
@@ -239,6 +250,70 @@ class TestController(unittest.TestCase):
         self.assertEqual(source[0]["balance"], 250.0)
         self.assertEqual(dest[0]["balance"], 150.0)
 
+    def test_transaction_idempotency_key(self) -> None:
+        self.cursor.execute(
+            "INSERT INTO banks (provider, alias, balance, limiter) "
+            "VALUES (?, ?, ?, ?)",
+            ("BankX", "Main", 100.0, 0.0),
+        )
+        self.connection.commit()
+        data = {
+            "transaction_type": "withdraw",
+            "source_type": "bank",
+            "source_id": 1,
+            "source_provider": "BankX",
+            "amount": 30.0,
+            "date": "2024-01-01",
+            "description": "Retried withdrawal",
+            "idempotency_key": "job-42",
+        }
+
+        first = self.controller.transaction(dict(data))
+        second = self.controller.transaction(dict(data))
+
+        self.assertFalse(first.pop("replayed"))
+        self.assertTrue(second.pop("replayed"))
+        self.assertEqual(first, second)
+        self.assertEqual(first["description"], "Retried withdrawal")
+        self.assertNotIn("idempotency_key", first)
+        self.assertNotIn("fingerprint", first)
+        balance = self.controller.utility.bank_model.get_one(1)
+        self.assertEqual(balance[0]["balance"], 70.0)
+        count = self.cursor.execute(
+            "SELECT COUNT(*) FROM transactions"
+        ).fetchone()
+        self.assertEqual(count[0], 1)
+
+    def test_transaction_failure_is_not_logged(self) -> None:
+        self.cursor.execute(
+            "INSERT INTO banks (provider, alias, balance, limiter) "
+            "VALUES (?, ?, ?, ?)",
+            ("BankX", "Main", 10.0, 0.0),
+        )
+        self.connection.commit()
+        data = {
+            "transaction_type": "withdraw",
+            "source_type": "bank",
+            "source_id": 1,
+            "source_provider": "BankX",
+            "amount": 30.0,
+            "date": "2024-01-01",
+            "description": "Too much",
+            "idempotency_key": "job-43",
+        }
+
+        with self.assertRaises(TransactionError):
+            self.controller.transaction(dict(data))
+
+        count = self.cursor.execute(
+            "SELECT COUNT(*) FROM transactions"
+        ).fetchone()
+        self.assertEqual(count[0], 0)
+
+        data["amount"] = 5.0
+        row = self.controller.transaction(dict(data))
+        self.assertEqual(row["amount"], 5.0)
+
     def test_transaction_invalid_source_account(self) -> None:
         with self.assertRaises(TransactionError) as context:
             self.controller.transaction(
@@ -415,6 +490,20 @@ class TestController(unittest.TestCase):
         with self.assertRaises(CreditCardAccountOpenError):
             self.controller.open(data)
 
+    def test_open_two_accounts_from_one_provider(self) -> None:
+        init_schema(self.connection)
+        data = {
+            "account_type": "credit card",
+            "provider": "Amex",
+            "balance": "0",
+            "limiter": "-500",
+        }
+        self.controller.open(dict(data))
+        self.controller.open(dict(data))
+
+        cards = self.controller.list({"account_type": "credit card"})
+        self.assertEqual([card["provider"] for card in cards], ["Amex"] * 2)
+
     def test_close_credit_card_with_balance(self) -> None:
         self.cursor.execute(
             "INSERT INTO credit_cards (provider, balance, limiter) "
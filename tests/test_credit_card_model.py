@@ -2,8 +2,10 @@ import sqlite3
 import unittest
 
 from core.exceptions import RecordNotFoundError
+from core.accounts_catalog import create_catalog
 from features.accounts.credit_card.model import CreditCard
 from features.accounts.credit_card.schema import CREATE_CREDIT_CARDS_TABLE
+from features.transactions.schema import CREATE_TRANSACTIONS_TABLE
 from features.accounts.credit_card.exceptions import (
     CreditCardAccountOpenError,
     CreditCardAccountCloseError,
@@ -18,6 +20,8 @@ class TestCreditCard(unittest.TestCase):
         self.connection = sqlite3.connect(":memory:")
         self.cursor = self.connection.cursor()
         self.cursor.execute(CREATE_CREDIT_CARDS_TABLE)
+        self.cursor.execute(CREATE_TRANSACTIONS_TABLE)
+        create_catalog(self.cursor)
         self.connection.commit()
         self.card = CreditCard(self.connection)
 
@@ -1,11 +1,20 @@
 import sqlite3
+import tempfile
 import unittest
 
+from pathlib import Path
+
 from core.db import (
     DB_PATH,
+    SCHEMA_VERSION,
+    snapshot,
+    init_schema,
     get_connection,
+    open_connection,
     create_data_path,
+    open_read_connection,
 )
+from features.transactions.model import transaction_fingerprint
 
 
 class TestDatabaseSetup(unittest.TestCase):
@@ -38,5 +47,110 @@ class TestDatabaseSetup(unittest.TestCase):
             self.assertIn(table, tables, f"Table '{table}' should exist")
 
 
+class TestMigrations(unittest.TestCase):
+    def test_migrate_adds_and_backfills_fingerprint(self) -> None:
+        conn = sqlite3.connect(":memory:")
+        conn.execute(
+            "CREATE TABLE transactions (id INTEGER PRIMARY KEY, date TEXT, "
+            "transaction_type TEXT, source_type TEXT, source_id INTEGER, "
+            "source_provider TEXT, destination_type TEXT, "
+            "destination_id INTEGER, destination_provider TEXT, "
+            "description TEXT, amount REAL)"
+        )
+        conn.execute(
+            "INSERT INTO transactions (date, transaction_type, source_type, "
+            "source_id, description, amount) "
+            "VALUES ('2024-01-01', 'withdraw', 'bank', 1, 'Cash', 10)"
+        )
+
+        init_schema(conn)
+        init_schema(conn)
+
+        fingerprint = conn.execute(
+            "SELECT fingerprint FROM transactions"
+        ).fetchone()[0]
+        expected = transaction_fingerprint(
+            {
+                "date": "2024-01-01",
+                "source_type": "bank",
+                "source_id": 1,
+                "description": "Cash",
+                "amount": 10,
+            }
+        )
+        self.assertEqual(fingerprint, expected)
+        indexes = {
+            row[1] for row in conn.execute("PRAGMA index_list(transactions)")
+        }
+        self.assertIn("idx_transactions_fingerprint", indexes)
+        conn.close()
+
+
+class TestReadConnection(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "live.db"
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_missing_database_is_created_first(self) -> None:
+        conn = open_read_connection(self.path)
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        self.assertEqual(version, SCHEMA_VERSION)
+        with self.assertRaises(sqlite3.OperationalError):
+            conn.execute(
+                "INSERT INTO banks (provider, alias, balance, limiter) "
+                "VALUES ('BankA', 'Main', 0, 0)"
+            )
+        conn.close()
+
+    def test_reads_while_another_connection_writes(self) -> None:
+        writer = open_connection(self.path)
+        reader = open_read_connection(self.path)
+        with snapshot(reader):
+            writer.execute("BEGIN IMMEDIATE")
+            writer.execute(
+                "INSERT INTO banks (provider, alias, balance, limiter) "
+                "VALUES ('BankA', 'Main', 0, 0)"
+            )
+            writer.commit()
+            count = reader.execute("SELECT COUNT(*) FROM banks").fetchone()
+            self.assertEqual(count[0], 0)
+        count = reader.execute("SELECT COUNT(*) FROM banks").fetchone()
+        self.assertEqual(count[0], 1)
+        reader.close()
+        writer.close()
+
+
+class TestForeignKeys(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.conn = open_connection(Path(self.tmp.name) / "live.db")
+
+    def tearDown(self) -> None:
+        self.conn.close()
+        self.tmp.cleanup()
+
+    def test_transactions_must_refer_to_known_accounts(self) -> None:
+        self.assertEqual(
+            self.conn.execute("PRAGMA foreign_keys").fetchone()[0], 1
+        )
+        with self.assertRaises(sqlite3.IntegrityError):
+            self.conn.execute(
+                "INSERT INTO transactions (date, transaction_type, "
+                "destination_account_id, description, amount) "
+                "VALUES ('2024-01-01', 'deposit', 99, 'Pay', 1)"
+            )
+
+    def test_migrations_leave_enforcement_on(self) -> None:
+        init_schema(self.conn)
+        self.assertEqual(
+            self.conn.execute("PRAGMA foreign_keys").fetchone()[0], 1
+        )
+        violations = self.conn.execute("PRAGMA foreign_key_check")
+        self.assertEqual(violations.fetchall(), [])
+
+
 if __name__ == "__main__":
     unittest.main()
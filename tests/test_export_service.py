@@ -0,0 +1,107 @@
+import json
+import sqlite3
+import zipfile
+import tempfile
+import unittest
+
+from pathlib import Path
+
+from core.db import init_schema
+from utils.constants import EXTENDED_MENU
+from core.export_service import MANIFEST_NAME, ExportService, file_sha256
+
+
+class TestExportService(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.connection = sqlite3.connect(self.dir / "test.db")
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        init_schema(self.connection)
+        self.connection.executemany(
+            "INSERT INTO banks (provider, alias, balance, limiter) "
+            "VALUES (?, ?, ?, ?)",
+            [("BankA", "Main", 10.0, 0.0), ("BankB", "Main", 0.0, 0.0)],
+        )
+        self.connection.commit()
+        self.service = ExportService(self.connection)
+
+    def tearDown(self) -> None:
+        self.connection.close()
+        self.tmp.cleanup()
+
+    def test_export_all_to_directory(self) -> None:
+        output = self.dir / "export"
+        manifest = self.service.export_all(output, "csv", workers=4)
+
+        self.assertEqual(
+            [entry["account_type"] for entry in manifest["files"]],
+            EXTENDED_MENU,
+        )
+        rows = {e["account_type"]: e["rows"] for e in manifest["files"]}
+        self.assertEqual(rows["bank"], 2)
+        self.assertEqual(rows["transaction"], 0)
+        for entry in manifest["files"]:
+            self.assertEqual(
+                file_sha256(output / entry["file"]), entry["sha256"]
+            )
+        with (output / MANIFEST_NAME).open() as f:
+            self.assertEqual(json.load(f), manifest)
+
+    def test_closed_accounts_are_exported(self) -> None:
+        self.connection.execute(
+            "UPDATE banks SET closed_at = '2024-01-01T00:00:00' "
+            "WHERE provider = 'BankB'"
+        )
+        self.connection.commit()
+        output = self.dir / "export"
+        self.service.export_all(output, "ndjson")
+
+        with (output / "bank_accounts.ndjson").open() as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(
+            [(r["provider"], r["closed_at"]) for r in records],
+            [("BankA", None), ("BankB", "2024-01-01T00:00:00")],
+        )
+
+    def test_export_all_to_zip(self) -> None:
+        output = self.dir / "nightly.zip"
+        manifest = self.service.export_all(output, "ndjson", "gzip")
+
+        with zipfile.ZipFile(output) as archive:
+            names = set(archive.namelist())
+            stored = json.loads(archive.read(MANIFEST_NAME))
+        self.assertEqual(stored, manifest)
+        self.assertIn("bank_accounts.ndjson.gz", names)
+        self.assertEqual(len(names), len(EXTENDED_MENU) + 1)
+        # The staging directory and partial archive are cleaned up
+        leftovers = [
+            path
+            for path in self.dir.iterdir()
+            if not path.name.startswith("test.db")
+        ]
+        self.assertEqual(leftovers, [output])
+
+    def test_export_all_runs_alongside_a_writer(self) -> None:
+        writer = sqlite3.connect(self.dir / "test.db", timeout=0)
+        writer.execute("BEGIN IMMEDIATE")
+        try:
+            manifest = self.service.export_all(self.dir / "export", "csv")
+        finally:
+            writer.rollback()
+            writer.close()
+        rows = {e["account_type"]: e["rows"] for e in manifest["files"]}
+        self.assertEqual(rows["bank"], 2)
+
+    def test_in_memory_database_is_read_in_turn(self) -> None:
+        connection = sqlite3.connect(":memory:")
+        init_schema(connection)
+        manifest = ExportService(connection).export_all(
+            self.dir / "memory", "json", workers=4
+        )
+        connection.close()
+        self.assertTrue(all(e["rows"] == 0 for e in manifest["files"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
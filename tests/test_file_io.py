@@ -0,0 +1,232 @@
+import io
+import json
+import tempfile
+import unittest
+
+from pathlib import Path
+
+from core import file_io
+from core.file_io import (
+    open_text,
+    read_records,
+    write_records,
+    detect_format,
+    read_csv_range,
+    csv_record_ranges,
+    detect_compression,
+)
+
+RECORDS = [
+    {"id": 1, "provider": "BankA", "alias": "Main", "balance": 100.0},
+    {"id": 2, "provider": "BankB", "alias": None, "balance": -25.5},
+    {"id": 3, "provider": 'Quote "Co"\n[x]', "alias": "}", "balance": 0.0},
+]
+
+
+class TestFileIO(unittest.TestCase):
+    def test_detect_format(self) -> None:
+        self.assertEqual(detect_format(Path("a.json")), "json")
+        self.assertEqual(detect_format(Path("a.ndjson")), "ndjson")
+        self.assertEqual(detect_format(Path("a.jsonl")), "ndjson")
+        self.assertEqual(detect_format(Path("a.CSV")), "csv")
+        self.assertIsNone(detect_format(Path("a.xlsx")))
+        self.assertEqual(detect_format(Path("a.csv.gz")), "csv")
+        self.assertEqual(detect_format(Path("a.ndjson.xz")), "ndjson")
+        self.assertEqual(detect_format(Path("a.qif")), "qif")
+        self.assertEqual(detect_format(Path("a.QFX")), "ofx")
+
+    def test_detect_compression(self) -> None:
+        self.assertEqual(detect_compression(Path("a.csv.gz")), "gzip")
+        self.assertEqual(detect_compression(Path("a.json.bz2")), "bz2")
+        self.assertEqual(detect_compression(Path("a.ndjson.xz")), "xz")
+        self.assertIsNone(detect_compression(Path("a.csv")))
+
+    def test_compressed_round_trip(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            for compression in ("gzip", "bz2", "xz"):
+                path = Path(tmp) / f"records.{compression}"
+                with open_text(path, "w", compression, level=1) as f:
+                    write_records(f, RECORDS, "ndjson")
+                self.assertNotIn(b"BankA", path.read_bytes())
+
+                with open_text(path, "r", compression) as f:
+                    self.assertEqual(list(read_records(f, "ndjson")), RECORDS)
+
+    def test_json_export_matches_dumps_layout(self) -> None:
+        buffer = io.StringIO()
+        count = write_records(buffer, iter(RECORDS), "json")
+        self.assertEqual(count, 3)
+        self.assertEqual(buffer.getvalue(), json.dumps(RECORDS, indent=4))
+
+    def test_json_export_empty(self) -> None:
+        buffer = io.StringIO()
+        self.assertEqual(write_records(buffer, [], "json"), 0)
+        self.assertEqual(json.loads(buffer.getvalue()), [])
+
+    def test_json_import_reads_incrementally(self) -> None:
+        text = json.dumps(RECORDS, indent=2)
+        original_size = file_io.JSON_READ_SIZE
+        file_io.JSON_READ_SIZE = 7
+        try:
+            result = list(read_records(io.StringIO(text), "json"))
+        finally:
+            file_io.JSON_READ_SIZE = original_size
+        self.assertEqual(result, RECORDS)
+
+    def test_json_import_rejects_non_array(self) -> None:
+        with self.assertRaises(ValueError):
+            list(read_records(io.StringIO('{"id": 1}'), "json"))
+
+    def test_json_import_truncated(self) -> None:
+        with self.assertRaises(ValueError):
+            list(read_records(io.StringIO('[{"id": 1}, {"id"'), "json"))
+
+    def test_ndjson_round_trip(self) -> None:
+        buffer = io.StringIO()
+        write_records(buffer, RECORDS, "ndjson")
+        self.assertEqual(len(buffer.getvalue().splitlines()), 3)
+
+        buffer.seek(0)
+        self.assertEqual(list(read_records(buffer, "ndjson")), RECORDS)
+
+    def test_ndjson_reports_bad_line(self) -> None:
+        data = io.StringIO('{"id": 1}\n\n{"id": \n')
+        with self.assertRaises(ValueError) as context:
+            list(read_records(data, "ndjson"))
+        self.assertIn("line 3", str(context.exception))
+
+    def test_csv_round_trip(self) -> None:
+        buffer = io.StringIO(newline="")
+        write_records(buffer, RECORDS[:1], "csv")
+        buffer.seek(0)
+        self.assertEqual(
+            list(read_records(buffer, "csv")),
+            [
+                {
+                    "id": "1",
+                    "provider": "BankA",
+                    "alias": "Main",
+                    "balance": "100.0",
+                }
+            ],
+        )
+
+    def test_csv_ranges_split_on_record_boundaries(self) -> None:
+        rows = [
+            {"provider": f"Bank {i}", "alias": 'multi\nline "quoted"'}
+            if i % 3 == 0
+            else {"provider": f"Bank {i}", "alias": "plain"}
+            for i in range(50)
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "large.csv"
+            with path.open("w", newline="") as f:
+                write_records(f, rows, "csv")
+
+            fields, ranges = csv_record_ranges(path, target_size=40)
+            self.assertEqual(fields, ["provider", "alias"])
+            self.assertGreater(len(ranges), 5)
+            self.assertEqual(ranges[-1][1], path.stat().st_size)
+
+            parsed = [
+                record
+                for start, end in ranges
+                for record in read_csv_range(path, start, end, fields)
+            ]
+        self.assertEqual(parsed, rows)
+
+    def test_csv_ranges_empty_file(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "empty.csv"
+            path.write_text("")
+            self.assertEqual(csv_record_ranges(path, 10), ([], []))
+
+    def test_qif_statement_lines(self) -> None:
+        text = (
+            "!Account\nNChecking\nTBank\n^\n"
+            "!Type:Bank\n"
+            "D1/ 5'24\nT-1,234.50\nPRent\nMJanuary\nN101\n^\n"
+            "D01/06/2024\nU20.00\nT20.00\nPRefund\n^\n"
+            "!Type:Cat\nNGroceries\n^\n"
+        )
+        self.assertEqual(
+            list(read_records(io.StringIO(text), "qif")),
+            [
+                {
+                    "date": "2024-01-05",
+                    "amount": "-1234.50",
+                    "payee": "Rent",
+                    "memo": "January",
+                    "reference": "101",
+                },
+                {"date": "2024-01-06", "amount": "20.00", "payee": "Refund"},
+            ],
+        )
+
+    def test_qif_date_order(self) -> None:
+        text = "!Type:Bank\nD01/02/2024\nT1\n^\nD25/12/2024\nT2\n^\n"
+
+        records = read_records(io.StringIO(text), "qif", day_first=True)
+        self.assertEqual(
+            [record["date"] for record in records],
+            ["2024-02-01", "2024-12-25"],
+        )
+        with self.assertRaises(ValueError):
+            list(read_records(io.StringIO(text), "qif"))
+        us = read_records(io.StringIO(text.split("^")[0] + "^\n"), "qif")
+        self.assertEqual([record["date"] for record in us], ["2024-01-02"])
+
+    def test_qif_bad_date(self) -> None:
+        with self.assertRaises(ValueError) as context:
+            list(read_records(io.StringIO("!Type:Bank\nDsoon\n^\n"), "qif"))
+        self.assertIn("line 2", str(context.exception))
+
+    def test_ofx_sgml_reads_across_chunks(self) -> None:
+        text = (
+            "OFXHEADER:100\nDATA:OFXSGML\n\n<OFX><BANKMSGSRSV1><STMTTRNRS>"
+            "<STMTRS><BANKTRANLIST>\n"
+            "<STMTTRN>\n<TRNTYPE>DEBIT\n<DTPOSTED>20240105120000[-5:EST]\n"
+            "<TRNAMT>-12.50\n<FITID>A1\n<NAME>Coffee &amp; Cake\n"
+            "</STMTTRN>\n"
+            "<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20240106<TRNAMT>100"
+            "<FITID>A2<NAME>Salary<MEMO>Pay</STMTTRN>\n"
+            "</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n"
+        )
+        original_size = file_io.OFX_READ_SIZE
+        file_io.OFX_READ_SIZE = 5
+        try:
+            result = list(read_records(io.StringIO(text), "ofx"))
+        finally:
+            file_io.OFX_READ_SIZE = original_size
+        self.assertEqual(
+            result,
+            [
+                {
+                    "date": "2024-01-05",
+                    "amount": "-12.50",
+                    "reference": "A1",
+                    "payee": "Coffee & Cake",
+                },
+                {
+                    "date": "2024-01-06",
+                    "amount": "100",
+                    "reference": "A2",
+                    "payee": "Salary",
+                    "memo": "Pay",
+                },
+            ],
+        )
+
+    def test_ofx_xml(self) -> None:
+        text = (
+            '<?xml version="1.0"?><OFX><STMTTRN><DTPOSTED>20240107</DTPOSTED>'
+            "<TRNAMT>-3</TRNAMT><NAME>Bus</NAME></STMTTRN></OFX>"
+        )
+        self.assertEqual(
+            list(read_records(io.StringIO(text), "ofx")),
+            [{"date": "2024-01-07", "amount": "-3", "payee": "Bus"}],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
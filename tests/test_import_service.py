@@ -0,0 +1,532 @@
+import sqlite3
+import tempfile
+import unittest
+
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from core.db import init_schema
+from core.accounts_catalog import create_catalog
+from core.archive import CREATE_TRANSACTION_ARCHIVES_TABLE
+from core.file_io import read_csv_range, csv_record_ranges
+from core.exceptions import ValidationError
+from utils.constants import STATEMENT_DESCRIPTION
+from core.checkpoints import Checkpoint, CREATE_IMPORT_CHECKPOINTS_TABLE
+from core.import_service import (
+    ImportService,
+    coerce_record,
+    validate_record,
+    _unordered_map,
+    summarize_rejects,
+)
+from features.accounts.bank.schema import CREATE_BANKS_TABLE
+from features.transactions.schema import (
+    CREATE_TRANSACTIONS_TABLE,
+    CREATE_TRANSACTION_DETAILS_VIEW,
+)
+from features.accounts.credit_card.schema import CREATE_CREDIT_CARDS_TABLE
+
+
+class TestImportService(unittest.TestCase):
+    def setUp(self) -> None:
+        self.connection = sqlite3.connect(":memory:")
+        self.cursor = self.connection.cursor()
+        self.cursor.execute(CREATE_BANKS_TABLE)
+        self.cursor.execute(CREATE_CREDIT_CARDS_TABLE)
+        self.cursor.execute(CREATE_TRANSACTIONS_TABLE)
+        self.cursor.execute(CREATE_IMPORT_CHECKPOINTS_TABLE)
+        create_catalog(self.cursor)
+        self.cursor.execute(CREATE_TRANSACTION_DETAILS_VIEW)
+        self.cursor.execute(CREATE_TRANSACTION_ARCHIVES_TABLE)
+        self.connection.commit()
+        self.service = ImportService(self.connection)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self) -> None:
+        self.connection.close()
+        self.tmp.cleanup()
+
+    def _write(self, name: str, text: str) -> Path:
+        path = self.dir / name
+        path.write_text(text)
+        return path
+
+    def test_coerce_record(self) -> None:
+        record = coerce_record(
+            {"provider": " BankA ", "balance": "10.5", "alias": ""}, "bank"
+        )
+        self.assertEqual(record["provider"], "BankA")
+        self.assertEqual(record["balance"], 10.5)
+        self.assertIsNone(record["alias"])
+        self.assertIsNone(record["limiter"])
+
+    def test_coerce_record_invalid_number(self) -> None:
+        with self.assertRaises(ValueError) as context:
+            coerce_record({"provider": "BankA", "balance": "ten"}, "bank")
+        self.assertIn("Invalid value for balance", str(context.exception))
+
+    def test_validate_record_missing_fields(self) -> None:
+        with self.assertRaises(ValidationError) as context:
+            validate_record({"provider": "BankA"}, ["provider", "balance"])
+        self.assertIn("balance", str(context.exception))
+
+    def test_import_file_in_chunks(self) -> None:
+        path = self._write(
+            "banks.csv",
+            "provider,alias,balance,limiter\n"
+            "BankA,Main,100,50\n"
+            "BankB,,abc,0\n"
+            "BankC,Spare,20,0\n"
+            "BankD,,5,\n",
+        )
+        result = self.service.import_file(path, "bank", chunk_size=1)
+
+        self.assertEqual(result["rows"], 4)
+        self.assertEqual(result["imported"], 2)
+        self.assertEqual([row for row, _ in result["rejects"]], [2, 4])
+        self.assertIsNone(result["error"])
+
+        rows = self.cursor.execute(
+            "SELECT provider, alias, balance FROM banks"
+        ).fetchall()
+        self.assertEqual(
+            rows, [("BankA", "Main", 100.0), ("BankC", "Spare", 20.0)]
+        )
+
+    def test_validate_file_dry_run(self) -> None:
+        path = self._write(
+            "banks.csv",
+            "provider,alias,balance,limiter\n"
+            "BankA,Main,100,50\n"
+            "BankB,,abc,0\n"
+            ",,20,0\n"
+            "BankD,,x,0\n",
+        )
+        rejects_file = self.dir / "rejects.csv"
+        result = self.service.validate_file(
+            path, "bank", 2, rejects_file=rejects_file
+        )
+
+        self.assertIsNone(result["error"])
+        self.assertEqual(result["rows"], 4)
+        self.assertEqual(result["valid"], 1)
+        count = self.cursor.execute("SELECT COUNT(*) FROM banks").fetchone()
+        self.assertEqual(count[0], 0)
+
+        summary = summarize_rejects(result["rejects"], examples=1)
+        self.assertEqual(
+            [(group["error"], group["count"]) for group in summary],
+            [
+                ("Invalid value for balance. Expected float.", 2),
+                ("Missing required fields", 1),
+            ],
+        )
+        self.assertEqual(summary[0]["rows"], "2")
+        self.assertEqual(
+            rejects_file.read_text().splitlines(),
+            [
+                "row,error,provider,alias,balance,limiter",
+                "2,Invalid value for balance. Expected float.,BankB,,abc,0",
+                "3,Missing required fields: provider,,,20,0",
+                "4,Invalid value for balance. Expected float.,BankD,,x,0",
+            ],
+        )
+
+    def test_import_file_applies_model_rules(self) -> None:
+        path = self._write(
+            "cards.ndjson",
+            '{"provider": "Visa", "balance": 10, "limiter": 500}\n',
+        )
+        self.service.import_file(path, "credit card", chunk_size=10)
+
+        row = self.cursor.execute(
+            "SELECT balance, limiter FROM credit_cards"
+        ).fetchone()
+        self.assertEqual(row, (-10.0, -500.0))
+
+    def _insert_banks(self) -> None:
+        self.cursor.executemany(
+            "INSERT INTO banks (provider, alias, balance, limiter) "
+            "VALUES (?, ?, ?, ?)",
+            [("BankX", "Main", 100.0, 0.0), ("BankY", None, 0.0, 0.0)],
+        )
+        self.connection.commit()
+
+    def test_import_transactions_applies_net_deltas(self) -> None:
+        self._insert_banks()
+        path = self._write(
+            "transactions.csv",
+            "date,transaction_type,source_type,source_id,"
+            "destination_type,destination_id,description,amount\n"
+            "2024-01-01,withdraw,bank,1,,,Cash,10\n"
+            "2024-01-02,deposit,,,bank,2,Pay,5\n"
+            "2024-01-03,transfer,bank,1,bank,2,Move,20\n"
+            "2024-01-04,refund,bank,1,,,Bad,1\n",
+        )
+        result = self.service.import_file(path, "transaction", 2)
+
+        self.assertIsNone(result["error"])
+        self.assertEqual(result["rows"], 4)
+        self.assertEqual(result["imported"], 3)
+        self.assertEqual(result["accounts"], 2)
+        self.assertEqual([row for row, _ in result["rejects"]], [4])
+
+        balances = self.cursor.execute(
+            "SELECT balance FROM banks ORDER BY id"
+        ).fetchall()
+        self.assertEqual(balances, [(70.0,), (25.0,)])
+        providers = self.cursor.execute(
+            "SELECT source_provider, destination_provider "
+            "FROM transaction_details "
+            "ORDER BY id"
+        ).fetchall()
+        self.assertEqual(
+            providers,
+            [
+                ("BankX (Main)", None),
+                (None, "BankY"),
+                ("BankX (Main)", "BankY"),
+            ],
+        )
+
+    def test_import_transactions_ignores_idempotency_keys(self) -> None:
+        self._insert_banks()
+        init_schema(self.connection)
+        path = self._write(
+            "export.csv",
+            "date,transaction_type,destination_type,destination_id,"
+            "description,amount,idempotency_key\n"
+            "2024-01-02,deposit,bank,2,Pay,5,job-1\n",
+        )
+        for _ in range(2):
+            result = self.service.import_file(path, "transaction", 10)
+            self.assertIsNone(result["error"])
+            self.assertEqual(result["imported"], 1)
+
+        keys = self.cursor.execute(
+            "SELECT idempotency_key FROM transactions"
+        ).fetchall()
+        self.assertEqual(keys, [(None,), (None,)])
+
+    def test_import_transactions_rolls_back_on_limit_breach(self) -> None:
+        self._insert_banks()
+        path = self._write(
+            "transactions.ndjson",
+            '{"date": "2024-01-01", "transaction_type": "withdraw", '
+            '"source_type": "bank", "source_id": 2, '
+            '"description": "Too much", "amount": 50}\n',
+        )
+        result = self.service.import_file(path, "transaction", 10)
+
+        self.assertIn("overdraft limit", result["error"])
+        self.assertEqual(result["imported"], 0)
+        self.assertEqual(result["failed"], 1)
+        count = self.cursor.execute(
+            "SELECT COUNT(*) FROM transactions"
+        ).fetchone()
+        self.assertEqual(count[0], 0)
+        balance = self.cursor.execute(
+            "SELECT balance FROM banks WHERE id = 2"
+        ).fetchone()
+        self.assertEqual(balance[0], 0.0)
+
+    def test_import_transactions_unknown_account(self) -> None:
+        path = self._write(
+            "transactions.csv",
+            "date,transaction_type,source_type,source_id,description,amount\n"
+            "2024-01-01,withdraw,bank,9,Cash,10\n",
+        )
+        result = self.service.import_file(path, "transaction", 10)
+        self.assertIn("Record with ID 9 does not exist", result["error"])
+        self.assertEqual(result["imported"], 0)
+
+    def test_import_transactions_dedupe(self) -> None:
+        self._insert_banks()
+        header = (
+            "date,transaction_type,source_type,source_id,description,amount\n"
+        )
+        first = self._write(
+            "january.csv",
+            header + "2024-01-01,withdraw,bank,1,Coffee,3\n"
+            "2024-01-02,withdraw,bank,1,Lunch,7\n",
+        )
+        second = self._write(
+            "overlap.csv",
+            header + "01/02/2024,withdraw,bank,1,  LUNCH ,7.00\n"
+            "2024-01-03,withdraw,bank,1,Bus,2\n"
+            "2024-01-03,withdraw,bank,1,Bus,2\n",
+        )
+        self.service.import_file(first, "transaction", 10, dedupe=True)
+        result = self.service.import_file(
+            second, "transaction", 1, dedupe=True
+        )
+
+        self.assertIsNone(result["error"])
+        self.assertEqual(result["imported"], 1)
+        self.assertEqual(result["duplicates"], 2)
+        descriptions = self.cursor.execute(
+            "SELECT description FROM transactions ORDER BY id"
+        ).fetchall()
+        self.assertEqual(descriptions, [("Coffee",), ("Lunch",), ("Bus",)])
+        balance = self.cursor.execute(
+            "SELECT balance FROM banks WHERE id = 1"
+        ).fetchone()
+        self.assertEqual(balance[0], 88.0)
+
+    def test_import_file_upsert(self) -> None:
+        self._insert_banks()
+        init_schema(self.connection)
+        path = self._write(
+            "banks.csv",
+            "provider,alias,balance,limiter\n"
+            "BankX,Main,150,0\n"
+            "BankY,,10,0\n"
+            "BankZ,,5,0\n",
+        )
+        result = self.service.import_file(path, "bank", 2, upsert=True)
+        self.assertIsNone(result["error"])
+        self.assertEqual(result["imported"], 3)
+
+        path = self._write(
+            "renamed.csv",
+            "id,provider,alias,balance,limiter\n1,BankX,Old,150,0\n",
+        )
+        result = self.service.import_file(path, "bank", 2, upsert=True)
+        self.assertIsNone(result["error"])
+
+        rows = self.cursor.execute(
+            "SELECT id, provider, alias, balance FROM banks ORDER BY id"
+        ).fetchall()
+        self.assertEqual(
+            rows,
+            [
+                (1, "BankX", "Old", 150.0),
+                (2, "BankY", None, 10.0),
+                (3, "BankZ", None, 5.0),
+            ],
+        )
+
+    def test_import_file_upsert_ambiguous_key(self) -> None:
+        self._insert_banks()
+        self._insert_banks()
+        init_schema(self.connection)
+        path = self._write(
+            "banks.csv", "provider,alias,balance,limiter\nBankX,Main,1,0\n"
+        )
+        result = self.service.import_file(path, "bank", 2, upsert=True)
+        self.assertIn("matches 2 records", result["error"])
+        self.assertEqual(result["failed"], 1)
+
+    def test_import_file_upsert_repeated_key(self) -> None:
+        init_schema(self.connection)
+        path = self._write(
+            "banks.csv",
+            "provider,alias,balance,limiter\n"
+            "BankX,,1,0\n"
+            "BankX,,2,0\n",
+        )
+        result = self.service.import_file(path, "bank", 10, upsert=True)
+        self.assertIsNone(result["error"])
+
+        rows = self.cursor.execute(
+            "SELECT provider, balance FROM banks"
+        ).fetchall()
+        self.assertEqual(rows, [("BankX", 2.0)])
+
+    def test_import_qif_statement(self) -> None:
+        self._insert_banks()
+        path = self._write(
+            "statement.qif",
+            "!Type:Bank\n"
+            "D01/05/2024\nT-30.00\nPGrocer\n^\n"
+            "D01/06/2024\nT45.50\nPSalary\n^\n"
+            "D01/07/2024\nT0\nPNothing\n^\n",
+        )
+        result = self.service.import_file(
+            path, "transaction", 10, statement_account=("bank", 1)
+        )
+
+        self.assertIsNone(result["error"])
+        self.assertEqual(result["imported"], 2)
+        self.assertEqual([row for row, _ in result["rejects"]], [3])
+        balance = self.cursor.execute(
+            "SELECT balance FROM banks WHERE id = 1"
+        ).fetchone()
+        self.assertEqual(balance[0], 115.5)
+        rows = self.cursor.execute(
+            "SELECT transaction_type, source_id, destination_id, amount "
+            "FROM transaction_details ORDER BY id"
+        ).fetchall()
+        self.assertEqual(
+            rows, [("withdraw", 1, None, 30.0), ("deposit", None, 1, 45.5)]
+        )
+
+    def test_statement_references_tell_repeated_lines_apart(self) -> None:
+        self._insert_banks()
+        path = self._write(
+            "statement.qif",
+            "!Type:Bank\n"
+            "D01/05/2024\nT-3.00\nPCoffee\nN101\n^\n"
+            "D01/05/2024\nT-3.00\nPCoffee\nN102\n^\n"
+            "D01/06/2024\nT-1.00\nN103\n^\n"
+            "D01/07/2024\nT-2.00\n^\n",
+        )
+        result = self.service.import_file(
+            path, "transaction", 10, dedupe=True, statement_account=("bank", 1)
+        )
+        again = self.service.import_file(
+            path, "transaction", 10, dedupe=True, statement_account=("bank", 1)
+        )
+
+        self.assertEqual(result["imported"], 4)
+        self.assertEqual(again["imported"], 0)
+        rows = self.cursor.execute(
+            "SELECT description, reference FROM transactions ORDER BY id"
+        ).fetchall()
+        self.assertEqual(
+            rows,
+            [
+                ("Coffee", "101"),
+                ("Coffee", "102"),
+                ("103", "103"),
+                (STATEMENT_DESCRIPTION, None),
+            ],
+        )
+
+    def test_import_statement_requires_account(self) -> None:
+        path = self._write("statement.ofx", "<OFX></OFX>")
+        result = self.service.import_file(path, "transaction", 10)
+        self.assertIn("is a statement", result["error"])
+
+    def test_import_files_in_parallel(self) -> None:
+        files = [
+            self._write(
+                f"{month}.csv",
+                "provider,alias,balance,limiter\n"
+                f"Bank{month},A,1,0\nBank{month},B,2,0\n",
+            )
+            for month in ("01", "02", "03")
+        ]
+        files.append(self._write("broken.json", '[{"provider": '))
+
+        results = self.service.import_files(
+            files, "bank", chunk_size=1, workers=2
+        )
+
+        self.assertEqual(
+            [Path(result["file"]).name for result in results],
+            ["01.csv", "02.csv", "03.csv", "broken.json"],
+        )
+        self.assertEqual([r["imported"] for r in results], [2, 2, 2, 0])
+        self.assertIsNotNone(results[3]["error"])
+        count = self.cursor.execute("SELECT COUNT(*) FROM banks").fetchone()
+        self.assertEqual(count[0], 6)
+
+    def test_unordered_map_bounds_tasks_in_flight(self) -> None:
+        submitted = []
+        consumed = []
+
+        def task(n: int) -> dict:
+            return {"n": n}
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            original = executor.submit
+
+            def submit(*args: object) -> object:
+                submitted.append(args)
+                return original(*args)
+
+            executor.submit = submit  # type: ignore[method-assign]
+            for result in _unordered_map(
+                executor, task, ((n,) for n in range(10)), 3
+            ):
+                consumed.append(result["n"])
+                self.assertLessEqual(len(submitted) - len(consumed), 3)
+
+        self.assertEqual(sorted(consumed), list(range(10)))
+
+    def test_import_large_csv_in_parallel(self) -> None:
+        lines = ["provider,alias,balance,limiter"]
+        for i in range(200):
+            balance = "bad" if i % 50 == 0 else str(i)
+            lines.append(f'"Bank, {i}","a\nb",{balance},0')
+        path = self._write("large.csv", "\n".join(lines) + "\n")
+
+        result = self.service.import_large_csv(
+            path, "bank", chunk_size=25, workers=2, split_size=512
+        )
+
+        self.assertIsNone(result["error"])
+        self.assertEqual(result["rows"], 200)
+        self.assertEqual(result["imported"], 196)
+        self.assertEqual(
+            [row for row, _ in result["rejects"]], [1, 51, 101, 151]
+        )
+        rows = self.cursor.execute(
+            "SELECT provider, alias FROM banks ORDER BY id LIMIT 2"
+        ).fetchall()
+        self.assertEqual(rows, [("Bank, 1", "a\nb"), ("Bank, 2", "a\nb")])
+
+    def test_import_file_resume(self) -> None:
+        path = self._write(
+            "banks.csv",
+            "provider,alias,balance,limiter\n"
+            "BankA,,1,0\n"
+            "BankB,,2,0\n"
+            "BankC,,3,0\n"
+            "BankD,,4,0\n",
+        )
+        checkpoint = Checkpoint(self.connection, path, "bank")
+        checkpoint.save(2)
+        self.connection.commit()
+
+        result = self.service.import_file(path, "bank", 1, resume=True)
+
+        self.assertIsNone(result["error"])
+        self.assertEqual(result["resumed"], 2)
+        self.assertEqual(result["rows"], 4)
+        self.assertEqual(result["imported"], 2)
+        providers = self.cursor.execute("SELECT provider FROM banks").fetchall()
+        self.assertEqual(providers, [("BankC",), ("BankD",)])
+        self.assertEqual(checkpoint.load(), (0, None))
+
+    def test_import_file_saves_checkpoint_per_chunk(self) -> None:
+        path = self._write(
+            "banks.ndjson",
+            '{"provider": "BankA", "balance": 1, "limiter": 0}\n'
+            '{"provider": "BankB", "balance": 2, "limiter": 0}\n'
+            '{"provider": ',
+        )
+        result = self.service.import_file(path, "bank", 1)
+
+        self.assertIsNotNone(result["error"])
+        self.assertEqual(result["imported"], 2)
+        checkpoint = Checkpoint(self.connection, path, "bank")
+        self.assertEqual(checkpoint.load(), (2, None))
+
+    def test_import_large_csv_resume(self) -> None:
+        lines = ["provider,alias,balance,limiter"]
+        lines += [f"Bank {i},,{i},0" for i in range(100)]
+        path = self._write("large.csv", "\n".join(lines) + "\n")
+        fields, ranges = csv_record_ranges(path, 256)
+        start, end = ranges[0]
+        done = len(list(read_csv_range(path, start, end, fields)))
+        Checkpoint(self.connection, path, "bank").save(done, end)
+        self.connection.commit()
+
+        result = self.service.import_large_csv(
+            path, "bank", 10, workers=2, split_size=256, resume=True
+        )
+
+        self.assertIsNone(result["error"])
+        self.assertEqual(result["rows"], 100)
+        self.assertEqual(result["imported"], 100 - done)
+        first = self.cursor.execute(
+            "SELECT provider FROM banks ORDER BY id LIMIT 1"
+        ).fetchone()
+        self.assertEqual(first[0], f"Bank {done}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,8 +3,10 @@ import unittest
 
 from utils.loader import get_currency
 from core.exceptions import RecordNotFoundError
+from core.accounts_catalog import create_catalog
 from features.accounts.loan.model import Loan
 from features.accounts.loan.schema import CREATE_LOAN_TABLE
+from features.transactions.schema import CREATE_TRANSACTIONS_TABLE
 from features.accounts.loan.exceptions import (
     LoanAccountOpenError,
     LoanAccountCloseError,
@@ -18,6 +20,8 @@ class TestLoan(unittest.TestCase):
         self.connection = sqlite3.connect(":memory:")
         self.cursor = self.connection.cursor()
         self.cursor.execute(CREATE_LOAN_TABLE)
+        self.cursor.execute(CREATE_TRANSACTIONS_TABLE)
+        create_catalog(self.cursor)
         self.connection.commit()
         self.loan = Loan(self.connection)
 
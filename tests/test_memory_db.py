@@ -0,0 +1,104 @@
+import sqlite3
+import tempfile
+import unittest
+
+from pathlib import Path
+
+from core.db import init_schema, use_connection, get_connection
+from core.memory_db import in_memory, staging_path
+from core.exceptions import WriteConflictError
+
+
+class TestInMemory(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.path = self.dir / "live.db"
+        connection = self._connect()
+        init_schema(connection)
+        connection.close()
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        return connection
+
+    @staticmethod
+    def _insert_bank(connection: sqlite3.Connection, provider: str) -> None:
+        connection.execute(
+            "INSERT INTO banks (provider, alias, balance, limiter) "
+            "VALUES (?, ?, ?, ?)",
+            (provider, "Main", 0.0, 0.0),
+        )
+        connection.commit()
+
+    @staticmethod
+    def _providers(connection: sqlite3.Connection) -> list[str]:
+        rows = connection.execute(
+            "SELECT provider FROM banks ORDER BY id"
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def test_writes_back_by_rename(self) -> None:
+        with in_memory(self.path) as memory:
+            self._insert_bank(memory, "BankA")
+
+        self.assertEqual(
+            sorted(path.name for path in self.dir.iterdir()), ["live.db"]
+        )
+        connection = self._connect()
+        self.assertEqual(self._providers(connection), ["BankA"])
+        mode = connection.execute("PRAGMA journal_mode").fetchone()[0]
+        connection.close()
+        self.assertEqual(mode, "wal")
+
+    def test_failure_leaves_file_unchanged(self) -> None:
+        with self.assertRaises(RuntimeError):
+            with in_memory(self.path) as memory:
+                self._insert_bank(memory, "BankA")
+                raise RuntimeError("job failed")
+
+        connection = self._connect()
+        self.assertEqual(self._providers(connection), [])
+        connection.close()
+        self.assertFalse(staging_path(self.path).exists())
+
+    def test_open_connection_sees_write_back(self) -> None:
+        connection = self._connect()
+        self._insert_bank(connection, "BankA")
+
+        with in_memory(self.path) as memory:
+            self._insert_bank(memory, "BankB")
+
+        self.assertEqual(self._providers(connection), ["BankA", "BankB"])
+        connection.close()
+
+    def test_concurrent_change_is_not_overwritten(self) -> None:
+        connection = self._connect()
+
+        with self.assertRaises(WriteConflictError):
+            with in_memory(self.path) as memory:
+                self._insert_bank(connection, "BankA")
+                self._insert_bank(memory, "BankB")
+
+        self.assertEqual(self._providers(connection), ["BankA"])
+        connection.close()
+
+    def test_stale_staging_file_is_removed(self) -> None:
+        staging_path(self.path).write_bytes(b"partial")
+
+        with in_memory(self.path) as memory:
+            self._insert_bank(memory, "BankA")
+
+        self.assertFalse(staging_path(self.path).exists())
+
+    def test_get_connection_returns_memory_copy(self) -> None:
+        with in_memory(self.path) as memory, use_connection(memory):
+            self.assertIs(get_connection(), memory)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+
+from pathlib import Path
+from unittest import mock
+
+from core.db import DB_PATH
+from utils.profiles import Profile, active_profile, set_active_profile
+from utils.constants import PROFILE_ENV, SETTINGS_PATH
+from core.controller import Controller
+from core.connection_cache import ConnectionCache
+
+
+class TestProfiles(unittest.TestCase):
+    def tearDown(self) -> None:
+        set_active_profile("default")
+
+    def test_default_profile_keeps_original_paths(self) -> None:
+        profile = Profile()
+        self.assertEqual(profile.db_path, DB_PATH)
+        self.assertEqual(profile.settings_path, SETTINGS_PATH)
+
+    def test_named_profiles_are_separate(self) -> None:
+        home, work = Profile("home"), Profile("work")
+        self.assertNotEqual(home.db_path, work.db_path)
+        self.assertNotEqual(home.db_path, DB_PATH)
+        self.assertNotEqual(home.settings_path, work.settings_path)
+        self.assertEqual(home.archive_dir.parent, home.db_path.parent)
+
+    def test_invalid_names_are_rejected(self) -> None:
+        for name in ("", "../other", "a b", "-x"):
+            with self.subTest(name=name), self.assertRaises(ValueError):
+                Profile(name)
+
+    def test_profile_from_environment(self) -> None:
+        with mock.patch.dict(os.environ, {PROFILE_ENV: "work"}):
+            set_active_profile()
+            self.assertEqual(active_profile().name, "work")
+            set_active_profile("home")
+            self.assertEqual(active_profile().name, "home")
+
+
+class TestConnectionCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        patcher = mock.patch("utils.profiles.DATA_DIR", Path(self.tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.now = 0.0
+        self.cache = ConnectionCache(
+            size=2, idle_timeout=60, clock=lambda: self.now
+        )
+
+    def tearDown(self) -> None:
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_connections_are_reused(self) -> None:
+        first = self.cache.get("home")
+        self.assertIs(self.cache.get("home"), first)
+        self.assertTrue(Profile("home").db_path.exists())
+
+    def test_least_recently_used_is_closed(self) -> None:
+        self.cache.get("a")
+        self.cache.get("b")
+        self.cache.get("a")
+        self.cache.get("c")
+
+        self.assertEqual(len(self.cache), 2)
+        self.assertIn("a", self.cache)
+        self.assertNotIn("b", self.cache)
+
+    def test_idle_connections_are_closed(self) -> None:
+        self.cache.get("a")
+        self.now = 30.0
+        self.cache.get("b")
+        self.now = 75.0
+
+        self.assertEqual(self.cache.evict_idle(), ["a"])
+        self.assertIn("b", self.cache)
+
+    def test_connection_in_transaction_is_kept(self) -> None:
+        busy = self.cache.get("a")
+        busy.execute(
+            "INSERT INTO banks (provider, alias, balance, limiter) "
+            "VALUES ('BankA', 'Main', 0, 0)"
+        )
+        self.now = 120.0
+
+        self.assertEqual(self.cache.evict_idle(), [])
+        busy.rollback()
+
+    def test_archives_follow_the_connection(self) -> None:
+        home, work = self.cache.get("home"), self.cache.get("work")
+        home.execute(
+            "INSERT INTO transactions (date, transaction_type, description, "
+            "amount, fingerprint) VALUES ('2020-01-01', 'deposit', 'Pay', "
+            "1, 'x')"
+        )
+        home.commit()
+
+        Controller(home).archive.archive_before(2021)
+
+        self.assertEqual(active_profile().name, "default")
+        self.assertTrue((Profile("home").archive_dir / "2020.db").exists())
+        self.assertEqual(Controller(work).archive.years(), [])
+        self.assertFalse(Profile("work").archive_dir.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,8 +2,10 @@ import sqlite3
 import unittest
 
 from core.exceptions import RecordNotFoundError
+from core.accounts_catalog import create_catalog
 from features.accounts.store_card.model import StoreCard
 from features.accounts.store_card.schema import CREATE_STORE_CARDS_TABLE
+from features.transactions.schema import CREATE_TRANSACTIONS_TABLE
 from features.accounts.store_card.exceptions import (
     StoreCardAccountOpenError,
     StoreCardAccountCloseError,
@@ -18,6 +20,8 @@ class TestStoreCard(unittest.TestCase):
         self.connection = sqlite3.connect(":memory:")
         self.cursor = self.connection.cursor()
         self.cursor.execute(CREATE_STORE_CARDS_TABLE)
+        self.cursor.execute(CREATE_TRANSACTIONS_TABLE)
+        create_catalog(self.cursor)
         self.connection.commit()
         self.card = StoreCard(self.connection)
 
@@ -2,8 +2,10 @@ import sqlite3
 import unittest
 
 from core.exceptions import RecordNotFoundError
+from core.accounts_catalog import create_catalog
 from features.payable.subscription.model import Subscriptions
 from features.payable.subscription.schema import CREATE_SUBSCRIPTIONS_TABLE
+from features.transactions.schema import CREATE_TRANSACTIONS_TABLE
 from features.payable.subscription.exceptions import (
     SubscriptionUpdateError,
     SubscriptionCreationError,
@@ -16,6 +18,8 @@ class TestSubscriptions(unittest.TestCase):
         self.connection = sqlite3.connect(":memory:")
         self.cursor = self.connection.cursor()
         self.cursor.execute(CREATE_SUBSCRIPTIONS_TABLE)
+        self.cursor.execute(CREATE_TRANSACTIONS_TABLE)
+        create_catalog(self.cursor)
         self.connection.commit()
         self.subscriptions = Subscriptions(self.connection)
 
@@ -38,6 +42,7 @@ class TestSubscriptions(unittest.TestCase):
                     "id": 1,
                     "provider": "Netflix",
                     "monthly_charge": 15.0,
+                    "version": 0,
                 }
             ],
         )
@@ -87,6 +92,7 @@ class TestSubscriptions(unittest.TestCase):
                     "id": 1,
                     "provider": "Disney+",
                     "monthly_charge": 20.0,
+                    "version": 1,
                 }
             ],
         )
@@ -0,0 +1,114 @@
+import os
+import argparse
+import tempfile
+import unittest
+
+from pathlib import Path
+from unittest import mock
+
+from core.watcher import (
+    InotifyWatcher,
+    PollingWatcher,
+    move_into,
+    is_importable,
+)
+from core.cli.imports import _import_watched_file
+from core.import_service import new_result
+
+
+class TestWatcher(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+
+    def test_is_importable(self) -> None:
+        for name in ("a.csv", "b.qif", ".c.csv", "d.csv.part", "e.txt"):
+            (self.dir / name).write_text("x")
+        importable = sorted(
+            path.name for path in self.dir.iterdir() if is_importable(path)
+        )
+        self.assertEqual(importable, ["a.csv", "b.qif"])
+
+    def test_polling_waits_for_stable_files(self) -> None:
+        watcher = PollingWatcher(self.dir, interval=0)
+        path = self.dir / "statement.csv"
+        path.write_text("provider\n")
+
+        self.assertEqual(watcher.poll(), [])
+        with path.open("a") as f:
+            f.write("BankA\n")
+        self.assertEqual(watcher.poll(), [])
+        self.assertEqual(watcher.poll(), [path])
+
+    def test_inotify_reports_closed_and_moved_files(self) -> None:
+        try:
+            watcher = InotifyWatcher(self.dir)
+        except OSError:
+            self.skipTest("inotify is not available")
+
+        try:
+            (self.dir / "written.csv").write_text("provider\n")
+            staged = Path(self.tmp.name).parent / f"{os.getpid()}.ndjson"
+            staged.write_text("{}\n")
+            staged.replace(self.dir / "moved.ndjson")
+            (self.dir / "sub").mkdir()
+
+            paths = []
+            while len(paths) < 2:
+                paths.extend(watcher.wait())
+        finally:
+            watcher.close()
+
+        self.assertEqual(
+            [path.name for path in paths], ["written.csv", "moved.ndjson"]
+        )
+
+    def test_move_into_keeps_earlier_files(self) -> None:
+        for _ in range(2):
+            (self.dir / "a.csv.gz").write_text("x")
+            move_into(self.dir / "a.csv.gz", self.dir / "processed")
+
+        names = {path.name for path in (self.dir / "processed").iterdir()}
+        self.assertEqual(len(names), 2)
+        self.assertIn("a.csv.gz", names)
+        renamed = (names - {"a.csv.gz"}).pop()
+        self.assertTrue(renamed.startswith("a-"))
+        self.assertTrue(renamed.endswith(".csv.gz"))
+
+    def test_failed_import_does_not_stop_watcher(self) -> None:
+        args = argparse.Namespace(
+            chunk_size=10, mode="insert", day_first=False, dedupe=False
+        )
+        service = mock.Mock()
+        service.import_file.side_effect = ValueError("boom")
+        path = self.dir / "bad.csv"
+        path.write_text("provider\n")
+
+        with mock.patch("core.cli.imports.msg") as report:
+            _import_watched_file(args, service, self.dir, path, "bank", None)
+
+        self.assertTrue((self.dir / "failed" / "bad.csv").exists())
+        self.assertIn("boom", report.call_args.args[0])
+
+    def test_dedupe_only_when_asked(self) -> None:
+        service = mock.Mock()
+        service.import_file.return_value = new_result(self.dir / "a.qif")
+        for dedupe in (False, True):
+            path = self.dir / "a.qif"
+            path.write_text("!Type:Bank\n")
+            args = argparse.Namespace(
+                chunk_size=10, mode="insert", day_first=False, dedupe=dedupe
+            )
+            with mock.patch("core.cli.imports.msg"):
+                _import_watched_file(
+                    args, service, self.dir, path, "transaction", ("bank", 1)
+                )
+            kwargs = service.import_file.call_args.kwargs
+            self.assertIs(kwargs["dedupe"], dedupe)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,36 +2,44 @@ from pathlib import Path
 
 from utils.types import TableName
 
+# An account type's type_code is stored in the accounts catalog, so it
+# must never change once released
 TYPE_CONFIG = {
     TableName.BANKS: {
         "is_source": True,
         "is_destination": True,
         "display_name": "bank",
+        "type_code": 1,
     },
     TableName.CREDITCARDS: {
         "is_source": True,
         "is_destination": True,
         "display_name": "credit card",
+        "type_code": 2,
     },
     TableName.STORECARDS: {
         "is_source": True,
         "is_destination": True,
         "display_name": "store card",
+        "type_code": 3,
     },
     TableName.LOANS: {
         "is_source": False,
         "is_destination": True,
         "display_name": "loan",
+        "type_code": 4,
     },
     TableName.BILLS: {
         "is_source": False,
         "is_destination": False,
         "display_name": "bill",
+        "type_code": 5,
     },
     TableName.SUBSCRIPTIONS: {
         "is_source": False,
         "is_destination": False,
         "display_name": "subscription",
+        "type_code": 6,
     },
     TableName.TRANSACTIONS: {
         "is_source": False,
@@ -54,11 +62,100 @@ FIELD_MAP = {
     "bill": [("provider", str), ("monthly_charge", float)],
 }
 
+# Import coercion for transaction rows, in the same shape as FIELD_MAP
+TRANSACTION_FIELDS = [
+    ("date", str),
+    ("transaction_type", str),
+    ("source_type", str),
+    ("source_id", int),
+    ("source_provider", str),
+    ("destination_type", str),
+    ("destination_id", int),
+    ("destination_provider", str),
+    ("description", str),
+    ("amount", float),
+    ("reference", str),
+]
+
 TRANSACTION_TYPES = ["withdraw", "deposit", "pay another account", "payment"]
 ACCOUNT_TYPES = list(FIELD_MAP.keys())
 
 # Used for export, import, and list CLI
 EXTENDED_MENU = [*ACCOUNT_TYPES, "transaction"]
 
+# Used for export and import. ndjson is one JSON record per line.
+EXPORT_FORMATS = ["json", "ndjson", "csv", "txt"]
+IMPORT_FORMATS = ["json", "ndjson", "csv", "qif", "ofx"]
+
+# Bank statement formats, imported as transactions against one account
+STATEMENT_FORMATS = ["qif", "ofx"]
+
+# Description of a statement line with no payee, memo or reference
+STATEMENT_DESCRIPTION = "Statement line"
+
+# Stream compressions for export and import, keyed to their file suffix
+COMPRESSIONS = {"gzip": ".gz", "bz2": ".bz2", "xz": ".xz"}
+
+# Rows fetched per cursor round trip and bytes buffered per export file
+EXPORT_BATCH_SIZE = 1000
+EXPORT_BUFFER_SIZE = 1024 * 1024
+
+# Format used by export --all when --filetype is omitted, so nightly runs
+# never prompt
+EXPORT_ALL_FORMAT = "ndjson"
+
+# Pages copied per step by backup, and seconds other connections get to
+# write between steps
+BACKUP_PAGES = 1024
+BACKUP_SLEEP = 0.005
+
+# Backups are named <prefix><timestamp>.db; backup --keep rotates these
+BACKUP_PREFIX = "financli-"
+BACKUP_KEEP = 7
+
+# Records inserted per bulk transaction when importing
+IMPORT_CHUNK_SIZE = 1000
+
+# Bytes of a large CSV handed to each parser process by import --parallel
+CSV_SPLIT_SIZE = 32 * 1024 * 1024
+
+# Seconds between directory scans when import --watch cannot use inotify
+WATCH_POLL_INTERVAL = 5.0
+
+# Example rows listed per error kind in an import --dry-run report
+DRY_RUN_EXAMPLES = 5
+
+# upsert matches imported accounts without an id on these columns. They
+# are not unique: a key matching several accounts must be given an id.
+IMPORT_MODES = ["insert", "upsert"]
+NATURAL_KEYS = {
+    TableName.BANKS: ("provider", "alias"),
+    TableName.CREDITCARDS: ("provider",),
+    TableName.STORECARDS: ("provider",),
+    TableName.LOANS: ("provider",),
+    TableName.BILLS: ("provider",),
+    TableName.SUBSCRIPTIONS: ("provider",),
+}
+
 CONFIG_DIR = Path.home() / ".config" / "financli"
 SETTINGS_PATH = CONFIG_DIR / "settings.json"
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+# Each named profile is a separate ledger: its own database under
+# data/profiles/<name>/ and settings under ~/.config/financli/profiles/.
+# The default profile keeps the original locations.
+DEFAULT_PROFILE = "default"
+PROFILE_ENV = "FINANCLI_PROFILE"
+
+# Connections a ConnectionCache keeps open, and seconds one may sit unused
+# before it is closed
+CONNECTION_CACHE_SIZE = 16
+CONNECTION_IDLE_TIMEOUT = 300.0
+
+# Seconds a connection waits for another's lock before SQLite reports it
+# busy, then how often and from what base delay that is retried, doubling
+# with jitter
+BUSY_TIMEOUT = 5.0
+BUSY_RETRIES = 5
+BUSY_RETRY_DELAY = 0.05
@@ -1,7 +1,19 @@
 from typing import Callable
+from datetime import datetime
 
 from utils.decorators import pretty_output
 
+DATE_FORMATS = [
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S",
+    "%m/%d/%y",
+    "%m/%d/%Y",
+    "%Y/%m/%d",
+    "%d %b %Y",
+]
+
 
 @pretty_output
 def msg(message: str) -> None:
@@ -32,3 +44,14 @@ def wrap_error(
         return domain_exc(clean_msg)
 
     return wrapper
+
+
+def normalize_date(value: object) -> str:
+    """Return a transaction date as YYYY-MM-DD, or tidied text if unknown."""
+    text = str(value or "").strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date().isoformat()
+        except ValueError:
+            continue
+    return text.lower()
@@ -1,11 +1,17 @@
+from pathlib import Path
 from functools import lru_cache
 
+from utils.profiles import active_profile
 from features.settings.settings import SettingsManager
 
 
-@lru_cache(maxsize=1)
 def get_settings() -> SettingsManager:
-    return SettingsManager()
+    return _load_settings(active_profile().settings_path)
+
+
+@lru_cache(maxsize=None)
+def _load_settings(path: Path) -> SettingsManager:
+    return SettingsManager(path)
 
 
 def get_currency() -> str:
@@ -0,0 +1,69 @@
+import os
+import re
+
+from pathlib import Path
+
+from utils.constants import (
+    DATA_DIR,
+    CONFIG_DIR,
+    PROFILE_ENV,
+    SETTINGS_PATH,
+    DEFAULT_PROFILE,
+)
+
+_NAME = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]*")
+
+
+def archive_dir(db_path: Path) -> Path:
+    """Folder holding the yearly archives of the database at ``db_path``."""
+    return db_path.parent / "archive"
+
+
+class Profile:
+    """A ledger with its own database file and settings."""
+
+    def __init__(self, name: str = DEFAULT_PROFILE) -> None:
+        if not _NAME.fullmatch(name):
+            raise ValueError(
+                f"Invalid profile name: {name!r}. Use letters, digits, "
+                "'-' and '_'."
+            )
+        self.name = name
+
+    @property
+    def data_dir(self) -> Path:
+        if self.name == DEFAULT_PROFILE:
+            return DATA_DIR
+        return DATA_DIR / "profiles" / self.name
+
+    @property
+    def db_path(self) -> Path:
+        return self.data_dir / "financli.db"
+
+    @property
+    def backup_dir(self) -> Path:
+        return self.data_dir / "backups"
+
+    @property
+    def archive_dir(self) -> Path:
+        return archive_dir(self.db_path)
+
+    @property
+    def settings_path(self) -> Path:
+        if self.name == DEFAULT_PROFILE:
+            return SETTINGS_PATH
+        return CONFIG_DIR / "profiles" / self.name / "settings.json"
+
+
+_active = Profile()
+
+
+def active_profile() -> Profile:
+    return _active
+
+
+def set_active_profile(name: str | None = None) -> Profile:
+    """Switch to a profile, by default the one named in the environment."""
+    global _active
+    _active = Profile(name or os.environ.get(PROFILE_ENV) or DEFAULT_PROFILE)
+    return _active